@@ -5,7 +5,10 @@ Main entry point for Tkinter AI GUI.
 import os
 import sys
 import threading
+import time
 import traceback
+
+T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
@@ -21,7 +24,7 @@ def main():
     os.makedirs("logs", exist_ok=True)
 
     logger = LoggerService(log_file="logs/app.log")
-    state = AppState()
+    state = AppState(logs=logger.ring)
     logger.info("Starting Tkinter AI GUI")
 
     try:
@@ -33,6 +36,13 @@ def main():
         app = TkAIMainWindow(root, state, logger)
         app.pack(fill="both", expand=True)
 
+        if os.environ.get("TKAI_STARTUP_PROBE"):
+            # Used by benchmarks/startup_bench.py: report time-to-first-paint and quit
+            def report_first_paint():
+                print(f"first_paint_sec={time.perf_counter() - T0:.4f}", flush=True)
+                root.destroy()
+            root.after_idle(report_first_paint)
+
         root.mainloop()
     except Exception as e:
         logger.exception("Fatal error during app launch")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Accuracy-vs-latency comparison of the classifier backends against the eager baseline.
+
+    python benchmarks/clf_backends_bench.py --images path/to/folder --batch-size 8 --json clf_backends.json
+    python benchmarks/clf_backends_bench.py --model apple/mobilevit-xx-small --markdown report.md
+
+Without --model a tiny local MobileViT is built, and without --images random images are used,
+so it runs offline. Agreement is measured per image: top-1 label match and top-k overlap with
+eager, plus the largest absolute difference in the eager top-1 label's score.
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+def synthetic_images(n: int, size: int = 96):
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)) for _ in range(n)]
+
+def bench_backend(name: str, model: str, images, batch_size: int, top_k: int, repeats: int, cache_dir: str) -> dict:
+    from tkai.models.clf_backends import OnnxBackend, get_backend
+    from tkai.services.logger_service import LoggerService
+
+    backend = OnnxBackend(cache_dir=cache_dir) if name == "onnx" else get_backend(name)
+    t0 = time.perf_counter()
+    pipe = backend.build(model, LoggerService(log_file="logs/bench.log"))
+    load_sec = time.perf_counter() - t0
+    preds = pipe(images[:batch_size], top_k=top_k, batch_size=batch_size)  # warm-up
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        preds = pipe(images, top_k=top_k, batch_size=batch_size)
+        times.append(time.perf_counter() - t0)
+    med = statistics.median(times)
+    return {"backend": name, "load_sec": load_sec, "median_sec": med, "min_sec": min(times),
+            "ms_per_image": med * 1000 / len(images), "images_per_sec": len(images) / med, "predictions": preds}
+
+def compare(baseline, preds) -> dict:
+    top1 = overlap = 0
+    max_diff = 0.0
+    for ref, got in zip(baseline, preds):
+        top1 += ref[0]["label"] == got[0]["label"]
+        overlap += len({p["label"] for p in ref} & {p["label"] for p in got}) / len(ref)
+        scores = {p["label"]: p["score"] for p in got}
+        max_diff = max(max_diff, abs(ref[0]["score"] - scores.get(ref[0]["label"], 0.0)))
+    n = len(baseline)
+    return {"top1_agreement": top1 / n, "topk_overlap": overlap / n, "max_top1_score_diff": max_diff}
+
+def to_markdown(report: dict) -> str:
+    lines = [f"# Classifier backends: {report['model']}", "",
+             f"{report['num_images']} images, batch_size={report['batch_size']}, top_k={report['top_k']}", "",
+             "| backend | ms/image | images/s | speed-up | load s | top-1 agree | top-k overlap | max Δscore |",
+             "|---|---:|---:|---:|---:|---:|---:|---:|"]
+    for r in report["backends"]:
+        if not r.get("ok", True):
+            lines.append(f"| {r['backend']} | failed: {r['error']} |||||||")
+            continue
+        lines.append(f"| {r['backend']} | {r['ms_per_image']:.2f} | {r['images_per_sec']:.1f} | {r['speedup']:.2f}x "
+                     f"| {r['load_sec']:.2f} | {r['top1_agreement']:.1%} | {r['topk_overlap']:.1%} "
+                     f"| {r['max_top1_score_diff']:.4f} |")
+    return "\n".join(lines) + "\n"
+
+def main(argv=None) -> int:
+    from tkai.models.clf_backends import BACKENDS
+    from tkai.services.io_utils import list_images, load_images
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--model", help="Model id or directory (a tiny local MobileViT is built otherwise)")
+    ap.add_argument("--images", help="Folder of images (random images otherwise)")
+    ap.add_argument("--num-images", type=int, default=32)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--onnx-cache-dir", default=None, help="Where exported graphs are kept (temp dir by default)")
+    ap.add_argument("--json", help="Write the full report to this file")
+    ap.add_argument("--markdown", help="Write a Markdown table to this file")
+    args = ap.parse_args(argv)
+
+    if args.model:
+        model = args.model
+    else:
+        from tiny_models import build_tiny_classifier
+        model = str(build_tiny_classifier(Path(tempfile.gettempdir()) / "tkai-tiny-clf"))
+    if args.images:
+        images = load_images(list_images(args.images)[:args.num_images], workers=4)
+    else:
+        images = synthetic_images(args.num_images)
+    cache_dir = args.onnx_cache_dir or tempfile.mkdtemp(prefix="tkai-onnx-")
+
+    names = ["eager"] + [b for b in args.backends if b != "eager"]
+    rows = []
+    for name in names:
+        try:
+            rows.append(bench_backend(name, model, images, args.batch_size, args.top_k, args.repeats, cache_dir))
+        except Exception as e:
+            rows.append({"backend": name, "ok": False, "error": f"{type(e).__name__}: {e}"})
+    base = rows[0]
+    if not base.get("ok", True):
+        print(f"eager baseline failed: {base['error']}", file=sys.stderr)
+        return 1
+    baseline = base["predictions"]
+    for r in rows:
+        if r.get("ok", True):
+            r.update(compare(baseline, r.pop("predictions")), speedup=base["median_sec"] / r["median_sec"])
+
+    report = {"model": model, "num_images": len(images), "batch_size": args.batch_size, "top_k": args.top_k,
+              "backends": rows}
+    md = to_markdown(report)
+    print(md)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.markdown:
+        Path(args.markdown).write_text(md, encoding="utf-8")
+    return 0 if all(r.get("ok", True) for r in rows) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Controller benchmark suite on tiny local models, with a regression gate against a stored baseline.
+
+    python benchmarks/controller_bench.py                          # run, compare with the baseline
+    python benchmarks/controller_bench.py --json results.json      # also keep the machine-readable results
+    python benchmarks/controller_bench.py --update-baseline        # accept the current numbers
+    python benchmarks/controller_bench.py --quick --no-compare     # smoke run
+
+Runs TextToImageController.run / run_batch and ImageClassifierController.run / run_batch across
+image sizes, step counts and batch sizes on randomly initialised models built locally
+(benchmarks/tiny_models.py), so no network is needed. Every case runs in its own subprocess (model
+load, warm-up, timed repeats): peak RSS only ever grows within a process, so this is the only way
+each case's peak belongs to that case alone. Per-stage medians come from the results' `telemetry`.
+
+Exit status is 1 when a case fails, or when a case's median latency or peak RSS is more than
+--max-latency-regression / --max-memory-regression above the baseline (and above the absolute
+noise floors --min-delta-ms / --min-delta-mb). Baselines are machine-specific; regenerate one on
+the machine that runs the gate.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baselines" / "controller_bench.json"
+SCHEMA_VERSION = 2  # 2: one process per case (per-case peak RSS)
+
+def case_matrix(quick: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """Cases per controller; ids are derived from op and params, so they stay stable across runs."""
+    sizes, steps, t2i_batches, clf_batches = ([64], [1], [2], [4]) if quick else ([64, 128], [1, 2], [1, 4], [1, 8])
+    return {
+        "t2i": [{"op": "run", "width": s, "height": s, "steps": n} for s in sizes for n in steps]
+               + [{"op": "run_batch", "width": 64, "height": 64, "steps": 1, "prompts": 2, "seeds": 2, "batch_size": b}
+                  for b in t2i_batches],
+        "clf": [{"op": "run", "image_px": 96}, {"op": "run", "image_px": 512}]
+               + [{"op": "run_batch", "image_px": 96, "images": 16, "batch_size": b} for b in clf_batches],
+    }
+
+def case_id(controller: str, case: Dict[str, Any]) -> str:
+    params = ",".join(f"{k}={v}" for k, v in case.items() if k != "op")
+    return f"{controller}.{case['op']}[{params}]"
+
+def environment() -> Dict[str, Any]:
+    env = {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+           "cpu_count": os.cpu_count()}
+    try:
+        import torch
+        env.update(torch=torch.__version__, torch_threads=torch.get_num_threads())
+    except ImportError:
+        pass
+    return env
+
+# ---------- child: one controller per process ----------
+def _images(folder: Path, n: int, px: int) -> List[str]:
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(px)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n):
+        p = folder / f"{px}_{i}.jpg"
+        if not p.exists():
+            Image.fromarray(rng.integers(0, 256, (px, px, 3), dtype=np.uint8)).save(p, quality=90)
+        paths.append(str(p))
+    return paths
+
+def _call(ctrl, controller: str, case: Dict[str, Any], rep: int, workdir: Path) -> Dict[str, Any]:
+    if controller == "t2i" and case["op"] == "run":
+        return ctrl.run("a small red house", width=case["width"], height=case["height"], steps=case["steps"], seed=rep)
+    if controller == "t2i":
+        prompts = [f"a small red house {i}" for i in range(case["prompts"])]
+        return ctrl.run_batch(prompts, seeds=[rep * 100 + s for s in range(case["seeds"])], batch_size=case["batch_size"],
+                              width=case["width"], height=case["height"], steps=case["steps"])
+    if case["op"] == "run":
+        return ctrl.run(_images(workdir / "inputs", 1, case["image_px"])[0], top_k=5)
+    return ctrl.run_batch(_images(workdir / "inputs", case["images"], case["image_px"]),
+                          batch_size=case["batch_size"], top_k=5)
+
+def run_child(controller: str, model_dir: str, cases: List[Dict[str, Any]], repeats: int) -> Dict[str, Any]:
+    from tkai.models.registry import ModelRegistry
+    from tkai.services.logger_service import LoggerService
+    from tkai.services.output_writer import get_writer
+    from tkai.services.telemetry import resource_snapshot
+
+    workdir = Path(tempfile.mkdtemp(prefix="tkai-bench-"))
+    os.chdir(workdir)  # outputs/, history and logs stay out of the source tree
+    logger = LoggerService(log_file="logs/bench.log")
+    if controller == "t2i":
+        from tkai.models.t2i_controller import TextToImageController
+        ctrl = TextToImageController(logger, registry=ModelRegistry(), model_name=model_dir)
+    else:
+        from tkai.models.clf_controller import ImageClassifierController
+        ctrl = ImageClassifierController(logger, registry=ModelRegistry(), model_name=model_dir, backend="eager")
+    load = ctrl.load_model()
+    if not load.get("ok"):
+        return {"controller": controller, "ok": False, "error": load.get("error"), "cases": []}
+
+    rows = []
+    for case in cases:
+        row: Dict[str, Any] = {"id": case_id(controller, case), "controller": controller, **case}
+        res = _call(ctrl, controller, case, -1, workdir)  # warm-up: allocator, caches, lazy init
+        times, stages = [], {}
+        for rep in range(repeats):
+            if not res.get("ok"):
+                break
+            get_writer().flush()  # each timed call starts with an idle writer
+            t0 = time.perf_counter()
+            res = _call(ctrl, controller, case, rep, workdir)
+            times.append(time.perf_counter() - t0)
+            for name, sec in res.get("telemetry", {}).get("stages", {}).items():
+                stages.setdefault(name, []).append(sec)
+        if not res.get("ok"):
+            rows.append({**row, "ok": False, "error": res.get("error")})
+            continue
+        mem = resource_snapshot()
+        n_images = case.get("images") or case.get("prompts", 1) * case.get("seeds", 1)
+        med = statistics.median(times)
+        rows.append({**row, "ok": True, "repeats": repeats, "median_sec": med, "min_sec": min(times),
+                     "max_sec": max(times), "images_per_sec": n_images / med if med > 0 else None,
+                     "stages_median_sec": {k: statistics.median(v) for k, v in stages.items()},
+                     "rss_mb": mem["rss_mb"], "peak_rss_mb": mem["peak_rss_mb"]})
+    get_writer().flush()
+    return {"controller": controller, "ok": True, "load_sec": load["duration_sec"], "cases": rows}
+
+# ---------- regression gate ----------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_latency: float = 0.25, max_memory: float = 0.15,
+            min_delta_ms: float = 5.0, min_delta_mb: float = 20.0) -> List[Dict[str, Any]]:
+    """One row per current case with its deltas against the baseline and a status: ok/regression/failed/new."""
+    base = {c["id"]: c for c in baseline.get("cases", [])}
+    rows = []
+    for case in current.get("cases", []):
+        ref = base.get(case["id"])
+        row = {"id": case["id"], "status": "ok"}
+        if not case.get("ok"):
+            row.update(status="failed", detail=case.get("error"))
+        elif ref is None or not ref.get("ok"):
+            row["status"] = "new"
+        else:
+            lat = case["median_sec"] / ref["median_sec"] - 1 if ref["median_sec"] else 0.0
+            row.update(latency_change=lat, median_ms=case["median_sec"] * 1000, baseline_ms=ref["median_sec"] * 1000)
+            problems = []
+            if lat > max_latency and (case["median_sec"] - ref["median_sec"]) * 1000 > min_delta_ms:
+                problems.append(f"latency +{lat:.0%}")
+            if case.get("peak_rss_mb") and ref.get("peak_rss_mb"):
+                mem = case["peak_rss_mb"] / ref["peak_rss_mb"] - 1
+                row.update(memory_change=mem, peak_rss_mb=case["peak_rss_mb"], baseline_peak_rss_mb=ref["peak_rss_mb"])
+                if mem > max_memory and case["peak_rss_mb"] - ref["peak_rss_mb"] > min_delta_mb:
+                    problems.append(f"peak RSS +{mem:.0%}")
+            if problems:
+                row.update(status="regression", detail=", ".join(problems))
+        rows.append(row)
+    return rows
+
+def format_table(results: Dict[str, Any], verdicts: List[Dict[str, Any]] | None = None) -> str:
+    by_id = {v["id"]: v for v in verdicts or []}
+    lines = [f"{'case':<78}{'median ms':>11}{'img/s':>8}{'peak MB':>9}{'vs base':>9}  status"]
+    for case in results["cases"]:
+        v = by_id.get(case["id"], {})
+        if not case.get("ok"):
+            lines.append(f"{case['id']:<78}  failed: {case.get('error')}")
+            continue
+        change = f"{v['latency_change']:+.0%}" if "latency_change" in v else ""
+        lines.append(f"{case['id']:<78}{case['median_sec'] * 1000:>11.1f}{case['images_per_sec'] or 0:>8.1f}"
+                     f"{case['peak_rss_mb'] or 0:>9.0f}{change:>9}  {v.get('status', '')} {v.get('detail', '')}".rstrip())
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--controllers", nargs="+", choices=["t2i", "clf"], default=["t2i", "clf"])
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--quick", action="store_true", help="Smallest case matrix (smoke runs, CI without a baseline)")
+    ap.add_argument("--json", help="Write results to this file")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    ap.add_argument("--no-compare", action="store_true")
+    ap.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    ap.add_argument("--max-latency-regression", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    ap.add_argument("--max-memory-regression", type=float, default=0.15, help="Allowed peak RSS growth")
+    ap.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore slowdowns smaller than this")
+    ap.add_argument("--min-delta-mb", type=float, default=20.0, help="Ignore RSS growth smaller than this")
+    ap.add_argument("--model-dir", help=argparse.SUPPRESS)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--case", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+    matrix = case_matrix(args.quick)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.model_dir, [matrix[args.child][args.case]], args.repeats)))
+        return 0
+
+    from tiny_models import build_tiny_classifier, build_tiny_sd
+    builders = {"t2i": lambda: build_tiny_sd(Path(tempfile.gettempdir()) / "tkai-tiny-sd"),
+                "clf": lambda: build_tiny_classifier(Path(tempfile.gettempdir()) / "tkai-tiny-clf")}
+    results = {"suite": "controller_bench", "schema": SCHEMA_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "quick": args.quick, "repeats": args.repeats, "env": environment(), "load_sec": {}, "cases": []}
+    for controller in args.controllers:
+        model_dir = str(builders[controller]())
+        loads = []
+        for index, case in enumerate(matrix[controller]):
+            cmd = [sys.executable, __file__, "--child", controller, "--case", str(index), "--model-dir", model_dir,
+                   "--repeats", str(args.repeats)] + (["--quick"] if args.quick else [])
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            try:
+                child = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                child = {"ok": False, "error": (proc.stderr.strip().splitlines() or ["no output"])[-1], "cases": []}
+            if not child["ok"]:
+                results["cases"].append({"id": case_id(controller, case), "controller": controller, **case,
+                                         "ok": False, "error": child["error"]})
+                continue
+            loads.append(child["load_sec"])
+            results["cases"] += child["cases"]
+        if loads:
+            results["load_sec"][controller] = statistics.median(loads)
+
+    verdicts = None
+    baseline_path = Path(args.baseline)
+    if not args.no_compare and not args.update_baseline and baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline.get("schema") != SCHEMA_VERSION:
+            print(f"warning: baseline schema {baseline.get('schema')} != {SCHEMA_VERSION}; its peak RSS figures "
+                  f"are not per case. Regenerate it with --update-baseline", file=sys.stderr)
+        env_diff = {k: (baseline.get("env", {}).get(k), v) for k, v in results["env"].items()
+                    if k in ("machine", "cpu_count", "torch") and baseline.get("env", {}).get(k) != v}
+        if env_diff:
+            print(f"warning: baseline was recorded on a different setup {env_diff}; numbers may not be comparable",
+                  file=sys.stderr)
+        verdicts = compare(results, baseline, args.max_latency_regression, args.max_memory_regression,
+                           args.min_delta_ms, args.min_delta_mb)
+        results["comparison"] = {"baseline": str(baseline_path), "cases": verdicts}
+    elif not args.no_compare and not args.update_baseline:
+        print(f"no baseline at {baseline_path}; run with --update-baseline to create one", file=sys.stderr)
+
+    print(format_table(results, verdicts))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    failed = [c["id"] for c in results["cases"] if not c.get("ok")]
+    if args.update_baseline:
+        if failed:
+            print("not updating the baseline: some cases failed", file=sys.stderr)
+            return 1
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline written to {baseline_path}")
+        return 0
+    regressions = [v["id"] for v in verdicts or [] if v["status"] == "regression"]
+    if failed or regressions:
+        print(f"{len(failed)} failed, {len(regressions)} regressed", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
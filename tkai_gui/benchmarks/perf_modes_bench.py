@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Latency and peak RSS of each text-to-image performance mode on a tiny local pipeline.
+
+    python benchmarks/perf_modes_bench.py --sizes 64 128 --steps 2 --repeats 3 --json perf_modes.json
+    python benchmarks/perf_modes_bench.py --modes default --threads 1 2 4   # intra-op thread sweep
+
+Every mode runs in its own subprocess so peak RSS is not polluted by other modes.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+def run_child(mode: str, model_dir: str, sizes, steps: int, repeats: int, threads: int = 0) -> dict:
+    from tkai.services.logger_service import LoggerService
+    from tkai.services.telemetry import resource_snapshot
+    from tkai.models.t2i_controller import TextToImageController
+    from tkai.models.registry import ModelRegistry
+
+    os.chdir(tempfile.mkdtemp(prefix="tkai-bench-"))
+    ctrl = TextToImageController(LoggerService(log_file="logs/bench.log"), registry=ModelRegistry(),
+                                 model_name=model_dir, perf_mode=mode, intra_op_threads=threads)
+    load = ctrl.load_model()
+    if not load.get("ok"):
+        return {"mode": mode, "ok": False, "error": load.get("error")}
+    rows = []
+    for size in sizes:
+        ctrl.run("warm up", width=size, height=size, steps=steps, seed=0)  # first call pays compile/alloc costs
+        times, perf = [], {}
+        for r in range(repeats):
+            t0 = time.perf_counter()
+            res = ctrl.run("a small red house", width=size, height=size, steps=steps, seed=r)
+            times.append(time.perf_counter() - t0)
+            if not res.get("ok"):
+                return {"mode": mode, "ok": False, "error": res.get("error")}
+            perf = res["perf"]
+        rows.append({"size": size, "median_sec": statistics.median(times), "min_sec": min(times),
+                     "dtype": perf["dtype"], "attention_slicing": perf["attention_slicing"],
+                     "vae_tiling": perf["vae_tiling"]})
+    # VmHWM on Linux; psutil or getrusage elsewhere (the resource module does not exist on Windows)
+    peak = resource_snapshot()["peak_rss_mb"]
+    return {"mode": mode, "ok": True, "threads": threads or None, "load_sec": load["duration_sec"],
+            "peak_rss_mb": peak if peak is not None else float("nan"), "runs": rows}
+
+def main(argv=None) -> int:
+    from tkai.models.perf_modes import PERF_MODES
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--modes", nargs="+", default=[m for m in PERF_MODES if m != "compiled"],
+                    help="Modes to compare ('compiled' needs a working C++ toolchain)")
+    ap.add_argument("--sizes", nargs="+", type=int, default=[64, 128])
+    ap.add_argument("--steps", type=int, default=2)
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--threads", nargs="+", type=int, default=[0],
+                    help="Intra-op thread counts to run each mode with (0 = the mode's / torch default)")
+    ap.add_argument("--model-dir", help="Existing tiny pipeline directory (built on demand otherwise)")
+    ap.add_argument("--json", help="Write results to this file")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.model_dir, args.sizes, args.steps, args.repeats, args.threads[0])))
+        return 0
+
+    from tiny_models import build_tiny_sd
+    model_dir = args.model_dir or str(build_tiny_sd(Path(tempfile.gettempdir()) / "tkai-tiny-sd"))
+    results = []
+    for mode in args.modes:
+        for threads in args.threads:
+            cmd = [sys.executable, __file__, "--child", mode, "--model-dir", model_dir, "--steps", str(args.steps),
+                   "--repeats", str(args.repeats), "--threads", str(threads), "--sizes", *map(str, args.sizes)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            try:
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            except (IndexError, ValueError):
+                results.append({"mode": mode, "threads": threads or None, "ok": False,
+                                 "error": (proc.stderr.strip().splitlines() or ["?"])[-1]})
+
+    print(f"{'mode':<14}{'threads':>8}{'size':>6}{'median ms':>12}{'dtype':>10}{'peak RSS MB':>14}")
+    for r in results:
+        threads = r.get("threads") or "-"
+        if not r["ok"]:
+            print(f"{r['mode']:<14}{threads:>8}  failed: {r['error']}")
+            continue
+        for row in r["runs"]:
+            print(f"{r['mode']:<14}{threads:>8}{row['size']:>6}{row['median_sec'] * 1000:>12.1f}{row['dtype']:>10}"
+                  f"{r['peak_rss_mb']:>14.1f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
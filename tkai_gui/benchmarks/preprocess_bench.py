@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of classifier input preparation over a directory of mixed-size images.
+
+    python benchmarks/preprocess_bench.py --images path/to/folder --json preprocess.json
+    python benchmarks/preprocess_bench.py --model apple/mobilevit-xx-small
+
+Compares three paths, per image:
+    baseline    full decode + the transformers image processor, one image at a time
+    vectorized  full decode + tkai ImagePreprocessor over the whole batch
+    draft       reduced-scale JPEG decode + tkai ImagePreprocessor over the whole batch
+Without --images a synthetic set of JPEGs/PNGs (up to 12 MP) is generated in a temp dir.
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+SYNTHETIC_SIZES = [(4000, 3000, "jpg"), (1920, 1080, "jpg"), (1024, 1536, "jpg"), (640, 480, "jpg"),
+                   (512, 512, "png"), (300, 200, "png")]
+
+def make_synthetic(folder: Path, copies: int = 2) -> Path:
+    import numpy as np
+    from PIL import Image
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    for i in range(copies):
+        for w, h, ext in SYNTHETIC_SIZES:
+            p = folder / f"img_{w}x{h}_{i}.{ext}"
+            if p.exists():
+                continue
+            # Smooth gradients plus noise compress like photos rather than like pure noise
+            yy, xx = np.mgrid[0:h, 0:w]
+            base = np.stack([xx * 255 // w, yy * 255 // h, (xx + yy) * 255 // (w + h)], axis=-1)
+            noise = rng.integers(-20, 20, (h, w, 3))
+            Image.fromarray(np.clip(base + noise, 0, 255).astype("uint8")).save(p, quality=90)
+    return folder
+
+def timed(fn, repeats: int):
+    times, out = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), out
+
+def main(argv=None) -> int:
+    import numpy as np
+    from transformers import AutoImageProcessor
+    from tkai.services.io_utils import list_images, load_image
+    from tkai.services.preprocess import ImagePreprocessor
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--images", help="Folder of images (synthetic mixed sizes otherwise)")
+    ap.add_argument("--model", help="Model id or directory whose image processor is mirrored (tiny MobileViT otherwise)")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--json", help="Write results to this file")
+    args = ap.parse_args(argv)
+
+    if args.model:
+        model = args.model
+    else:
+        from tiny_models import build_tiny_classifier
+        model = str(build_tiny_classifier(Path(tempfile.gettempdir()) / "tkai-tiny-clf"))
+    folder = Path(args.images) if args.images else make_synthetic(Path(tempfile.gettempdir()) / "tkai-mixed-images")
+    paths = list_images(folder)
+    if not paths:
+        print(f"No images in {folder}", file=sys.stderr)
+        return 1
+    processor = AutoImageProcessor.from_pretrained(model)
+    fast = ImagePreprocessor.from_hf(processor)
+    if fast is None:
+        print(f"{type(processor).__name__} uses options ImagePreprocessor does not mirror", file=sys.stderr)
+        return 1
+
+    rows = {}
+    full_dec, full = timed(lambda: [load_image(p) for p in paths], args.repeats)
+    draft_dec, drafted = timed(lambda: [load_image(p, fast.min_decode_side) for p in paths], args.repeats)
+    base_pre, ref = timed(lambda: np.concatenate(
+        [processor(img, return_tensors="np")["pixel_values"] for img in full]), args.repeats)
+    vec_pre, vec = timed(lambda: fast(full), args.repeats)
+    draft_pre, drf = timed(lambda: fast(drafted), args.repeats)
+    n = len(paths)
+    for name, dec, pre, out in (("baseline", full_dec, base_pre, ref), ("vectorized", full_dec, vec_pre, vec),
+                                ("draft", draft_dec, draft_pre, drf)):
+        rows[name] = {"decode_ms_per_image": dec * 1000 / n, "preprocess_ms_per_image": pre * 1000 / n,
+                      "total_ms_per_image": (dec + pre) * 1000 / n,
+                      "max_abs_diff_vs_baseline": float(np.abs(out - ref).max())}
+
+    report = {"model": model, "num_images": n, "input_size": list(fast.output_size),
+              "decode_side": fast.min_decode_side, "paths": rows}
+    print(f"{n} images from {folder}, model input {fast.output_size[0]}x{fast.output_size[1]}")
+    print(f"{'path':<12}{'decode ms':>11}{'prep ms':>10}{'total ms':>10}{'speed-up':>10}{'max diff':>10}")
+    base_total = rows["baseline"]["total_ms_per_image"]
+    for name, r in rows.items():
+        print(f"{name:<12}{r['decode_ms_per_image']:>11.2f}{r['preprocess_ms_per_image']:>10.2f}"
+              f"{r['total_ms_per_image']:>10.2f}{base_total / r['total_ms_per_image']:>9.2f}x"
+              f"{r['max_abs_diff_vs_baseline']:>10.4f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
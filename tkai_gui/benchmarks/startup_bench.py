@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import cost of the UI path and time-to-first-paint of app.py.
+
+    python benchmarks/startup_bench.py                 # human-readable report
+    python benchmarks/startup_bench.py --json out.json --max-import-ms 1500
+
+Exits non-zero when torch/diffusers/transformers leak into the UI import path or a
+threshold is exceeded, so it can gate regressions in CI.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+UI_MODULE = "tkai.ui.main_window"
+HEAVY = ("torch", "transformers", "diffusers")
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_breakdown(module: str, top: int = 15) -> dict:
+    """Run `python -X importtime -c 'import <module>'` and summarise cumulative times."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cum_us, indent, name = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+            rows.append({"module": name, "self_ms": self_us / 1000, "cumulative_ms": cum_us / 1000, "depth": indent // 2})
+    total_ms = sum(r["self_ms"] for r in rows)
+    heavy = sorted({r["module"].split(".")[0] for r in rows if r["module"].split(".")[0] in HEAVY})
+    top_level = sorted((r for r in rows if r["depth"] == 0), key=lambda r: r["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": total_ms, "heavy_modules": heavy, "top": top_level[:top]}
+
+def first_paint(timeout: float = 60.0) -> dict:
+    """Launch app.py in probe mode; returns wall and in-process seconds until the first idle after mapping."""
+    env = dict(os.environ, TKAI_STARTUP_PROBE="1")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "app.py"], cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+    wall = time.perf_counter() - t0
+    m = re.search(r"first_paint_sec=([\d.]+)", proc.stdout)
+    if not m:
+        reason = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"available": False, "reason": reason}
+    return {"available": True, "wall_sec": wall, "in_process_sec": float(m.group(1))}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--json", help="Write results to this file")
+    ap.add_argument("--max-import-ms", type=float, default=None, help="Fail if the UI import path is slower")
+    ap.add_argument("--max-first-paint-sec", type=float, default=None, help="Fail if first paint is slower")
+    ap.add_argument("--skip-paint", action="store_true", help="Only measure imports (e.g. without a display)")
+    args = ap.parse_args(argv)
+
+    results = {"python": sys.version.split()[0], "imports": import_breakdown(UI_MODULE)}
+    if not args.skip_paint:
+        results["first_paint"] = first_paint()
+
+    imp = results["imports"]
+    print(f"import {UI_MODULE}: {imp['total_ms']:.1f} ms")
+    for r in imp["top"]:
+        print(f"  {r['cumulative_ms']:9.1f} ms  {r['module']}")
+    fp = results.get("first_paint")
+    if fp is not None:
+        if fp["available"]:
+            print(f"time-to-first-paint: {fp['in_process_sec']:.3f}s in-process, {fp['wall_sec']:.3f}s wall")
+        else:
+            print(f"time-to-first-paint: skipped ({fp['reason']})")
+
+    failures = []
+    if imp["heavy_modules"]:
+        failures.append(f"heavy modules imported on the UI path: {', '.join(imp['heavy_modules'])}")
+    if args.max_import_ms is not None and imp["total_ms"] > args.max_import_ms:
+        failures.append(f"UI import {imp['total_ms']:.1f} ms > {args.max_import_ms} ms")
+    if args.max_first_paint_sec is not None and fp and fp["available"] and fp["wall_sec"] > args.max_first_paint_sec:
+        failures.append(f"first paint {fp['wall_sec']:.3f}s > {args.max_first_paint_sec}s")
+    results["failures"] = failures
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    for f in failures:
+        print(f"REGRESSION: {f}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Headless entry point (no display needed), e.g.:
+    python cli.py generate -i prompts.jsonl -o results.jsonl --seed 1
+    find imgs -name "*.jpg" | python cli.py classify --batch-size 16
+"""
+import sys
+
+from tkai.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
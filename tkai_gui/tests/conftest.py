@@ -0,0 +1,14 @@
+import pytest
+
+from tkai.services import run_history
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: downloads real checkpoints; deselect with -m 'not slow'")
+
+@pytest.fixture(autouse=True)
+def _isolated_history(tmp_path, monkeypatch):
+    """Controllers record every run; keep each test's history out of the working tree."""
+    history = run_history.RunHistory(tmp_path / "history.sqlite3")
+    monkeypatch.setattr(run_history, "_default_history", history)
+    yield history
+    history.close()
@@ -0,0 +1,118 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from tkai.models.chain import Candidate, Chain, Classify, Draft, Filter, Generate, Pick, Refine, Save
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry
+from tkai.models.t2i_controller import TextToImageController
+from tkai.services.io_utils import json_ready
+from tkai.services.logger_service import LoggerService
+from tkai.services.output_writer import OutputWriter
+
+class _StubText2Image:
+    """Each image's red level is its seed * 40, so the classifier's ranking is known in advance."""
+    def __call__(self, prompt, num_images_per_prompt=1, width=64, height=64, generator=None, **kwargs):
+        seeds = [g.initial_seed() for g in generator]
+        return SimpleNamespace(images=[Image.new("RGB", (width, height), (s * 40, 0, 0)) for s in seeds])
+
+class _StubImage2Image:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, image, prompt, strength=0.5, num_inference_steps=1, generator=None, **kwargs):
+        self.calls.append((len(image), strength, num_inference_steps))
+        self.sizes = [img.size for img in image]
+        self.seeds = [g.initial_seed() for g in generator] if generator else None
+        return SimpleNamespace(images=[Image.new("RGB", img.size, (img.getpixel((0, 0))[0], 0, 200)) for img in image])
+
+def _red_classifier(images, top_k=5, batch_size=None):
+    def preds(img):
+        red = img.getpixel((0, 0))[0] / 255
+        return sorted([{"label": "red fox", "score": red}, {"label": "blue whale", "score": 1 - red}],
+                      key=lambda p: p["score"], reverse=True)[:top_k]
+    return [preds(img) for img in images] if isinstance(images, list) else preds(images)
+
+@pytest.fixture
+def controllers(tmp_path, monkeypatch, _isolated_history):
+    monkeypatch.chdir(tmp_path)
+    logger = LoggerService(log_file="logs/test.log")
+    t2i = TextToImageController(logger, registry=ModelRegistry())
+    t2i._pipe = _StubText2Image()
+    img2img = _StubImage2Image()
+    monkeypatch.setattr(t2i, "_img2img_pipe", lambda: img2img)
+    clf = ImageClassifierController(logger, registry=ModelRegistry())
+    clf._pipe = _red_classifier
+    return logger, t2i, clf, img2img
+
+def test_generate_classify_filter_stays_in_memory(controllers, tmp_path):
+    logger, t2i, clf, _ = controllers
+    chain = Chain(logger, Generate(t2i, ["a fox"], seeds=[1, 5, 3, 2], width=16, height=16),
+                  Classify(clf, top_k=2), Filter(label="fox", keep=2))
+    res = chain.run()
+    assert res["ok"] and [s["candidates"] for s in res["stages"]] == [4, 4, 2]
+    assert [item["seed"] for item in res["items"]] == [5, 3]
+    assert res["items"][0]["preview_image"].getpixel((0, 0))[0] == 200
+    assert set(res["telemetry"]["stages"]) == {"generate", "classify", "filter"}
+    assert not (tmp_path / "outputs").exists()  # nothing encoded or written without Save
+    assert "preview_image" not in json.dumps(json_ready(res), default=str)
+
+def test_refine_and_save_write_only_the_survivors(controllers, tmp_path, _isolated_history):
+    logger, t2i, clf, img2img = controllers
+    writer = OutputWriter()
+    chain = Chain(logger, Generate(t2i, ["a fox"], num_images_per_prompt=3, base_seed=1, width=16, height=16),
+                  Refine(t2i, strength=0.5, steps=2), Classify(clf), Filter(min_score=0.75),
+                  Save(writer=writer, history=_isolated_history))
+    res = chain.run()
+    writer.flush()
+    assert img2img.calls == [(3, 0.5, 2)]
+    # Without a label the top-1 score counts: "blue whale" is most certain for the least red image
+    assert [item["seed"] for item in res["items"]] == [1]
+    saved = res["items"][0]
+    assert saved["refine"]["strength"] == 0.5 and Image.open(saved["image_path"]).getpixel((0, 0)) == (40, 0, 200)
+    sidecar = json.loads(open(saved["json_path"], encoding="utf-8").read())
+    assert sidecar["predictions"][0]["label"] == "blue whale" and sidecar["prompt"] == "a fox"
+    assert _isolated_history.count(task="image-to-image") == 1 and _isolated_history.count(task="text-to-image") == 0
+    assert _isolated_history.count(label="blue") == 1  # the candidate's predictions are searchable
+    # Loaded images are not recorded as text-to-image runs either
+    Chain(logger, Classify(clf), Save(writer=writer, history=_isolated_history)).run([Image.new("RGB", (4, 4))])
+    writer.flush()
+    rows = _isolated_history.query(task="image")
+    assert len(rows) == 1 and rows[0]["top_label"] and _isolated_history.count() == 2
+
+def test_stage_errors_and_cancellation(controllers):
+    import threading
+    logger, t2i, clf, _ = controllers
+    res = Chain(logger, Filter(keep=1)).run([Image.new("RGB", (4, 4))])
+    assert res["ok"] is False and "Classify" in res["error"]
+    res = Chain(logger, Refine(t2i, strength=0.2, steps=2)).run([Image.new("RGB", (4, 4))])
+    assert res["ok"] is False
+    cancel = threading.Event()
+    cancel.set()
+    assert Chain(logger, Classify(clf)).run([Image.new("RGB", (4, 4))], cancel_event=cancel)["cancelled"] is True
+
+def test_classifier_run_accepts_an_in_memory_image(controllers, tmp_path):
+    _, _, clf, _ = controllers
+    res = clf.run(str(tmp_path / "not_written_yet.png"), top_k=1, image=Image.new("RGB", (8, 8), (255, 0, 0)))
+    assert res["ok"] and res["predictions"][0]["label"] == "red fox"
+
+def test_draft_then_refine_spends_full_resolution_on_the_keepers_only(controllers):
+    logger, t2i, clf, img2img = controllers
+    drafts = Chain(logger, Draft(t2i, ["a fox"], num_images_per_prompt=4, base_seed=1)).run()
+    assert [item["width"] for item in drafts["items"]] == [128] * 4 and drafts["items"][0]["steps"] == 1
+    # A user ticks two drafts; they come back as candidates and are refined to full size with their seeds
+    ticked = [Candidate.from_result(item) for item in drafts["items"]]
+    picked = [ticked[0].meta["run_id"], ticked[2].meta["run_id"]]
+    res = Chain(logger, Pick(picked), Refine(t2i, width=48, height=32, steps=2)).run(ticked)
+    assert img2img.calls == [(2, 0.5, 2)] and img2img.sizes == [(48, 32)] * 2 and img2img.seeds == [1, 3]
+    item = res["items"][0]
+    assert (item["width"], item["height"]) == (48, 32) and item["draft"] == {"width": 128, "height": 128, "steps": 1}
+    # ...or the classifier picks
+    res = Chain(logger, Draft(t2i, ["a fox"], num_images_per_prompt=4, base_seed=1), Classify(clf),
+                Filter(label="fox", keep=1), Refine(t2i, width=64, height=64, steps=2)).run()
+    assert [i["seed"] for i in res["items"]] == [4] and img2img.sizes == [(64, 64)]
+    # An unseeded image gets a seed of its own (recorded) and does not unseed the others in its call
+    res = t2i.refine_images([Image.new("RGB", (8, 8))] * 2, ["a fox", "a fox"], seeds=[7, None], steps=2)
+    assert img2img.seeds[0] == 7 and [item["seed"] for item in res["items"]] == img2img.seeds
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from tkai.models.clf_backends import ArrayImageClassifier, OnnxBackend, get_backend
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry, estimate_nbytes, module_nbytes
+from tkai.services.logger_service import LoggerService
+
+def _forward(x):
+    """Stands in for a model: logits grow with the channel-0 mean of each image."""
+    return np.stack([x[:, 0].mean(axis=(1, 2)) * k for k in range(3)], axis=1)
+
+def _preprocess(images):
+    return np.stack([np.full((3, 4, 4), v, dtype=np.float32) for v in images])
+
+def test_array_classifier_matches_pipeline_output_shape():
+    clf = ArrayImageClassifier(_forward, _preprocess, {0: "a", 1: "b", 2: "c"})
+    single = clf(1.0, top_k=2)
+    assert [p["label"] for p in single] == ["c", "b"]
+    assert single[0]["score"] > single[1]["score"]
+    batch = clf([1.0, -1.0, 2.0], top_k=5, batch_size=2)
+    assert len(batch) == 3 and len(batch[0]) == 3        # top_k clamped to the label count
+    assert batch[1][0]["label"] == "a"                   # negative mean flips the ranking
+    assert sum(p["score"] for p in batch[2]) == pytest.approx(1.0)
+
+def test_backend_selection_and_registry_key(tmp_path):
+    with pytest.raises(ValueError):
+        get_backend("tensorrt")
+    assert OnnxBackend(cache_dir=tmp_path).artifact_path("apple/mobilevit-xx-small").parent.name == "apple__mobilevit-xx-small"
+    ctrl = ImageClassifierController(LoggerService(log_file=str(tmp_path / "t.log")), registry=ModelRegistry())
+    key = ctrl._registry_key()
+    ctrl.set_backend("onnx")
+    assert ctrl.backend == "onnx" and ctrl._registry_key() != key
+
+def test_array_classifier_reports_its_weights_to_the_registry():
+    import torch
+    clf = ArrayImageClassifier(_forward, _preprocess, {0: "a"}, nbytes=4096)
+    registry = ModelRegistry(ram_budget_mb=1)
+    registry.put("clf", clf)
+    assert estimate_nbytes(clf) == 4096 and registry.stats()["resident_mb"] == 4096 / 1024 / 1024
+    linear = torch.nn.Linear(8, 4)
+    assert module_nbytes(linear) == (8 * 4 + 4) * 4
+    assert estimate_nbytes(ArrayImageClassifier(_forward, _preprocess, {0: "a"})) == 0
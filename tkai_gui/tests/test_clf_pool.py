@@ -0,0 +1,87 @@
+import functools
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tkai.models.clf_backends import ArrayImageClassifier
+from tkai.models.clf_pool import ProcessPoolClassifier
+
+def _preprocess(images):
+    return np.stack([np.asarray(img.resize((4, 4)), dtype=np.float32).transpose(2, 0, 1) / 255 for img in images])
+
+def stub_pipeline(threads=1, crash_marker=None):
+    """Runs inside the worker processes; crashes its first process once if `crash_marker` is given."""
+    if crash_marker is not None and not os.path.exists(crash_marker):
+        Path(crash_marker).touch()
+        def forward(x):
+            if len(x) > 1:  # the single-image warm-up passes; the first real batch kills the process
+                os._exit(1)
+            return x.mean(axis=(2, 3))
+    else:
+        def forward(x):
+            return x.mean(axis=(2, 3))
+    return ArrayImageClassifier(forward, _preprocess, {0: "red", 1: "green", 2: "blue"}, nbytes=1000)
+
+def _images():
+    colours = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (200, 10, 10), (10, 10, 200)]
+    return [Image.new("RGB", (9 + i, 7), c) for i, c in enumerate(colours)] + [Image.new("L", (5, 5), 40)]
+
+def _shm_blocks():
+    return {n for n in os.listdir("/dev/shm") if n.startswith("psm_")} if os.path.isdir("/dev/shm") else set()
+
+def test_pool_matches_in_process_predictions_and_cleans_up():
+    before = _shm_blocks()
+    images = _images()
+    expected = stub_pipeline()([img.convert("RGB") for img in images], top_k=2, batch_size=2)  # workers get RGB
+    pool = ProcessPoolClassifier(stub_pipeline, workers=2, threads_per_worker=1)
+    try:
+        assert pool(images, top_k=2, batch_size=2) == expected
+        assert pool(images[0], top_k=1) == expected[0][:1]
+        assert pool(images[:3], top_k=2, batch_size=8) == expected[:3]  # spread over both workers
+        stats = pool.stats()
+        assert stats["alive"] == 2 and stats["restarts"] == 0 and stats["chunks"] == 3 + 1 + 2
+        assert pool.nbytes == 2 * 1000  # one model copy per worker
+    finally:
+        pool.shutdown()
+    assert pool.stats()["alive"] == 0
+    assert _shm_blocks() <= before
+
+def test_crashed_worker_is_restarted_and_batch_retried(tmp_path):
+    marker = tmp_path / "crashed"
+    factory = functools.partial(stub_pipeline, crash_marker=str(marker))
+    # The first worker crashes on its first batch; its replacement sees the marker and behaves
+    pool = ProcessPoolClassifier(factory, workers=1, threads_per_worker=1)
+    try:
+        preds = pool(_images()[:2], top_k=1, batch_size=2)
+        assert [p[0]["label"] for p in preds] == ["red", "green"]
+        assert pool.stats()["restarts"] == 1
+    finally:
+        pool.shutdown()
+
+def test_worker_load_failure_is_reported():
+    with pytest.raises(RuntimeError, match="failed to load"):
+        ProcessPoolClassifier(_missing_model, workers=1, threads_per_worker=1)
+
+def _missing_model(threads=1):
+    raise OSError("no such model")
+
+def test_controller_workers_select_a_separate_pipeline(tmp_path):
+    from tkai.models.clf_controller import ImageClassifierController
+    from tkai.models.registry import ModelRegistry
+    from tkai.services.logger_service import LoggerService
+    registry = ModelRegistry()
+    ctrl = ImageClassifierController(LoggerService(log_file=str(tmp_path / "t.log")), registry=registry)
+    key = ctrl._registry_key()
+    stopped = []
+    class _Pool:
+        def shutdown(self):
+            stopped.append(True)
+    registry.put(key, _Pool())
+    ctrl.set_workers(3)
+    assert ctrl.workers == 3 and ctrl._registry_key() != key and ctrl.summarize_info()["Workers"] == "3"
+    assert registry.peek(key) is None and stopped == [True]  # the previous pipeline does not linger
+    ctrl.set_workers(3)
+    assert stopped == [True]
@@ -0,0 +1,76 @@
+import io
+import json
+import subprocess
+import sys
+
+from PIL import Image
+
+from tkai import cli
+from tkai.models.clf_controller import ImageClassifierController
+
+def test_cli_import_is_light():
+    code = ("import sys, tkai.cli; "
+            "heavy = [m for m in ('tkinter', 'torch', 'diffusers', 'transformers') if m in sys.modules]; "
+            "print(heavy)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_cli_classify_streams_jsonl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.png"
+        Image.new("RGB", (8, 8), (i, 0, 0)).save(p)
+        paths.append(str(p))
+    (tmp_path / "broken.png").write_bytes(b"not a png")
+    def stub(self):
+        def pipe(images, top_k=5, batch_size=None):
+            batch = images if isinstance(images, list) else [images]
+            for img in batch:
+                img.load()  # an undecodable file fails its whole batch
+            pred = [{"label": f"stub{k}", "score": 1.0 / (k + 1)} for k in range(top_k)]
+            return [pred for _ in batch] if isinstance(images, list) else pred
+        return pipe
+    monkeypatch.setattr(ImageClassifierController, "_build_pipeline", stub)
+    monkeypatch.setattr(ImageClassifierController, "_load_images",
+                        lambda self, ps, min_side=None: [Image.open(p) for p in ps])
+
+    lines_in = [paths[0], "", json.dumps({"image_path": paths[1], "top_k": 1}), paths[2],
+                '{"image_path": oops', json.dumps({"top_k": 2}), str(tmp_path / "missing.png"),
+                str(tmp_path / "broken.png")]
+    monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(lines_in) + "\n"))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    rc = cli.main(["classify", "--model", "stub/cli-model", "--batch-size", "2", "--top-k", "3", "--no-cache"])
+    lines = {l["line"]: l for l in map(json.loads, out.getvalue().splitlines())}
+    assert rc == 1 and sorted(lines) == [1, 3, 4, 5, 6, 7, 8]
+    assert all(lines[n]["ok"] and lines[n]["predictions"][0]["label"] == "stub0" for n in (1, 3, 4))
+    assert len(lines[1]["predictions"]) == 3 and len(lines[3]["predictions"]) == 1 and lines[3]["top_k"] == 1
+    assert "Malformed JSON" in lines[5]["error"] and "Missing 'image_path'" in lines[6]["error"]
+    assert "not found" in lines[7]["error"] and not lines[8]["ok"]
+    assert (tmp_path / "outputs").is_dir()
+
+def test_cli_pick_keeps_best_candidates(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from tkai.models.t2i_controller import TextToImageController
+    monkeypatch.chdir(tmp_path)
+    def t2i_stub(self):
+        def pipe(prompt, num_images_per_prompt=1, width=64, height=64, generator=None, **kwargs):
+            return SimpleNamespace(images=[Image.new("RGB", (width, height), (g.initial_seed() * 50, 0, 0))
+                                           for g in generator])
+        return pipe
+    def clf_stub(self):
+        def pipe(images, top_k=5, batch_size=None):
+            return [[{"label": "red", "score": img.getpixel((0, 0))[0] / 255}] for img in images]
+        return pipe
+    monkeypatch.setattr(TextToImageController, "_build_pipeline", t2i_stub)
+    monkeypatch.setattr(ImageClassifierController, "_build_pipeline", clf_stub)
+    monkeypatch.setattr(sys, "stdin", io.StringIO('a red barn\n{"prompt": "a barn", "seed": null}\n'
+                                                  '{"prompt": "a shed", "seed": "abc"}\n'))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    rc = cli.main(["pick", "--candidates", "4", "--keep", "2", "--width", "16", "--height", "16", "--no-save"])
+    res, null_seed, bad_seed = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [item["seed"] for item in res["items"]] == [3, 2] and "image_path" not in res["items"][0]
+    assert [item["seed"] for item in null_seed["items"]] == [3, 2]  # null falls back to --seed
+    assert rc == 1 and bad_seed["ok"] is False and "Invalid seed" in bad_seed["error"]
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from controller_bench import case_id, case_matrix, compare
+
+def _case(cid, sec, rss=500.0, ok=True):
+    return {"id": cid, "ok": ok, "median_sec": sec, "peak_rss_mb": rss, "error": None if ok else "boom"}
+
+def test_regression_gate_thresholds_and_noise_floor():
+    baseline = {"cases": [_case("a", 0.100), _case("b", 0.002), _case("c", 0.100, rss=500), _case("d", 0.1)]}
+    current = {"cases": [_case("a", 0.140), _case("b", 0.004), _case("c", 0.101, rss=600),
+                         _case("d", 0.1, ok=False), _case("e", 0.1)]}
+    verdicts = {v["id"]: v for v in compare(current, baseline, max_latency=0.25, max_memory=0.15)}
+    assert verdicts["a"]["status"] == "regression" and "latency" in verdicts["a"]["detail"]
+    assert verdicts["b"]["status"] == "ok"  # +100% but only 2 ms: below the noise floor
+    assert verdicts["c"]["status"] == "regression" and "peak RSS" in verdicts["c"]["detail"]
+    assert verdicts["d"]["status"] == "failed" and verdicts["e"]["status"] == "new"
+
+def test_case_ids_are_unique_and_stable():
+    ids = [case_id(ctrl, c) for ctrl, cases in case_matrix().items() for c in cases]
+    assert len(ids) == len(set(ids))
+    assert "t2i.run[width=64,height=64,steps=1]" in ids
@@ -2,6 +2,7 @@ import pytest
 from tkai.services.logger_service import LoggerService
 from tkai.models.t2i_controller import TextToImageController
 from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry
 
 # These are smoke-like tests to ensure controllers construct and can call load_model()
 # Actual model downloads may be slow; run selectively if desired.
@@ -19,3 +20,158 @@ def test_clf_load():
     clf = ImageClassifierController(logger)
     res = clf.load_model()
     assert res["ok"] is True
+
+class _StubClassifier:
+    """Stands in for a transformers image-classification pipeline."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, top_k=5, batch_size=None):
+        if not isinstance(images, list):
+            return [{"label": "cat", "score": 0.9}][:top_k]
+        self.calls.append(len(images))
+        return [[{"label": "cat", "score": 0.9}][:top_k] for _ in images]
+
+def test_clf_run_batch_with_stub(tmp_path, monkeypatch, _isolated_history):
+    from PIL import Image
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"img{i}.png"
+        Image.new("RGB", (16, 16)).save(p)
+        paths.append(str(p))
+
+    clf = ImageClassifierController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    clf._pipe = _StubClassifier()
+    res = clf.run_batch(paths, batch_size=2, top_k=1, dedup=False)  # identical files; dedup is covered in test_dedup
+    assert res["ok"] is True
+    assert res["num_images"] == 5
+    assert clf._pipe.calls == [2, 2, 1]
+    assert res["images_per_sec"] > 0
+    assert [r["image_path"] for r in res["results"]] == paths
+    assert (tmp_path / "outputs").exists()
+    assert _isolated_history.query(task="image-classification-batch")[0]["run_id"] == res["run_id"]
+
+class _StubText2Image:
+    """Stands in for a diffusers text-to-image pipeline."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompt, num_images_per_prompt=1, width=64, height=64, generator=None,
+                 num_inference_steps=1, callback_on_step_end=None, **kwargs):
+        from types import SimpleNamespace
+        import torch
+        from PIL import Image
+        for step in range(num_inference_steps):
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, 0, {"latents": torch.zeros(1, 4, height // 8, width // 8)})
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        self.calls.append((list(prompts), num_images_per_prompt, len(generator or [])))
+        n = len(prompts) * num_images_per_prompt
+        return SimpleNamespace(images=[Image.new("RGB", (width, height)) for _ in range(n)])
+
+def test_t2i_run_batch_with_stub(tmp_path, monkeypatch, _isolated_history):
+    monkeypatch.chdir(tmp_path)
+    t2i = TextToImageController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    t2i._pipe = _StubText2Image()
+    res = t2i.run_batch(["a", "b", "c"], seeds=[1, 2], batch_size=4, width=32, height=32)
+    assert res["ok"] is True
+    assert res["num_images"] == 6
+    assert t2i._pipe.calls == [(["a", "b"], 2, 4), (["c"], 2, 2)]
+    assert [(m["prompt"], m["seed"]) for m in res["items"]] == [
+        ("a", 1), ("a", 2), ("b", 1), ("b", 2), ("c", 1), ("c", 2)]
+    assert len({m["image_path"] for m in res["items"]}) == 6
+    assert {r["batch_id"] for r in _isolated_history.query()} == {res["run_id"]}
+    assert _isolated_history.count(task="text-to-image") == 6
+    # More seeds per prompt than batch_size: the seeds are split too, so no call exceeds the micro-batch
+    t2i._pipe.calls.clear()
+    res = t2i.run_batch(["a", "b"], seeds=[1, 2, 3, 4, 5], batch_size=2, width=32, height=32)
+    assert t2i._pipe.calls == [(["a"], 2, 2), (["a"], 2, 2), (["a"], 1, 1), (["b"], 2, 2), (["b"], 2, 2), (["b"], 1, 1)]
+    assert [(m["prompt"], m["seed"]) for m in res["items"]] == [(p, s) for p in "ab" for s in range(1, 6)]
+
+def test_registry_lazy_load_shared_and_lru_budget():
+    registry = ModelRegistry()
+    built = []
+    def make(name):
+        def loader():
+            built.append(name)
+            return object()
+        return loader
+    a1, fresh1 = registry.load(("clf", "a"), make("a"))
+    a2, fresh2 = registry.load(("clf", "a"), make("a"))
+    assert a1 is a2 and (fresh1, fresh2) == (True, False)
+    assert built == ["a"]
+
+    import torch
+    registry = ModelRegistry(ram_budget_mb=1.5)
+    big = lambda: torch.nn.Linear(512, 512)  # ~1 MB of float32 weights
+    registry.load(("clf", "a"), big)
+    with registry.hold(("clf", "b"), big):
+        registry.load(("clf", "c"), big)  # "a" is LRU and unpinned; "b" is in use
+        assert registry.peek(("clf", "b")) is not None
+    assert registry.peek(("clf", "a")) is None
+    assert registry.stats()["evictions"] >= 1
+
+    # Evicted worker pools are stopped after the registry lock is released (joining workers takes time)
+    registry = ModelRegistry(ram_budget_mb=1)
+    locked_during_shutdown = []
+    class _Pool:
+        nbytes = 1024 * 1024
+        def shutdown(self):
+            locked_during_shutdown.append(registry._lock.locked())
+    registry.load(("clf", "pool"), _Pool)
+    registry.load(("clf", "other"), _Pool)
+    registry.put(("clf", "third"), _Pool())
+    registry.unload(("clf", "third"))
+    assert locked_during_shutdown == [False, False, False]
+
+def test_controllers_share_registry_and_load_lazily(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from PIL import Image
+    Image.new("RGB", (8, 8)).save(tmp_path / "x.png")
+    registry = ModelRegistry()
+    logger = LoggerService(log_file="logs/test.log")
+    first = ImageClassifierController(logger, registry=registry)
+    second = ImageClassifierController(logger, registry=registry)
+    builds = []
+    monkeypatch.setattr(ImageClassifierController, "_build_pipeline",
+                        lambda self: builds.append(1) or _StubClassifier())
+    assert not first._loaded
+    assert first.run(str(tmp_path / "x.png"))["ok"]  # no explicit load_model()
+    assert second._loaded and second.load_model()["shared"] is True
+    assert builds == [1]
+
+def test_t2i_streams_step_progress_and_cancels(tmp_path, monkeypatch):
+    import threading
+    monkeypatch.chdir(tmp_path)
+    t2i = TextToImageController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    t2i._pipe = _StubText2Image()
+    events = []
+    res = t2i.run("a cat", width=64, height=64, steps=3, progress=events.append)
+    assert res["ok"]
+    assert [e["step"] for e in events] == [1, 2, 3]
+    assert events[-1]["eta_sec"] == 0 and events[0]["preview"].size == (128, 128)
+
+    cancel = threading.Event()
+    def stop_after_first(event):
+        cancel.set()
+    res = t2i.run("a cat", width=64, height=64, steps=3, progress=stop_after_first, cancel_event=cancel)
+    assert res["cancelled"] is True and res["ok"] is False
+
+def test_load_model_warms_up_and_reports_time_and_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stub, warmed = _StubClassifier(), []
+    monkeypatch.setattr(ImageClassifierController, "_build_pipeline", lambda self: stub)
+    monkeypatch.setattr(ImageClassifierController, "_warm_up", lambda self, pipe: warmed.append(pipe))
+    clf = ImageClassifierController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    res = clf.load_model()
+    assert res["ok"] and not res["shared"]
+    assert res["load_sec"] >= 0 and res["warmup_sec"] >= 0 and res["rss_mb"] > 0 and "rss_delta_mb" in res
+    assert set(res["telemetry"]["stages"]) == {"load", "warmup"}
+    assert warmed == [stub]
+    assert "load_sec" not in clf.load_model() and warmed == [stub]  # shared: no second load or warm-up
+
+    # A failing warm-up never fails the load
+    t2i = TextToImageController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    monkeypatch.setattr(TextToImageController, "_build_pipeline", lambda self: object())
+    assert t2i.load_model()["ok"]
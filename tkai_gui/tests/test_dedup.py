@@ -0,0 +1,73 @@
+import shutil
+
+import numpy as np
+from PIL import Image
+
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry
+from tkai.services.dedup import dhashes, find_duplicates, hamming_matches
+from tkai.services.logger_service import LoggerService
+
+def _photo(seed: int, px: int = 96) -> Image.Image:
+    # Smooth random blobs, so resizing or re-encoding keeps the structure a perceptual hash sees
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (6, 6, 3), dtype=np.uint8)).resize((px, px), Image.BICUBIC)
+
+def _folder(tmp_path):
+    a, b = _photo(1), _photo(2)
+    a.save(tmp_path / "a.png")
+    shutil.copy(tmp_path / "a.png", tmp_path / "a_copy.png")             # exact copy
+    a.resize((80, 80)).save(tmp_path / "a_small.jpg", quality=85)       # near duplicate
+    b.save(tmp_path / "b.png")
+    b.resize((120, 120)).save(tmp_path / "b_big.jpg", quality=70)       # near duplicate
+    _photo(3).save(tmp_path / "c.png")
+    return [str(tmp_path / n) for n in ("a.png", "b.png", "a_copy.png", "a_small.jpg", "c.png", "b_big.jpg")]
+
+def test_exact_and_near_duplicates_are_grouped_around_the_first_file(tmp_path):
+    paths = _folder(tmp_path)
+    groups = find_duplicates(paths, threshold=6, workers=2)
+    assert groups.leader == [0, 1, 0, 0, 4, 1]
+    assert groups.stats()["unique"] == 3 and groups.exact == 1 and groups.near == 2
+    exact_only = find_duplicates(paths, threshold=-1)
+    assert exact_only.leader == [0, 1, 0, 3, 4, 5] and exact_only.near == 0
+
+def test_colour_and_unreadable_files_are_never_merged(tmp_path):
+    ramp = np.tile(np.linspace(0, 255, 64, dtype=np.uint8), (64, 1))
+    zero = np.zeros_like(ramp)
+    images = {"red.png": Image.new("RGB", (64, 64), "red"), "blue.png": Image.new("RGB", (64, 64), "blue"),
+              "white.png": Image.new("RGB", (64, 64), "white"), "black.png": Image.new("RGB", (64, 64), "black"),
+              "red_ramp.png": Image.fromarray(np.dstack([ramp, zero, zero])),
+              "green_ramp.png": Image.fromarray(np.dstack([zero, ramp, zero]))}
+    paths = []
+    for name, img in images.items():
+        img.save(tmp_path / name)
+        paths.append(str(tmp_path / name))
+    (tmp_path / "broken.png").write_bytes(b"not an image")
+    (tmp_path / "broken2.png").write_bytes(b"not an image either")
+    paths += [str(tmp_path / "broken.png"), str(tmp_path / "broken2.png"), str(tmp_path / "missing.png")]
+    groups = find_duplicates(paths, threshold=8)
+    assert groups.leader == list(range(len(paths))) and groups.unreadable == 3
+    assert find_duplicates(paths).threshold == -1  # near-duplicate merging is opt-in
+
+def test_hamming_matches_blockwise():
+    hashes = np.array([0b0000, 0b0001, 0b1111, 0b0011], dtype=np.uint64)
+    matches = hamming_matches(hashes, threshold=1, block=2)
+    assert [m.tolist() for m in matches] == [[], [0], [], [1]]
+    assert dhashes([]).shape == (0,)
+
+def test_run_batch_classifies_each_group_once(tmp_path, monkeypatch, _isolated_history):
+    monkeypatch.chdir(tmp_path)
+    paths = _folder(tmp_path)
+    seen = []
+    def pipe(images, top_k=5, batch_size=None):
+        seen.extend(images)
+        return [[{"label": f"mean {np.asarray(img).mean():.0f}", "score": 1.0}] for img in images]
+    clf = ImageClassifierController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry())
+    clf._pipe = pipe
+    res = clf.run_batch(paths, batch_size=2, top_k=1, dedup_threshold=6)
+    assert res["ok"] and len(seen) == 3 and len(res["results"]) == 6
+    assert [r["image_path"] for r in res["results"]] == paths
+    assert res["results"][3]["duplicate_of"] == paths[0]
+    assert res["results"][3]["predictions"] == res["results"][0]["predictions"]
+    assert "duplicate_of" not in res["results"][4]
+    assert res["dedup"]["unique"] == 3 and "dedup" in res["telemetry"]["stages"]
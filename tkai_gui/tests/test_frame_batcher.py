@@ -0,0 +1,89 @@
+import time
+
+from PIL import Image
+
+from tkai.services.scheduler import DONE, JobScheduler
+from tkai.ui.frame_batcher import FrameBatcher
+from tkai.ui.widgets import _fit
+
+class _FakeTk:
+    """Stands in for the Tk root: records after() calls instead of running a mainloop."""
+    def __init__(self):
+        self.scheduled = []
+        self.errors = []
+
+    def after(self, ms, fn):
+        self.scheduled.append((ms, fn))
+
+    def report_callback_exception(self, exc, val, tb):
+        self.errors.append(val)
+
+    def run_frame(self):
+        _, fn = self.scheduled.pop(0)
+        fn()
+
+def test_posts_coalesce_and_calls_keep_order_within_one_frame():
+    tk, now = _FakeTk(), [100.0]
+    ui = FrameBatcher(tk, fps=10, clock=lambda: now[0])
+    seen = []
+    ui.dispatch(lambda: seen.append("a"))
+    for i in range(50):
+        ui.post("status", lambda i=i: seen.append(f"s{i}"))
+    ui.dispatch(lambda: seen.append("b"))
+    assert len(tk.scheduled) == 1 and tk.scheduled[0][0] == 0  # first frame is immediate
+    tk.run_frame()
+    assert seen == ["a", "s49", "b"] and ui.frames == 1
+    # The next frame waits for the rest of the frame interval
+    now[0] += 0.04
+    ui.post("status", lambda: seen.append("late"))
+    assert tk.scheduled[0][0] == 60
+
+def test_failing_callback_does_not_drop_the_frame():
+    tk = _FakeTk()
+    ui = FrameBatcher(tk, fps=60)
+    seen = []
+    ui.dispatch(lambda: 1 / 0)
+    ui.dispatch(lambda: seen.append("after"))
+    tk.run_frame()
+    assert seen == ["after"] and isinstance(tk.errors[0], ZeroDivisionError)
+
+def test_job_progress_is_collapsed_to_the_latest_event():
+    tk = _FakeTk()
+    ui = FrameBatcher(tk, fps=60)
+    sched = JobScheduler(dispatch=ui.dispatch, coalesce=ui.post)
+    seen = []
+    def work(job):
+        for i in range(200):
+            job.report(done=i + 1, total=200)
+        return "ok"
+    job = sched.submit("a", work, on_done=lambda j: seen.append(("done", j.result)),
+                       on_progress=lambda j, p: seen.append(("progress", p["done"])), coalesce_progress=True)
+    deadline = time.monotonic() + 5
+    while job.status != DONE and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sched.shutdown(wait=True, timeout=5)  # joins the lane, so on_done has been queued too
+    tk.run_frame()
+    assert seen == [("progress", 200), ("done", "ok")] and job.result == "ok"
+
+def test_distinct_progress_events_are_all_delivered_by_default():
+    # e.g. the history panel: one "rows" event, then a thumbnail per row, all within one frame
+    tk = _FakeTk()
+    ui = FrameBatcher(tk, fps=60)
+    sched = JobScheduler(dispatch=ui.dispatch, coalesce=ui.post)
+    seen = []
+    def work(job):
+        job.report(rows=[0, 1, 2])
+        for i in range(3):
+            job.report(run_id=i, thumb=i)
+    job = sched.submit("history", work, on_progress=lambda j, p: seen.append(p))
+    deadline = time.monotonic() + 5
+    while job.status != DONE and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sched.shutdown(wait=True, timeout=5)
+    tk.run_frame()
+    assert seen == [{"rows": [0, 1, 2]}] + [{"run_id": i, "thumb": i} for i in range(3)]
+
+def test_fit_keeps_aspect_ratio():
+    assert _fit(Image.new("RGB", (1000, 500)), (320, 240)).size == (320, 160)
+    small = Image.new("RGB", (320, 160))
+    assert _fit(small, (320, 240)) is small
@@ -0,0 +1,35 @@
+import json
+import logging
+import queue
+
+from tkai.services import logger_service
+from tkai.services.logger_service import LoggerService
+
+def test_records_reach_file_ring_and_jsonl_after_flush(tmp_path):
+    logger = LoggerService(log_file=str(tmp_path / "a.log"), structured=True, console=False)
+    logger.info("hello", run_id="r1", duration_sec=0.5)
+    logger.flush()
+    assert "[INFO] hello" in (tmp_path / "a.log").read_text(encoding="utf-8")
+    assert logger.recent(1)[0].endswith("[INFO] hello")
+    record = json.loads((tmp_path / "a.jsonl").read_text(encoding="utf-8").splitlines()[-1])
+    assert record["msg"] == "hello" and record["run_id"] == "r1" and record["duration_sec"] == 0.5
+    # A second service on the same file shares the pipeline instead of opening the file twice
+    assert LoggerService(log_file=str(tmp_path / "a.log")).ring is logger.ring
+
+def test_size_rotation_and_bounded_ring(tmp_path):
+    logger = LoggerService(log_file=str(tmp_path / "r.log"), structured=False, max_bytes=400, backups=2,
+                           ring_size=5, console=False)
+    for i in range(50):
+        logger.info(f"line {i:03d} " + "x" * 40)
+    logger.flush()
+    assert sorted(p.name for p in tmp_path.glob("r.*")) == ["r.log", "r.log.1", "r.log.2"]
+    assert len(logger.ring) == 5 and logger.recent(1)[0].endswith("line 049 " + "x" * 40)
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logger_service._DroppingQueueHandler(queue.Queue(maxsize=3))  # nobody drains this queue
+    log = logging.getLogger("tkai.test_drop")
+    log.propagate = False
+    log.handlers[:] = [handler]
+    for i in range(10):
+        log.warning(f"w{i}")
+    assert handler.dropped == 7 and handler.queue.qsize() == 3
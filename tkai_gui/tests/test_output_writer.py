@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+from PIL import Image
+
+from tkai.services import output_writer
+from tkai.services.logger_service import LoggerService
+from tkai.services.output_writer import OutputWriter, get_writer, is_pending, wait_written
+
+def test_writes_in_background_and_flushes(tmp_path):
+    writer = OutputWriter(max_queue=4)
+    gate = threading.Event()
+    writer._enqueue(tmp_path / "blocker.json", lambda tmp: (gate.wait(5), tmp.write_text("{}")))
+    meta = {"ok": True, "predictions": [{"label": "cat"}]}
+    img_path = writer.save_image(Image.new("RGB", (8, 8), (255, 0, 0)), tmp_path, "a")
+    json_path = writer.save_json(meta, tmp_path, "a")
+    meta["later"] = 1  # edits after queueing must not leak into the file, nested ones included
+    meta["predictions"][0]["label"] = "dog"
+    assert img_path.suffix == ".png" and not img_path.exists() and is_pending(img_path)
+    gate.set()
+    assert writer.flush(timeout=5)
+    assert not is_pending(img_path) and Image.open(img_path).getpixel((0, 0)) == (255, 0, 0)
+    assert json.loads(json_path.read_text()) == {"ok": True, "predictions": [{"label": "cat"}]}
+    assert not list(tmp_path.glob(".*.tmp"))  # temp files were renamed into place
+    assert writer.stats()["written"] == 3
+    writer.close()
+    assert writer.flush() is True  # returns instead of waiting on a stopped thread
+    with pytest.raises(RuntimeError):
+        writer.save_json({}, tmp_path, "b")
+
+def test_wait_written_blocks_until_the_file_is_in_place(tmp_path):
+    writer = OutputWriter()
+    gate = threading.Event()
+    path = tmp_path / "slow.json"
+    writer._enqueue(path, lambda tmp: (gate.wait(5), tmp.write_text("{}")))
+    assert not wait_written(path, timeout=0.05)
+    threading.Timer(0.05, gate.set).start()
+    assert wait_written(path, timeout=5) and path.exists()
+    assert wait_written(tmp_path / "never-queued.json", timeout=0)
+    writer.close()
+
+def test_saves_racing_close_are_written_or_rejected(tmp_path):
+    for _ in range(20):
+        writer = OutputWriter()
+        paths, rejected = [], []
+        def save():
+            for i in range(50):
+                try:
+                    paths.append(writer.save_json({"i": i}, tmp_path, f"r{i}"))
+                except RuntimeError:
+                    rejected.append(i)
+                    return
+        saver = threading.Thread(target=save)
+        saver.start()
+        writer.close()
+        saver.join()
+        # Nothing accepted may end up behind the stop sentinel, or wait_written() would hang
+        assert all(wait_written(p, timeout=5) for p in paths)
+
+def test_failed_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_writer, "_default_writer", None)
+    logger = LoggerService(log_file=str(tmp_path / "w.log"), console=False)
+    writer = get_writer(logger)
+    def boom(tmp):
+        tmp.write_text("partial")
+        raise OSError("disk full")
+    out = tmp_path / "out"
+    out.mkdir()
+    writer._enqueue(out / "x.json", boom)
+    writer.flush(timeout=5)
+    assert writer.failed == 1 and not list(out.iterdir())
+    logger.flush()
+    assert "Failed to write" in logger.recent(1)[0] and "disk full" in (tmp_path / "w.log").read_text()
+    writer.close()
+
+def test_webp_and_compress_level(tmp_path):
+    with pytest.raises(ValueError):
+        OutputWriter(image_format="gif")
+    writer = OutputWriter(image_format="webp", quality=80)
+    path = writer.save_image(Image.new("RGB", (16, 16)), tmp_path, "w")
+    writer.close()
+    assert path.suffix == ".webp" and Image.open(path).format == "WEBP"
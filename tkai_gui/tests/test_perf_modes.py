@@ -0,0 +1,34 @@
+import pytest
+
+from tkai.config import DEFAULTS
+from tkai.models.perf_modes import PerfOptions, resolve_perf_mode, configure_for_size, effective_dtype
+
+def test_resolve_perf_mode():
+    assert resolve_perf_mode(None) == PerfOptions()
+    assert resolve_perf_mode("bf16").dtype == "bfloat16"
+    with pytest.raises(ValueError):
+        resolve_perf_mode("turbo-max")
+    # load-time options are part of the registry key, run-time ones are not
+    assert resolve_perf_mode("channels-last").build_key() != PerfOptions().build_key()
+    assert resolve_perf_mode("low-memory").build_key() == PerfOptions().build_key()
+
+def test_thread_counts_come_from_arguments_then_config(monkeypatch):
+    assert resolve_perf_mode("bf16", intra_op_threads=2).intra_op_threads == 2
+    assert resolve_perf_mode("bf16", intra_op_threads=2).dtype == "bfloat16"
+    monkeypatch.setitem(DEFAULTS, "t2i_inter_op_threads", 3)
+    opts = resolve_perf_mode(None)
+    assert (opts.intra_op_threads, opts.inter_op_threads) == (0, 3)
+    assert resolve_perf_mode(None, inter_op_threads=1).inter_op_threads == 1
+
+def test_auto_slicing_follows_image_size():
+    class _Pipe:
+        def __init__(self):
+            self.slicing = None
+        def enable_attention_slicing(self):
+            self.slicing = True
+        def disable_attention_slicing(self):
+            self.slicing = False
+    pipe, opts = _Pipe(), PerfOptions(large_image_px=128 * 128)
+    assert configure_for_size(pipe, opts, 64, 64) == {"attention_slicing": False, "vae_tiling": False}
+    assert configure_for_size(pipe, opts, 256, 256)["attention_slicing"] is True and pipe.slicing is True
+    assert effective_dtype(PerfOptions()) == "float32"
@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from tkai.services.io_utils import load_image, json_ready
+from tkai.services.preprocess import ImagePreprocessor, shortest_edge_size
+
+def _images():
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8)) for h, w in [(80, 90), (300, 120), (64, 64)]]
+
+def test_batch_matches_per_image_reference():
+    pre = ImagePreprocessor(resize=72, crop=(64, 64), mean=(0.5, 0.4, 0.3), std=(0.2, 0.25, 0.3), flip_channel_order=True)
+    out = pre(_images())
+    assert out.shape == (3, 3, 64, 64) and out.dtype == np.float32
+    for img, got in zip(_images(), out):
+        w, h = shortest_edge_size(img.width, img.height, 72)
+        r = img.resize((w, h), Image.BILINEAR)
+        left, top = (w - 64) // 2, (h - 64) // 2
+        arr = np.asarray(r.crop((left, top, left + 64, top + 64)), dtype=np.float32) / 255
+        ref = ((arr - (0.5, 0.4, 0.3)) / (0.2, 0.25, 0.3))[..., ::-1].transpose(2, 0, 1)
+        assert np.abs(ref - got).max() < 1e-5
+
+def test_from_hf_reads_processor_settings():
+    class _Proc:
+        do_resize, size = True, {"height": 32, "width": 48}
+        do_center_crop = False
+        do_rescale, rescale_factor = True, 1 / 255
+        do_normalize, image_mean, image_std = True, (0.5,) * 3, (0.5,) * 3
+        resample = 2
+    pre = ImagePreprocessor.from_hf(_Proc())
+    assert pre.output_size == (32, 48) and pre.min_decode_side == 48
+    out = pre([Image.new("RGB", (10, 10), (255, 0, 0))])
+    assert np.allclose(out[0, 0], 1.0) and np.allclose(out[0, 1], -1.0)
+    _Proc.crop_pct = 0.875  # unsupported option -> caller falls back to the processor itself
+    assert ImagePreprocessor.from_hf(_Proc()) is None
+
+def test_jpeg_draft_decode_keeps_min_side(tmp_path):
+    p = tmp_path / "big.jpg"
+    Image.new("RGB", (1600, 1200), (10, 200, 30)).save(p, quality=90)
+    assert load_image(p).size == (1600, 1200)
+    small = load_image(p, min_side=256)
+    assert small.size == (400, 300) and small.mode == "RGB"   # 1/4 scale, both sides still >= 256
+
+def test_json_ready_drops_preview():
+    assert json_ready({"ok": True, "preview_image": Image.new("RGB", (1, 1))}) == {"ok": True}
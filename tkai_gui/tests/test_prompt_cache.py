@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import torch
+from PIL import Image
+
+from tkai.models.prompt_cache import PromptEmbeddingCache, supports_prompt_embeds
+from tkai.models.registry import ModelRegistry
+from tkai.models.t2i_controller import TextToImageController
+from tkai.services.logger_service import LoggerService
+
+class _EmbedPipe:
+    """Encodes a prompt as its length; records what reached the text encoder and the pipeline call."""
+    _execution_device = "cpu"
+
+    def __init__(self):
+        self.encoded = []
+        self.calls = []
+
+    def encode_prompt(self, prompt, device, num_images_per_prompt, do_classifier_free_guidance, negative_prompt=None):
+        self.encoded.append(list(prompt))
+        return torch.stack([torch.full((4, 8), float(len(p))) for p in prompt]), None
+
+    def __call__(self, prompt=None, negative_prompt=None, prompt_embeds=None, negative_prompt_embeds=None,
+                 width=64, height=64, **kwargs):
+        self.calls.append({"prompt": prompt, "prompt_embeds": prompt_embeds, "negative_prompt_embeds": negative_prompt_embeds})
+        return SimpleNamespace(images=[Image.new("RGB", (width, height))])
+
+def test_cache_counts_hits_and_evicts_by_memory():
+    pipe = _EmbedPipe()
+    cache = PromptEmbeddingCache(max_mb=2 * 4 * 8 * 4 / 1024 / 1024)  # room for two embeddings
+    first = cache.encode(pipe, ("m",), ["a  fox", "blurry"])
+    again = cache.encode(pipe, ("m",), ["a fox", "blurry", "cat"])  # whitespace is normalized
+    assert pipe.encoded == [["a fox", "blurry"], ["cat"]]
+    assert torch.equal(again[0], first[0]) and again[0][0, 0, 0].item() == 5
+    assert cache.stats() == {"entries": 2, "mb": 0.0, "hits": 2, "misses": 3, "evictions": 1, "hit_rate": 0.4}
+    cache.encode(pipe, ("other-model",), ["cat"])
+    assert pipe.encoded[-1] == ["cat"]
+
+def test_controller_feeds_cached_embeddings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pipe = _EmbedPipe()
+    assert supports_prompt_embeds(pipe)
+    cache = PromptEmbeddingCache()
+    t2i = TextToImageController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry(), prompt_cache=cache)
+    t2i._pipe = pipe
+    assert t2i.run("a fox", negative_prompt="blurry", width=16, height=16, steps=1, guidance=0.0)["ok"]
+    # Without guidance the negative prompt is never encoded
+    assert pipe.calls[-1]["prompt"] is None and pipe.calls[-1]["negative_prompt_embeds"] is None
+    res = t2i.run("a fox", negative_prompt="blurry", width=16, height=16, steps=1, guidance=2.0)
+    assert pipe.encoded == [["a fox"], ["blurry"]]
+    assert pipe.calls[-1]["negative_prompt_embeds"][0, 0, 0].item() == 6
+    assert "encode" in res["telemetry"]["stages"] and t2i.summarize_info()["Prompt cache"].startswith("33% hits (1/3)")
@@ -0,0 +1,59 @@
+from tkai.services.result_cache import ResultCache
+from tkai.services.logger_service import LoggerService
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry
+
+def _write(path, data=b"x" * 10):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+def test_cache_hit_miss_and_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=2)
+    keys = [ResultCache.make_key("m", {"prompt": p}, {"seed": 1}) for p in "abc"]
+    for k, p in zip(keys, "abc"):
+        assert cache.get(k) is None
+        cache.put(k, {"ok": True, "json_path": _write(tmp_path / f"{p}.json"), "duration_sec": 3.0})
+    assert cache.get(keys[0]) is None  # evicted first
+    hit = cache.get(keys[2])
+    assert hit["cached"] is True and "duration_sec" not in hit
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 4, 1, 2)
+
+    # index survives a restart; entries whose files vanished are dropped
+    (tmp_path / "b.json").unlink()
+    reopened = ResultCache(tmp_path, max_entries=2)
+    assert reopened.get(keys[2]) is not None
+    assert reopened.get(keys[1]) is None
+
+def test_cache_byte_budget(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=25)
+    for i in range(3):
+        cache.put(f"k{i}", {"ok": True, "image_path": _write(tmp_path / f"{i}.png")})
+    assert cache.stats()["entries"] == 2
+
+def test_classifier_run_served_from_cache(tmp_path, monkeypatch, _isolated_history):
+    from PIL import Image
+    monkeypatch.chdir(tmp_path)
+    img = tmp_path / "in.png"
+    Image.new("RGB", (8, 8)).save(img)
+    calls = []
+    clf = ImageClassifierController(LoggerService(log_file="logs/test.log"), cache=ResultCache(tmp_path / "outputs"),
+                                     registry=ModelRegistry())
+    clf._pipe = lambda image, top_k=5: calls.append(1) or [{"label": "x", "score": 1.0}]
+    first = clf.run(str(img), top_k=1)
+    second = clf.run(str(img), top_k=1)
+    third = clf.run(str(img), top_k=2)
+    assert first["ok"] and second["cached"] and not third.get("cached")
+    assert second["json_path"] == first["json_path"]
+    assert len(calls) == 2
+    # the decoded input rides along for the viewer but is never persisted
+    assert first["preview_image"].size == (8, 8) and "preview_image" not in second
+    # A hit is its own run, describing the file that was asked for, even a byte-identical copy
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(img.read_bytes())
+    fourth = clf.run(str(copy), top_k=1)
+    assert fourth["cached"] and len(calls) == 2 and fourth["image_path"] == str(copy)
+    assert fourth["cached_from"] == first["run_id"] and fourth["run_id"] not in (first["run_id"], second["run_id"])
+    assert [r["image_path"] for r in _isolated_history.query(task="image-classification")].count(str(img)) == 3
+    assert _isolated_history.get(fourth["run_id"])["image_path"] == str(copy)
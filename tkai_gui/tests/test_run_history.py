@@ -0,0 +1,64 @@
+import json
+
+from tkai.services.run_history import RunHistory, new_run_id, run_stem
+
+def _clf(run_id, label, image="cat.jpg", score=0.9):
+    return {"ok": True, "task": "image-classification", "run_id": run_id, "model": "m/clf", "image_path": image,
+            "predictions": [{"label": label, "score": score}, {"label": "other", "score": 0.05}]}
+
+def test_record_query_and_filters(tmp_path):
+    h = RunHistory(tmp_path / "h.sqlite3")
+    h.record(_clf("a1", "tabby cat"))
+    h.record({"ok": True, "task": "text-to-image", "run_id": "b1", "model": "m/t2i", "prompt": "A 100% red_bike",
+              "seed": 3, "image_path": "x.png", "preview_image": object()})
+    h.record({"ok": True, "task": "text-to-image-batch", "run_id": "c", "model": "m/t2i",
+              "items": [{"task": "text-to-image", "prompt": "a dog", "seed": 1}, {"task": "text-to-image", "prompt": "a dog", "seed": 2}]})
+    assert h.count() == 4
+    assert [r["run_id"] for r in h.query(task="image-classification")] == ["a1"]
+    assert h.query(label="TABBY")[0]["top_label"] == "tabby cat"
+    assert [r["run_id"] for r in h.query(text="100% red_")] == ["b1"]  # LIKE wildcards are matched literally
+    assert h.count(text="100%_") == 0
+    assert {r["run_id"] for r in h.query(text="dog")} == {"c-0000", "c-0001"}
+    assert h.models() == ["m/clf", "m/t2i"]
+    assert "preview_image" not in h.get("b1")  # transient in-memory image is never stored
+    h.record(_clf("a1", "tabby cat"))  # re-recording is a no-op
+    assert h.count() == 4 and h.count(label="other") == 1
+    h.delete("a1")
+    assert h.count(label="tabby") == 0
+    h.record(_clf("d1", "t_shirt"))
+    assert h.count(label="T_S") == 1 and h.count(label="%") == 0 and h.count(label="t_%") == 0
+    h.close()
+
+def test_pagination_newest_first(tmp_path):
+    h = RunHistory(tmp_path / "h.sqlite3")
+    for i in range(7):
+        rows, labels = h._rows_for(_clf(f"r{i}", f"label{i}"), created_at=1000.0 + i)
+        with h._conn:
+            h._insert(rows, labels)
+    pages = [[r["run_id"] for r in h.query(limit=3, offset=o)] for o in (0, 3, 6)]
+    assert pages == [["r6", "r5", "r4"], ["r3", "r2", "r1"], ["r0"]]
+    assert [r["run_id"] for r in h.query(since=1002, until=1004)] == ["r3", "r2"]
+    h.close()
+
+def test_import_outputs_is_idempotent(tmp_path):
+    out = tmp_path / "outputs"
+    out.mkdir()
+    (out / "t2i_1.json").write_text(json.dumps({"ok": True, "task": "text-to-image", "prompt": "old run", "seed": 5}))
+    (out / "t2i_1.png").write_bytes(b"")
+    (out / "clf_1.json").write_text(json.dumps(_clf(None, "goldfish")))
+    (out / "notes.json").write_text("[1, 2]")
+    (out / "broken.json").write_text("{")
+    h = RunHistory(tmp_path / "h.sqlite3")
+    assert h.get_setting("imported_outputs") is None
+    assert h.import_outputs(out) == 2
+    assert h.import_outputs(out) == 0
+    assert h.get_setting("imported_outputs") is not None
+    row = h.query(text="old run")[0]
+    assert row["image_path"].endswith("t2i_1.png") and row["seed"] == 5
+    assert h.count(label="goldfish") == 1
+    h.close()
+
+def test_run_ids_and_stems_are_unique():
+    ids = {new_run_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert len({run_stem("t2i", i) for i in ids}) == 1000  # same-second runs no longer share a file name
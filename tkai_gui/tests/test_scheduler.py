@@ -0,0 +1,78 @@
+import queue
+import threading
+
+import pytest
+
+from tkai.services.scheduler import JobScheduler, DONE, FAILED, CANCELLED
+
+def _wait_all(jobs, timeout=5):
+    done = threading.Event()
+    remaining = set(j.id for j in jobs)
+    lock = threading.Lock()
+    def mark(job):
+        with lock:
+            remaining.discard(job.id)
+            if not remaining:
+                done.set()
+    for j in jobs:
+        j._on_done = mark
+    assert done.wait(timeout)
+
+def test_priority_and_fifo_order():
+    sched = JobScheduler(max_queue=8)
+    gate = threading.Event()
+    order = []
+    blocker = sched.submit("clf", lambda job: gate.wait(5))
+    jobs = [
+        sched.submit("clf", lambda job: order.append("low"), priority=10),
+        sched.submit("clf", lambda job: order.append("high-1"), priority=0),
+        sched.submit("clf", lambda job: order.append("high-2"), priority=0),
+    ]
+    gate.set()
+    _wait_all([blocker] + jobs)
+    assert order == ["high-1", "high-2", "low"]
+    assert all(j.status == DONE for j in jobs)
+    sched.shutdown(wait=True, timeout=2)
+
+def test_bounded_queue_and_cancel():
+    sched = JobScheduler(max_queue=1)
+    gate, started = threading.Event(), threading.Event()
+    running = sched.submit("t2i", lambda job: started.set() or (gate.wait(5) and {"ok": True}))
+    assert started.wait(5)
+    queued = sched.submit("t2i", lambda job: {"ok": True})
+    with pytest.raises(queue.Full):
+        sched.submit("t2i", lambda job: {"ok": True})
+    assert sched.cancel(queued.id)
+    assert queued.status == CANCELLED and queued.result["cancelled"]
+    replacement = sched.submit("t2i", lambda job: {"ok": True})  # the cancelled job's slot is free again
+    gate.set()
+    _wait_all([running, replacement])
+    assert running.status == DONE and replacement.status == DONE
+    sched.shutdown(wait=True, timeout=2)
+
+def test_shutdown_with_a_full_lane_does_not_block():
+    sched = JobScheduler(max_queue=1)
+    gate, started = threading.Event(), threading.Event()
+    running = sched.submit("t2i", lambda job: started.set() or gate.wait(5) and not job.cancelled)
+    assert started.wait(5)
+    waiting = sched.submit("t2i", lambda job: {"ok": True})
+    sched.shutdown()  # returns at once although the lane is full
+    assert waiting.status == CANCELLED and running.cancelled and sched.active() == [running]
+    gate.set()
+    sched.shutdown(wait=True, timeout=2)
+    assert running.status == DONE and running.result is False
+
+def test_progress_and_errors_are_dispatched():
+    dispatched = []
+    sched = JobScheduler(dispatch=lambda cb: (dispatched.append(cb), cb()))
+    events = []
+    finished = threading.Event()
+    def work(job):
+        job.report(done=1, total=2)
+        raise RuntimeError("boom")
+    job = sched.submit("clf", work, on_progress=lambda j, p: events.append(p), on_done=lambda j: finished.set())
+    assert finished.wait(5)
+    assert events == [{"done": 1, "total": 2}]
+    assert job.status == FAILED and job.result == {"ok": False, "error": "boom"}
+    assert len(dispatched) == 2
+    sched.shutdown(wait=True, timeout=2)
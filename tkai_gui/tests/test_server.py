@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+
+from PIL import Image
+
+from tkai.services.server import InferenceService, _handle_connection
+
+class _StubClassifier:
+    def __init__(self):
+        self.batches = []
+
+    def run(self, image_path, top_k=5):
+        self.batches.append([image_path])
+        if image_path.endswith("broken.png"):
+            return {"ok": False, "error": f"cannot identify image file {image_path!r}"}
+        return {"ok": True, "image_path": image_path, "predictions": [{"label": "x", "score": 1.0}]}
+
+    def run_batch(self, paths, batch_size=None, top_k=None):
+        self.batches.append(list(paths))
+        if any(p.endswith("broken.png") for p in paths):
+            return {"ok": False, "error": "cannot identify image file"}
+        return {"ok": True, "model": "stub", "json_path": "outputs/b.json",
+                "results": [{"image_path": p, "predictions": [{"label": "x", "score": 1.0}]} for p in paths]}
+
+class _BlockingGenerator:
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def run(self, **params):
+        self.gate.wait(5)
+        return {"ok": True, **params}
+
+def _images(tmp_path, n):
+    paths = []
+    for i in range(n):
+        p = tmp_path / f"{i}.png"
+        Image.new("RGB", (4, 4)).save(p)
+        paths.append(str(p))
+    return paths
+
+def test_concurrent_classify_requests_are_coalesced(tmp_path):
+    clf = _StubClassifier()
+    paths = _images(tmp_path, 5)
+
+    async def scenario():
+        svc = InferenceService(clf=clf, coalesce_ms=50)
+        await svc.start()
+        try:
+            replies = await asyncio.gather(*[
+                svc.handle("POST", "/classify", json.dumps({"image_path": p}).encode()) for p in paths])
+            missing = await svc.handle("POST", "/classify", b'{"image_path": "nope.png"}')
+            health = await svc.handle("GET", "/health")
+            return replies, missing, health, svc.metrics()
+        finally:
+            await svc.stop()
+
+    replies, missing, health, metrics = asyncio.run(scenario())
+    assert [status for status, _ in replies] == [200] * 5
+    assert [r["image_path"] for _, r in replies] == paths
+    assert clf.batches == [paths]
+    assert missing[0] == 400 and health[0] == 200
+    assert metrics["classify_batches"] == 1 and metrics["classify_batched_images"] == 5
+
+def test_one_bad_upload_only_fails_its_own_request(tmp_path):
+    clf = _StubClassifier()
+    paths = _images(tmp_path, 3)
+    (tmp_path / "broken.png").write_bytes(b"not an image")
+    paths.insert(1, str(tmp_path / "broken.png"))
+
+    async def scenario():
+        svc = InferenceService(clf=clf, coalesce_ms=50)
+        await svc.start()
+        try:
+            return await asyncio.gather(*[
+                svc.handle("POST", "/classify", json.dumps({"image_path": p}).encode()) for p in paths])
+        finally:
+            await svc.stop()
+
+    replies = asyncio.run(scenario())
+    assert [status for status, _ in replies] == [200, 500, 200, 200]
+    assert clf.batches == [paths] + [[p] for p in paths]  # the failed batch is retried one by one
+
+def test_malformed_content_length_gets_a_400():
+    async def scenario():
+        svc = InferenceService()
+        server = await asyncio.start_server(lambda r, w: _handle_connection(svc, r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /classify HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+            await writer.drain()
+            reply = await reader.read()
+            writer.close()
+            return reply
+
+    head, _, body = asyncio.run(scenario()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400") and "Content-Length" in json.loads(body)["error"]
+
+def test_generation_queue_applies_backpressure():
+    gen = _BlockingGenerator()
+
+    async def scenario():
+        svc = InferenceService(t2i=gen, gen_queue_size=1)
+        await svc.start()
+        try:
+            body = json.dumps({"prompt": "a cat"}).encode()
+            first = asyncio.create_task(svc.handle("POST", "/generate", body))
+            await asyncio.sleep(0.05)  # first is now running, queue empty
+            second = asyncio.create_task(svc.handle("POST", "/generate", body))
+            await asyncio.sleep(0.05)  # second waits in the queue
+            rejected = await svc.handle("POST", "/generate", body)
+            gen.gate.set()
+            return rejected, await first, await second, await svc.handle("POST", "/generate", b"{}")
+        finally:
+            await svc.stop()
+
+    rejected, first, second, empty = asyncio.run(scenario())
+    assert rejected[0] == 503
+    assert first[0] == 200 and second[0] == 200
+    assert empty[0] == 400
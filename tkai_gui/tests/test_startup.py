@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+from tkai.services.preload import preload_modules
+
+def test_ui_import_path_has_no_heavy_ml_modules():
+    code = ("import sys, tkai.ui.main_window; "
+            "print([m for m in ('torch', 'diffusers', 'transformers') if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_preload_reports_progress_and_missing_modules():
+    seen = []
+    timings = preload_modules(["json", "tkai_no_such_module"], on_progress=lambda m, i, n: seen.append((m, i, n)))
+    assert seen == [("json", 1, 2), ("tkai_no_such_module", 2, 2)]
+    assert timings["json"] >= 0 and timings["tkai_no_such_module"] == -1.0
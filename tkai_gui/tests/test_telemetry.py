@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tkai.models.clf_backends import ArrayImageClassifier
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.registry import ModelRegistry
+from tkai.services.logger_service import LoggerService
+from tkai.services.server import InferenceService
+from tkai.services.telemetry import MetricsRegistry, current_trace, percentile, stage, trace_run
+
+def test_percentiles_and_rolling_window():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == pytest.approx(2.5)
+    assert percentile([5.0], 0.99) == 5.0
+    m = MetricsRegistry(window=100)
+    for i in range(1, 201):  # only the last 100 samples (101..200 ms) count for the quantiles
+        m.observe("clf", "run", {"forward": i / 1000}, total=i / 1000)
+    forward = next(r for r in m.snapshot()["stages"] if r["stage"] == "forward")
+    assert forward["count"] == 200 and forward["window"] == 100
+    assert forward["p50_sec"] == pytest.approx(0.1505)
+    assert forward["p99_sec"] == pytest.approx(0.19901)
+    m.observe("clf", "run", {}, ok=False)
+    text = m.to_prometheus()
+    assert 'tkai_stage_seconds{controller="clf",op="run",stage="forward",quantile="0.95"}' in text
+    assert 'tkai_stage_seconds_count{controller="clf",op="run",stage="total"} 200' in text
+    assert 'tkai_errors_total{controller="clf",op="run"} 1' in text
+    assert "tkai_threads{kind=\"python\"}" in text
+
+def test_stage_is_a_noop_outside_a_run_and_traces_nest():
+    with stage("decode"):
+        pass
+    assert current_trace() is None
+    with trace_run() as outer:
+        with stage("decode"):
+            time.sleep(0.01)
+        with trace_run() as inner:
+            with stage("forward"):
+                pass
+        assert current_trace() is outer
+    assert outer.stages["decode"] >= 0.01 and "forward" not in outer.stages and "forward" in inner.stages
+
+def test_controller_reports_stage_spans(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.png"
+        Image.new("RGB", (8, 8)).save(p)
+        paths.append(str(p))
+    metrics = MetricsRegistry()
+    clf = ImageClassifierController(LoggerService(log_file="logs/test.log"), registry=ModelRegistry(),
+                                    metrics=metrics)
+    clf._pipe = ArrayImageClassifier(lambda x: x.mean(axis=(2, 3)),
+                                     lambda imgs: np.ones((len(imgs), 3, 2, 2), np.float32), {0: "a", 1: "b", 2: "c"})
+    res = clf.run(paths[0], top_k=1)
+    assert set(res["telemetry"]["stages"]) == {"validate", "decode", "preprocess", "forward", "postprocess", "save"}
+    assert res["telemetry"]["threads"]["python"] >= 1
+    batch = clf.run_batch(paths, batch_size=2, top_k=1)
+    assert batch["telemetry"]["stages"]["decode"] > 0  # measured on the prefetch thread
+    rows = {(r["op"], r["stage"]): r for r in metrics.snapshot()["stages"]}
+    assert rows[("run", "total")]["count"] == 1 and rows[("run_batch", "forward")]["count"] == 1
+    assert clf.run(str(tmp_path / "missing.png"))["ok"] is False
+
+def test_server_exposes_prometheus_text():
+    async def scenario():
+        svc = InferenceService()
+        await svc.start()
+        try:
+            return await svc.handle("GET", "/metrics/prometheus"), await svc.handle("GET", "/metrics")
+        finally:
+            await svc.stop()
+    (status, text), (_, as_json) = asyncio.run(scenario())
+    assert status == 200 and text.startswith("# HELP tkai_stage_seconds")
+    assert "process" in as_json["telemetry"]
@@ -0,0 +1,55 @@
+import os
+
+from PIL import Image
+
+from tkai.services.thumbnails import ThumbnailCache
+
+def test_thumbnails_are_persisted_and_invalidated(tmp_path):
+    src = tmp_path / "big.jpg"
+    Image.new("RGB", (800, 400), (0, 128, 255)).save(src, quality=95)
+    cache = ThumbnailCache(tmp_path / "thumbs", size=64)
+    thumb = cache.get(src)
+    assert thumb.size == (64, 32) and cache.stats() == {"hits": 0, "misses": 1}
+    stored = cache.cache_path(src)
+    assert stored.exists() and stored.is_relative_to(tmp_path / "thumbs")
+
+    reopened = ThumbnailCache(tmp_path / "thumbs", size=64)  # e.g. after an app restart
+    assert reopened.get(src).size == (64, 32) and reopened.stats() == {"hits": 1, "misses": 0}
+    assert reopened.get(src, size=32).size == (32, 16)  # other sizes are cached separately
+
+    Image.new("RGB", (100, 100), (255, 0, 0)).save(src)
+    os.utime(src, ns=(stored.stat().st_mtime_ns + 10**9,) * 2)
+    assert reopened.cache_path(src) != stored
+    assert reopened.get(src).getpixel((10, 10))[0] > 200  # rebuilt from the new content
+
+def test_unreadable_sources_are_skipped(tmp_path):
+    good = tmp_path / "a.png"
+    Image.new("RGB", (20, 10)).save(good)
+    (tmp_path / "bad.png").write_bytes(b"not an image")
+    cache = ThumbnailCache(tmp_path / "thumbs", size=16)
+    assert cache.get(tmp_path / "missing.png") is None
+    got = list(cache.iter_thumbnails([tmp_path / "missing.png", tmp_path / "bad.png", good]))
+    assert [p for p, _ in got] == [str(good)] and got[0][1].size == (16, 8)
+
+def test_cache_is_capped_least_recently_used_first(tmp_path):
+    sources = []
+    for i in range(6):
+        sources.append(tmp_path / f"{i}.png")
+        Image.effect_noise((64, 64), 60 + i).save(sources[-1])
+    cache = ThumbnailCache(tmp_path / "thumbs", size=64, max_mb=0)
+    for src in sources:
+        cache.get(src)
+    entries = [cache.cache_path(src) for src in sources]
+    for i, entry in enumerate(entries):
+        os.utime(entry, ns=(10**18 + i * 10**9,) * 2)  # 0 is the least recently used
+    cache.get(sources[0])  # a hit makes it the most recently used
+    sizes = [e.stat().st_size for e in entries]
+    assert cache.prune(max_bytes=sum(sizes) - sizes[1]) == 1
+    assert [e.exists() for e in entries] == [True, False, True, True, True, True]
+
+    capped = ThumbnailCache(tmp_path / "thumbs", size=64, max_mb=sum(sizes) * 3 / 1024 / 1024)
+    capped.get(sources[1], size=32)  # the first store scans the folder; still under the cap
+    assert all(e.exists() for e in entries if e != entries[1])
+    capped.max_bytes = sum(sizes) // 2
+    capped.get(sources[1], size=48)
+    assert sum(f.stat().st_size for f in (tmp_path / "thumbs").glob("*/*.jpg")) <= capped.max_bytes * 0.9
@@ -0,0 +1,318 @@
+"""
+Headless command-line runner for the model controllers.
+
+Reads JSONL (one request per line; a plain line is taken as the prompt / image path) from a file
+or stdin and streams one JSON result per line to stdout or --output. Results and sidecars are
+written to outputs/ exactly as in the GUI. Tkinter is never imported and torch/diffusers/
+transformers are only imported once a model is actually needed.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, IO, Iterator, List, Tuple
+
+from tkai.config import DEFAULTS
+from tkai.models.clf_backends import BACKENDS
+from tkai.models.perf_modes import PERF_MODES
+from tkai.services.logger_service import LoggerService
+from tkai.services.io_utils import json_ready, validate_image_path
+from tkai.services.result_cache import ResultCache
+
+GENERATE_FIELDS = ("prompt", "negative_prompt", "width", "height", "steps", "guidance", "seed")
+CLASSIFY_FIELDS = ("image_path", "top_k")
+
+def read_requests(stream: IO[str], key: str, on_error: Callable[[int, str], None]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (line_number, request) pairs, skipping blank lines. Lines that are not valid JSON objects
+    or lack `key` are passed to on_error(line_number, message) instead, and reading continues.
+    """
+    for n, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                req = json.loads(line)
+            except ValueError as e:
+                on_error(n, f"Malformed JSON: {e}")
+                continue
+        else:
+            req = {key: line}
+        if not isinstance(req, dict) or not str(req.get(key) or "").strip():
+            on_error(n, f"Missing '{key}'")
+            continue
+        yield n, req
+
+def write_result(out: IO[str], result: Dict[str, Any]):
+    out.write(json.dumps(json_ready(result), default=str) + "\n")
+    out.flush()
+
+class _Results:
+    """Streams one record per input line and counts failures for the exit code."""
+    def __init__(self, out: IO[str]):
+        self.out = out
+        self.failures = 0
+
+    def write(self, line_no: int, res: Dict[str, Any]):
+        self.failures += not res.get("ok")
+        write_result(self.out, {"line": line_no, **res})
+
+    def reject(self, line_no: int, error: str, **fields: Any):
+        self.write(line_no, {"ok": False, "error": error, **fields})
+
+    @property
+    def exit_code(self) -> int:
+        return 1 if self.failures else 0
+
+def export_metrics(path: str):
+    from tkai.services.telemetry import get_metrics
+    metrics = get_metrics()
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith((".prom", ".txt")):
+            f.write(metrics.to_prometheus())
+        else:
+            json.dump(metrics.snapshot(), f, indent=2)
+
+def _pick(req: Dict[str, Any], fields) -> Dict[str, Any]:
+    return {k: req[k] for k in fields if req.get(k) is not None}
+
+def _make_cache(args) -> ResultCache | None:
+    if args.no_cache:
+        return None
+    return ResultCache("outputs", max_entries=DEFAULTS["cache_max_entries"],
+                       max_bytes=DEFAULTS["cache_max_mb"] * 1024 * 1024)
+
+def cmd_generate(args, logger: LoggerService, src: IO[str], out: IO[str]) -> int:
+    from tkai.models.t2i_controller import TextToImageController
+    ctrl = TextToImageController(logger, cache=_make_cache(args), model_name=args.model, perf_mode=args.perf_mode,
+                                 intra_op_threads=args.threads, inter_op_threads=args.interop_threads)
+    results = _Results(out)
+    for line_no, req in read_requests(src, "prompt", results.reject):
+        params = _pick(req, GENERATE_FIELDS)
+        for k in ("width", "height", "steps", "guidance", "seed"):
+            if k not in params and getattr(args, k, None) is not None:
+                params[k] = getattr(args, k)
+        results.write(line_no, ctrl.run(**params))
+    return results.exit_code
+
+def cmd_classify(args, logger: LoggerService, src: IO[str], out: IO[str]) -> int:
+    from tkai.models.clf_controller import ImageClassifierController
+    ctrl = ImageClassifierController(logger, cache=_make_cache(args), model_name=args.model,
+                                     backend=args.backend, workers=args.workers)
+    results = _Results(out)
+    if args.batch_size and args.batch_size > 1:
+        # Requests are grouped so each chunk becomes one batched run
+        chunk: List[Tuple[int, str, int]] = []  # (line, path, top_k)
+        def flush():
+            if not chunk:
+                return
+            # One pass at the largest top_k; predictions are sorted, so each line keeps its own prefix
+            res = ctrl.run_batch([p for _, p, _ in chunk], batch_size=args.batch_size,
+                                 top_k=max(k for _, _, k in chunk),
+                                 dedup=not args.no_dedup, dedup_threshold=args.dedup_threshold)
+            if not res.get("ok"):
+                # Usually one undecodable file; retry one by one so only that line fails
+                logger.warning(f"Batch of {len(chunk)} failed ({res.get('error')}); classifying its images one by one")
+                for line_no, path, top_k in chunk:
+                    results.write(line_no, ctrl.run(path, top_k=top_k))
+            else:
+                for (line_no, _, top_k), item in zip(chunk, res["results"]):
+                    results.write(line_no, {"ok": True, "task": "image-classification", "model": res["model"],
+                                            "top_k": top_k, "batch_json_path": res["json_path"],
+                                            **item, "predictions": item["predictions"][:top_k]})
+                logger.info(f"Batch of {len(chunk)}: {res['images_per_sec']:.2f} img/s", dedup=res.get("dedup"))
+            chunk.clear()
+        for line_no, req in read_requests(src, "image_path", results.reject):
+            path = str(req["image_path"])
+            try:
+                validate_image_path(path)
+                top_k = int(req.get("top_k") or args.top_k)
+            except (ValueError, TypeError, OSError) as e:
+                results.reject(line_no, str(e), image_path=path)
+                continue
+            chunk.append((line_no, path, top_k))
+            if len(chunk) >= args.batch_size * args.chunk_batches:
+                flush()
+        flush()
+    else:
+        for line_no, req in read_requests(src, "image_path", results.reject):
+            params = _pick(req, CLASSIFY_FIELDS)
+            params.setdefault("top_k", args.top_k)
+            results.write(line_no, ctrl.run(**params))
+    return results.exit_code
+
+def cmd_pick(args, logger: LoggerService, src: IO[str], out: IO[str]) -> int:
+    from tkai.models.chain import Chain, Classify, Draft, Filter, Generate, Refine, Save
+    from tkai.models.t2i_controller import TextToImageController
+    from tkai.models.clf_controller import ImageClassifierController
+    t2i = TextToImageController(logger, model_name=args.t2i_model, perf_mode=args.perf_mode,
+                                intra_op_threads=args.threads, inter_op_threads=args.interop_threads)
+    clf = ImageClassifierController(logger, model_name=args.clf_model, backend=args.backend, workers=args.workers)
+    results = _Results(out)
+    for line_no, req in read_requests(src, "prompt", results.reject):
+        negative = req.get("negative_prompt") or ""
+        try:
+            # `"seed": null` means "no seed on this line", like a missing key
+            seed = int(req.get("seed") if req.get("seed") is not None else args.seed)
+        except (ValueError, TypeError) as e:
+            results.reject(line_no, f"Invalid seed: {e}", prompt=req["prompt"])
+            continue
+        pick_best = Filter(label=req.get("label") or args.label, min_score=args.min_score, keep=args.keep)
+        if args.draft:
+            # Rank cheap drafts, then render only the keepers at full size with their own seeds
+            stages = [Draft(t2i, [req["prompt"]], negative_prompt=negative, num_images_per_prompt=args.candidates,
+                            base_seed=seed),
+                      Classify(clf, top_k=args.top_k), pick_best,
+                      Refine(t2i, negative_prompt=negative, strength=args.refine_strength, steps=args.refine_steps,
+                             width=args.width or DEFAULTS["image_size"][0],
+                             height=args.height or DEFAULTS["image_size"][1]),
+                      Classify(clf, top_k=args.top_k)]  # predictions for the final images
+        else:
+            stages = [Generate(t2i, [req["prompt"]], negative_prompt=negative,
+                               num_images_per_prompt=args.candidates, base_seed=seed,
+                               width=args.width, height=args.height, steps=args.steps)]
+            if args.refine_strength:
+                stages.append(Refine(t2i, strength=args.refine_strength, steps=args.refine_steps))
+            stages += [Classify(clf, top_k=args.top_k), pick_best]
+        if not args.no_save:
+            stages.append(Save(prefix="pick"))
+        results.write(line_no, {"prompt": req["prompt"], **Chain(logger, *stages).run()})
+    return results.exit_code
+
+def cmd_serve(args, logger: LoggerService, src: IO[str], out: IO[str]) -> int:
+    import asyncio
+    from tkai.models.t2i_controller import TextToImageController
+    from tkai.models.clf_controller import ImageClassifierController
+    from tkai.services.server import InferenceService, serve
+    cache = _make_cache(args)
+    t2i = TextToImageController(logger, cache=cache, model_name=args.t2i_model, perf_mode=args.perf_mode,
+                                intra_op_threads=args.threads, inter_op_threads=args.interop_threads)
+    clf = ImageClassifierController(logger, cache=cache, model_name=args.clf_model, backend=args.backend,
+                                    workers=args.workers)
+    service = InferenceService(t2i=t2i, clf=clf, coalesce_ms=args.coalesce_ms, max_batch=args.max_batch,
+                               gen_queue_size=args.gen_queue)
+    if args.preload:
+        for ctrl in (t2i, clf):
+            res = ctrl.load_model()
+            if not res.get("ok"):
+                logger.error(f"Preloading {ctrl.model_name} failed: {res.get('error')}")
+                return 1
+            logger.info(f"Preloaded {ctrl.model_name}: {res.get('load_sec', 0):.1f}s load, "
+                        f"{res.get('warmup_sec', 0):.1f}s warm-up, RSS {res.get('rss_mb') or 0:.0f} MB")
+    logger.info(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tkai", description="Headless runner for the Tkinter AI GUI models.")
+    parser.add_argument("--log-file", default="logs/cli.log")
+    parser.add_argument("--metrics-out", help="Write per-stage latency percentiles, RSS and thread counts here on exit "
+                                              "(Prometheus text for .prom/.txt, JSON otherwise)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_io(p):
+        p.add_argument("-i", "--input", default="-", help="JSONL request file, or - for stdin (default)")
+        p.add_argument("-o", "--output", default="-", help="JSONL result file, or - for stdout (default)")
+        p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache")
+
+    def add_threads(p):
+        p.add_argument("--threads", type=int, default=DEFAULTS["t2i_intra_op_threads"],
+                       help="Torch intra-op threads for text-to-image (0 = perf mode / torch default)")
+        p.add_argument("--interop-threads", type=int, default=DEFAULTS["t2i_inter_op_threads"],
+                       help="Torch inter-op threads (0 = torch default)")
+
+    gen = sub.add_parser("generate", help="Text-to-image; one prompt per line")
+    add_io(gen)
+    gen.add_argument("--model", default=DEFAULTS["t2i_model"])
+    gen.add_argument("--width", type=int)
+    gen.add_argument("--height", type=int)
+    gen.add_argument("--steps", type=int)
+    gen.add_argument("--guidance", type=float)
+    gen.add_argument("--seed", type=int, help="Default seed for lines without one")
+    gen.add_argument("--perf-mode", choices=list(PERF_MODES), default=DEFAULTS["t2i_perf_mode"])
+    add_threads(gen)
+    gen.set_defaults(func=cmd_generate)
+
+    clf = sub.add_parser("classify", help="Image classification; one image path per line")
+    add_io(clf)
+    clf.add_argument("--model", default=DEFAULTS["clf_model"])
+    clf.add_argument("--top-k", type=int, default=DEFAULTS["clf_topk"])
+    clf.add_argument("--backend", choices=list(BACKENDS), default=DEFAULTS["clf_backend"])
+    clf.add_argument("--workers", type=int, default=DEFAULTS["clf_workers"],
+                     help="Classifier worker processes (1 = in-process)")
+    clf.add_argument("--batch-size", type=int, default=1, help="Use batched run_batch() with this batch size")
+    clf.add_argument("--chunk-batches", type=int, default=16,
+                     help="Batches collected per run_batch() call (and per consolidated JSON)")
+    clf.add_argument("--no-dedup", action="store_true",
+                     help="Classify every file even if it duplicates another one in the same run_batch() call")
+    clf.add_argument("--dedup-threshold", type=int,
+                     help="Also merge near duplicates within this many perceptual-hash bits (default -1 = exact copies only)")
+    clf.set_defaults(func=cmd_classify)
+
+    pick = sub.add_parser("pick", help="Generate candidates per prompt in memory, keep the best-classified ones")
+    pick.add_argument("-i", "--input", default="-", help="JSONL request file, or - for stdin (default)")
+    pick.add_argument("-o", "--output", default="-", help="JSONL result file, or - for stdout (default)")
+    pick.add_argument("--t2i-model", default=DEFAULTS["t2i_model"])
+    pick.add_argument("--clf-model", default=DEFAULTS["clf_model"])
+    pick.add_argument("--perf-mode", choices=list(PERF_MODES), default=DEFAULTS["t2i_perf_mode"])
+    add_threads(pick)
+    pick.add_argument("--backend", choices=list(BACKENDS), default=DEFAULTS["clf_backend"])
+    pick.add_argument("--workers", type=int, default=DEFAULTS["clf_workers"])
+    pick.add_argument("--candidates", type=int, default=4, help="Images generated per prompt (seeds seed, seed+1, ...)")
+    pick.add_argument("--seed", type=int, default=0)
+    pick.add_argument("--width", type=int)
+    pick.add_argument("--height", type=int)
+    pick.add_argument("--steps", type=int)
+    pick.add_argument("--draft", action="store_true",
+                      help="Rank low-resolution drafts (DEFAULTS draft_size/draft_steps) and refine only the kept "
+                           "ones to --width x --height")
+    pick.add_argument("--refine-strength", type=float, help="Add an img2img refinement pass with this strength")
+    pick.add_argument("--refine-steps", type=int)
+    pick.add_argument("--top-k", type=int, default=DEFAULTS["clf_topk"])
+    pick.add_argument("--label", help="Rank by the score of labels containing this text (default: top-1 score)")
+    pick.add_argument("--min-score", type=float)
+    pick.add_argument("--keep", type=int, default=1, help="Candidates kept per prompt")
+    pick.add_argument("--no-save", action="store_true", help="Only report the picks; write no images")
+    pick.set_defaults(func=cmd_pick)
+
+    srv = sub.add_parser("serve", help="Local HTTP service: /generate, /classify, /health, /metrics")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=DEFAULTS["server_port"])
+    srv.add_argument("--t2i-model", default=DEFAULTS["t2i_model"])
+    srv.add_argument("--clf-model", default=DEFAULTS["clf_model"])
+    srv.add_argument("--perf-mode", choices=list(PERF_MODES), default=DEFAULTS["t2i_perf_mode"])
+    add_threads(srv)
+    srv.add_argument("--backend", choices=list(BACKENDS), default=DEFAULTS["clf_backend"],
+                     help="Classifier inference backend")
+    srv.add_argument("--workers", type=int, default=DEFAULTS["clf_workers"],
+                     help="Classifier worker processes (1 = in-process)")
+    srv.add_argument("--coalesce-ms", type=float, default=DEFAULTS["server_coalesce_ms"])
+    srv.add_argument("--max-batch", type=int, default=DEFAULTS["server_max_batch"])
+    srv.add_argument("--gen-queue", type=int, default=DEFAULTS["server_gen_queue"])
+    srv.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache")
+    srv.add_argument("--preload", action="store_true", help="Load and warm up both models before accepting requests")
+    srv.set_defaults(func=cmd_serve, input="-", output="-")
+    return parser
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    os.makedirs("outputs", exist_ok=True)
+    logger = LoggerService(log_file=args.log_file)
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        return args.func(args, logger, src, out)
+    finally:
+        from tkai.services.output_writer import get_writer
+        get_writer(logger).flush()  # outputs are written in the background; finish them before exiting
+        if args.metrics_out:
+            export_metrics(args.metrics_out)
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
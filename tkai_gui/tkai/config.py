@@ -3,14 +3,72 @@ from dataclasses import dataclass
 DEFAULTS = {
     "t2i_model": "stabilityai/sd-turbo",
     "clf_model": "apple/mobilevit-xx-small",
+    "t2i_models": ["stabilityai/sd-turbo", "stabilityai/sdxl-turbo"],
+    "clf_models": ["apple/mobilevit-xx-small", "apple/mobilevit-small", "google/vit-base-patch16-224", "microsoft/resnet-50"],
     "image_size": (256, 256),
     "t2i_steps": 2,
     "t2i_guidance": 0.0,
+    "t2i_batch_size": 4,
+    "t2i_perf_mode": "default",  # see tkai.models.perf_modes.PERF_MODES
+    "t2i_intra_op_threads": 0,   # torch intra-op threads for text-to-image (0 = the perf mode's / torch default)
+    "t2i_inter_op_threads": 0,   # torch inter-op threads; settable once per process, before parallel work starts
+    "img2img_strength": 0.5,     # refinement pass of a chain; runs int(steps * strength) denoising steps
+    "draft_size": (128, 128),    # draft-then-refine: cheap previews rendered at this size...
+    "draft_steps": 1,            # ...with this many steps
+    "draft_count": 8,            # drafts rendered per prompt
+    "draft_keep": 2,             # drafts the classifier picks for refinement to image_size
     "clf_topk": 5,
+    "clf_batch_size": 8,
+    "clf_dedup": True,           # folder runs classify each group of duplicate files once
+    "clf_dedup_threshold": -1,   # -1 = exact copies only; >= 0 also merges perceptual near duplicates (e.g. 4 bits)
+    "clf_backend": "eager",      # "eager" | "int8" | "onnx", see tkai.models.clf_backends
+    "clf_workers": 1,            # >1 runs the classifier in that many worker processes (tkai.models.clf_pool)
+    "clf_worker_start_timeout": 600,  # seconds; covers a first-time model download / ONNX export
+    "onnx_cache_dir": "models_cache/onnx",
+    "io_workers": 4,
+    "jpeg_draft": True,          # decode large JPEGs at reduced scale when the model needs less
+    "preview_max_px": 512,       # smallest side kept when a decoded input is also shown in the viewer
+    "output_image_format": "png",  # "png" | "webp" | "jpeg"
+    "png_compress_level": 1,     # 0-9; PIL's default of 6 is several times slower to encode
+    "output_quality": 90,        # webp / jpeg
+    "writer_queue_size": 64,
+    "history_db": "outputs/history.sqlite3",
+    "history_page_size": 50,
+    "thumb_cache_dir": "outputs/.thumbs",
+    "thumb_px": 128,
+    "thumb_cache_max_mb": 200,   # least recently used thumbnails are deleted beyond this (0 = unbounded)
+    "gallery_photo_cache": 256,  # Tk PhotoImages kept alive by the gallery (LRU)
+    "job_queue_size": 32,
+    "ui_fps": 30,                # UI updates from jobs are applied at most this many times per second
+    "console_max_lines": 2000,   # the console pane drops older lines beyond this
+    "viewer_resize_debounce_ms": 120,  # re-fit the image this long after the last window resize
+    "metrics_window": 500,       # samples per (controller, op, stage) kept for p50/p95/p99
+    "log_max_mb": 10,            # rotate the text (and JSON-lines) log at this size...
+    "log_backups": 5,            # ...keeping this many old files
+    "log_rotate_when": None,     # or a TimedRotatingFileHandler interval such as "midnight"
+    "log_json": True,            # also write <log>.jsonl with structured fields (run IDs, timings)
+    "log_ring_size": 1000,       # recent lines kept in memory for the GUI
+    "log_queue_size": 10000,     # records waiting for the writer thread; beyond this they are dropped
+    "preload_modules": True,
+    "preload_models": (),        # lanes ("t2i", "clf") whose model loads in the background after startup
+    "warmup_on_load": True,      # one tiny forward pass right after loading
+    "t2i_warmup_px": 64,
+    "cache_max_entries": 1000,
+    "cache_max_mb": 2048,
+    "prompt_cache_mb": 64,       # text-encoder embeddings kept in RAM (LRU); 0 disables the cache
+    "model_ram_budget_mb": 6144,
+    "server_port": 8765,
+    "server_coalesce_ms": 10,
+    "server_max_batch": 32,
+    "server_gen_queue": 4,
     "prompt_maxlen": 300,
 }
 
 MODEL_DESCRIPTIONS = {
     "stabilityai/sd-turbo": "Fast text-to-image generation model (diffusers), good for quick drafts.",
     "apple/mobilevit-xx-small": "Tiny MobileViT classifier suitable for CPU-bound inference.",
+    "stabilityai/sdxl-turbo": "Larger SDXL distilled text-to-image model; better quality, much heavier on CPU.",
+    "apple/mobilevit-small": "Larger MobileViT classifier; more accurate, still CPU-friendly.",
+    "google/vit-base-patch16-224": "ViT-Base ImageNet classifier; accurate but heavier.",
+    "microsoft/resnet-50": "Classic ResNet-50 ImageNet classifier.",
 }
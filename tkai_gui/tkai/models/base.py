@@ -2,19 +2,47 @@ from __future__ import annotations
 import functools
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 from tkai.services.logger_service import LoggerService
+from tkai.services.output_writer import OutputWriter, get_writer
+from tkai.services.result_cache import ResultCache
+from tkai.services.run_history import RunHistory, get_history, new_run_id
+from tkai.services.telemetry import MetricsRegistry, get_metrics, resource_snapshot, stage, trace_run
+from tkai.models.registry import ModelRegistry, get_registry
+from tkai.config import DEFAULTS
 
 def measure_time(func):
-    """Decorator to measure execution time and add 'duration_sec' in return dict (if dict)."""
+    """
+    Decorator to trace the call: stages marked with telemetry.stage() inside it are timed with perf_counter.
+    Adds 'duration_sec' and 'telemetry' (stage seconds, RSS, thread counts) to dict results and reports
+    to the controller's MetricsRegistry (self._metrics) under (task, method name).
+    """
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        t0 = time.time()
-        result = func(self, *args, **kwargs)
-        dt = time.time() - t0
+        metrics = getattr(self, "_metrics", None)
+        with trace_run() as trace:
+            try:
+                result = func(self, *args, **kwargs)
+            except Exception:
+                if metrics is not None:
+                    metrics.observe(self._task, func.__name__, {}, ok=False)
+                raise
+        dt = trace.elapsed()
         if isinstance(result, dict):
             result.setdefault("duration_sec", dt)
+            if result.get("ok"):
+                resources = resource_snapshot()
+                result["telemetry"] = {"stages": dict(trace.stages), **resources}
+                if metrics is not None:
+                    metrics.observe(self._task, func.__name__, trace.stages, total=dt, resources=resources)
+                if result.get("run_id") and hasattr(self, "_logger"):
+                    self._logger.info(f"{self._task} {func.__name__} finished in {dt:.3f}s", run_id=result["run_id"],
+                                      task=self._task, op=func.__name__, duration_sec=round(dt, 4),
+                                      stages={k: round(v, 4) for k, v in trace.stages.items()},
+                                      rss_mb=resources.get("rss_mb"))
+            elif metrics is not None and not result.get("cancelled"):
+                metrics.observe(self._task, func.__name__, {}, ok=False)
         return result
     return wrapper
 
@@ -31,30 +59,150 @@ def catch_exceptions(func):
     return wrapper
 
 def require_loaded(func):
-    """Ensure model is loaded before running."""
+    """Ensure the model is loaded (lazily, on first use) and hold it for the duration of the call."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self._loaded:
+            res = self.load_model()
+            if not res.get("ok"):
+                return res
+        with self._registry.hold(self._registry_key(), self._load_pipeline):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+def cached_result(key_method: str, refresh: str | None = None):
+    """
+    Serve repeated requests from the controller's ResultCache (self._cache); place inside @recorded.
+    `key_method` names a method taking the same arguments and returning a cache key, or None if uncacheable.
+    `refresh` optionally names a method `(hit, *args, **kwargs)` that rewrites the fields of a hit that
+    describe this request rather than the cached run (e.g. the path of a byte-identical input file).
+    A hit is a new run: it gets a fresh run_id, with the producing run's ID under "cached_from".
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "_cache", None)
+            key = getattr(self, key_method)(*args, **kwargs) if cache is not None else None
+            if key is not None:
+                t0 = time.perf_counter()
+                hit = cache.get(key)
+                if hit is not None:
+                    self._logger.info(f"Cache hit for {func.__name__} ({key[:12]})")
+                    hit.pop("telemetry", None)  # belongs to the run that produced the entry
+                    hit["cached_from"] = hit.get("run_id")
+                    hit["run_id"] = new_run_id()
+                    if refresh is not None:
+                        getattr(self, refresh)(hit, *args, **kwargs)
+                    hit["duration_sec"] = time.perf_counter() - t0
+                    return hit
+            result = func(self, *args, **kwargs)
+            if key is not None and isinstance(result, dict) and result.get("ok"):
+                cache.put(key, result)
+            return result
+        return wrapper
+    return decorator
+
+def recorded(func):
+    """Write successful results through to the run history (self._history); place outside @measure_time."""
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        if not getattr(self, "_loaded", False):
-            return {"ok": False, "error": "Model not loaded yet. Click 'Load Model' first."}
-        return func(self, *args, **kwargs)
+        result = func(self, *args, **kwargs)
+        history = getattr(self, "_history", None)
+        if history is not None and isinstance(result, dict) and result.get("ok"):
+            try:
+                history.record(result)
+            except Exception as e:
+                # History is an index over the outputs; never fail the run because of it
+                self._logger.warning(f"Could not record run {result.get('run_id')}: {e}")
+        return result
     return wrapper
 
 class BaseModelController(ABC):
     """
     Abstract base for model controllers.
     Demonstrates encapsulation via protected attrs: _model, _name, _category, _loaded.
+    Loaded pipelines live in a shared ModelRegistry; `_pipe` and `_loaded` are views onto it.
     """
-    def __init__(self, logger: LoggerService):
+    def __init__(self, logger: LoggerService, cache: Optional[ResultCache] = None,
+                 registry: Optional[ModelRegistry] = None, writer: Optional[OutputWriter] = None,
+                 history: Optional[RunHistory] = None, metrics: Optional[MetricsRegistry] = None):
         self._logger = logger
+        self._cache = cache
+        self._registry = registry or get_registry()
+        self._writer = writer or get_writer(logger)
+        self._history = history or get_history()
+        self._metrics = metrics or get_metrics()
         self._model: Any = None
         self._name: str = "Base"
         self._category: str = "Generic"
-        self._loaded: bool = False
+        self._task: str = "generic"
+        self._last_load: Dict[str, float] = {}
 
-    @abstractmethod
+    def _registry_key(self) -> Tuple[str, str]:
+        return (self._task, self._name)
+
+    @property
+    def _pipe(self) -> Any:
+        return self._registry.peek(self._registry_key())
+
+    @_pipe.setter
+    def _pipe(self, pipe: Any):
+        self._registry.put(self._registry_key(), pipe)
+
+    @property
+    def _loaded(self) -> bool:
+        return self._pipe is not None
+
+    @property
+    def model_name(self) -> str:
+        return self._name
+
+    def set_model(self, name: str) -> None:
+        """Switch checkpoints; the previous one stays in the registry until evicted."""
+        self._name = name
+
+    @catch_exceptions
+    @measure_time
     def load_model(self) -> Dict[str, Any]:
+        """
+        Load (or share) the pipeline. A fresh load reports 'load_sec', 'warmup_sec' and 'rss_delta_mb'
+        next to the process's current and peak RSS.
+        """
+        before = resource_snapshot()["rss_mb"]
+        _, loaded_now = self._registry.load(self._registry_key(), self._load_pipeline)
+        after = resource_snapshot()
+        res = {"ok": True, "model": self._name, "device": "cpu", "shared": not loaded_now,
+               "rss_mb": after["rss_mb"], "peak_rss_mb": after["peak_rss_mb"]}
+        if loaded_now:
+            res.update(self._last_load)
+            if before is not None and after["rss_mb"] is not None:
+                res["rss_delta_mb"] = after["rss_mb"] - before
+        return res
+
+    def _load_pipeline(self) -> Any:
+        """Registry loader: build the pipeline, then warm it up so the first real run is not slower."""
+        t0 = time.perf_counter()
+        with stage("load"):
+            pipe = self._build_pipeline()
+        t1 = time.perf_counter()
+        if DEFAULTS["warmup_on_load"]:
+            with stage("warmup"):
+                try:
+                    self._warm_up(pipe)
+                except Exception as e:
+                    # Only an optimisation; a real run will surface real problems
+                    self._logger.warning(f"Warm-up of {self._name} skipped: {e}")
+        self._last_load = {"load_sec": t1 - t0, "warmup_sec": time.perf_counter() - t1}
+        self._logger.info(f"Loaded {self._name} in {t1 - t0:.2f}s (warm-up {self._last_load['warmup_sec']:.2f}s)")
+        return pipe
+
+    @abstractmethod
+    def _build_pipeline(self) -> Any:
         pass
 
+    def _warm_up(self, pipe: Any) -> None:
+        """Run `pipe` once on a tiny input (lazy init, allocator, kernel selection); no-op by default."""
+
     @abstractmethod
     def summarize_info(self) -> Dict[str, str]:
         pass
@@ -0,0 +1,261 @@
+"""
+Composable in-memory chains: text-to-image -> img2img refinement -> classification -> filtering,
+with writing to outputs/ as an optional last stage.
+
+Stages hand `Candidate`s (a PIL image plus the metadata gathered so far) straight to the next stage,
+so a "generate N candidates, keep the ones the classifier scores highest" loop never encodes or
+re-decodes the images it throws away:
+
+    chain = Chain(logger,
+                  Generate(t2i, ["a red fox in the snow"], num_images_per_prompt=8),
+                  Classify(clf),
+                  Filter(label="fox", keep=2),
+                  Save())
+    result = chain.run()
+
+Draft-then-refine renders many cheap low-resolution drafts, keeps the best (Filter, or Pick for a
+choice the user made), and spends full-resolution denoising on the keepers only, with their seeds:
+
+    Chain(logger, Draft(t2i, [prompt]), Classify(clf), Filter(keep=2),
+          Refine(t2i, width=512, height=512), Save())
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from PIL import Image
+
+from tkai.config import DEFAULTS
+from tkai.models.base import catch_exceptions, measure_time
+from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.t2i_controller import RunCancelled, TextToImageController
+from tkai.services.io_utils import json_ready
+from tkai.services.logger_service import LoggerService
+from tkai.services.output_writer import OutputWriter, get_writer
+from tkai.services.run_history import RunHistory, get_history, new_run_id, run_stem
+from tkai.services.telemetry import MetricsRegistry, get_metrics, stage
+
+@dataclass
+class Candidate:
+    image: Image.Image
+    meta: Dict[str, Any] = field(default_factory=dict)
+    predictions: Optional[List[Dict[str, Any]]] = None
+    score: Optional[float] = None
+
+    def as_result(self) -> Dict[str, Any]:
+        item = dict(self.meta)
+        if self.predictions is not None:
+            item["predictions"] = self.predictions
+            item["score"] = self.score
+        item["preview_image"] = self.image
+        return item
+
+    @classmethod
+    def from_result(cls, item: Dict[str, Any]) -> "Candidate":
+        """Inverse of as_result(), for feeding a chain's output items into another chain."""
+        meta = {k: v for k, v in item.items() if k not in ("preview_image", "predictions", "score")}
+        return cls(item["preview_image"], meta, item.get("predictions"), item.get("score"))
+
+def _checked(res: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a controller's error dict back into an exception so the chain stops at the failing stage."""
+    if res.get("cancelled"):
+        raise RunCancelled()
+    if not res.get("ok"):
+        raise RuntimeError(res.get("error") or "Stage failed")
+    return res
+
+class ChainStage(ABC):
+    name = "stage"
+
+    @abstractmethod
+    def __call__(self, candidates: List[Candidate], cancel_event=None) -> List[Candidate]:
+        pass
+
+class Generate(ChainStage):
+    """Adds one candidate per prompt x seed; takes TextToImageController.generate_images() arguments."""
+    name = "generate"
+
+    def __init__(self, t2i: TextToImageController, prompts: List[str], **params):
+        self.t2i = t2i
+        self.prompts = list(prompts)
+        self.params = params
+
+    def __call__(self, candidates, cancel_event=None):
+        res = _checked(self.t2i.generate_images(self.prompts, cancel_event=cancel_event, **self.params))
+        return candidates + [Candidate(item.pop("preview_image"), item) for item in res["items"]]
+
+class Draft(Generate):
+    """Generate at DEFAULTS["draft_size"] with DEFAULTS["draft_steps"] unless the size or steps are given."""
+    name = "draft"
+
+    def __init__(self, t2i: TextToImageController, prompts: List[str], **params):
+        params.setdefault("num_images_per_prompt", DEFAULTS["draft_count"])
+        for key, default in (("width", DEFAULTS["draft_size"][0]), ("height", DEFAULTS["draft_size"][1]),
+                             ("steps", DEFAULTS["draft_steps"])):
+            if params.get(key) is None:
+                params[key] = default
+        super().__init__(t2i, prompts, **params)
+
+class Refine(ChainStage):
+    """
+    img2img pass over every candidate, with its own prompt and seed unless `prompt` overrides it.
+    With `width`/`height` the candidates are upscaled to that size first (draft -> full resolution).
+    """
+    name = "refine"
+
+    def __init__(self, t2i: TextToImageController, prompt: str | None = None, negative_prompt: str = "",
+                 strength: float | None = None, steps: int | None = None, guidance: float | None = None,
+                 batch_size: int | None = None, width: int | None = None, height: int | None = None):
+        self.t2i = t2i
+        self.prompt = prompt
+        self.negative_prompt = negative_prompt
+        self.strength = strength
+        self.steps = steps
+        self.guidance = guidance
+        self.batch_size = batch_size
+        self.width = width
+        self.height = height
+
+    def __call__(self, candidates, cancel_event=None):
+        if not candidates:
+            return candidates
+        prompts = [self.prompt or c.meta.get("prompt") for c in candidates]
+        if not all(prompts):
+            raise ValueError("Refine needs a prompt for candidates that were not generated from one.")
+        res = _checked(self.t2i.refine_images(
+            [c.image for c in candidates], prompts, negative_prompt=self.negative_prompt,
+            seeds=[c.meta.get("seed") for c in candidates], strength=self.strength, steps=self.steps,
+            guidance=self.guidance, batch_size=self.batch_size, width=self.width, height=self.height,
+            cancel_event=cancel_event))
+        for c, item in zip(candidates, res["items"]):
+            c.image = item["preview_image"]
+            c.meta["task"] = item["task"]
+            c.meta["refine"] = {k: item[k] for k in ("prompt", "strength", "steps", "guidance")}
+            if list(c.image.size) != item["source_size"]:
+                c.meta["draft"] = {k: c.meta.get(k) for k in ("width", "height", "steps")}
+                c.meta["width"], c.meta["height"] = c.image.size
+            c.predictions, c.score = None, None  # the image changed
+        return candidates
+
+class Classify(ChainStage):
+    """Attaches top-k predictions to every candidate; its score becomes the top-1 score."""
+    name = "classify"
+
+    def __init__(self, clf: ImageClassifierController, top_k: int | None = None, batch_size: int | None = None):
+        self.clf = clf
+        self.top_k = top_k
+        self.batch_size = batch_size
+
+    def __call__(self, candidates, cancel_event=None):
+        if not candidates:
+            return candidates
+        res = _checked(self.clf.classify_images([c.image for c in candidates], top_k=self.top_k,
+                                                batch_size=self.batch_size))
+        for c, preds in zip(candidates, res["predictions"]):
+            c.predictions = preds
+            c.score = preds[0]["score"] if preds else 0.0
+            c.meta["classifier"] = {"model": res["model"], "backend": res["backend"]}
+        return candidates
+
+class Filter(ChainStage):
+    """
+    Ranks classified candidates and keeps the best. With `label`, a candidate scores the highest
+    probability among its predicted labels containing that text (case-insensitive), else 0.
+    """
+    name = "filter"
+
+    def __init__(self, label: str | None = None, min_score: float | None = None, keep: int | None = None):
+        self.label = label.lower() if label else None
+        self.min_score = min_score
+        self.keep = keep
+
+    def __call__(self, candidates, cancel_event=None):
+        if any(c.predictions is None for c in candidates):
+            raise ValueError("Filter needs a Classify stage before it.")
+        for c in candidates:
+            if self.label is not None:
+                c.score = max((p["score"] for p in c.predictions if self.label in p["label"].lower()), default=0.0)
+        kept = sorted(candidates, key=lambda c: c.score, reverse=True)
+        if self.min_score is not None:
+            kept = [c for c in kept if c.score >= self.min_score]
+        return kept[:self.keep] if self.keep is not None else kept
+
+class Pick(ChainStage):
+    """Keeps the candidates whose run_id is in `run_ids`, e.g. the drafts a user ticked."""
+    name = "pick"
+
+    def __init__(self, run_ids: List[str]):
+        self.run_ids = set(run_ids)
+
+    def __call__(self, candidates, cancel_event=None):
+        return [c for c in candidates if c.meta.get("run_id") in self.run_ids]
+
+class Save(ChainStage):
+    """Writes each candidate's image and JSON sidecar through the OutputWriter and records them in the history."""
+    name = "save"
+
+    def __init__(self, prefix: str = "chain", writer: OutputWriter | None = None, history: RunHistory | None = None):
+        self.prefix = prefix
+        self.writer = writer or get_writer()
+        self.history = history or get_history()
+
+    def __call__(self, candidates, cancel_event=None):
+        batch_id = new_run_id()
+        stem = run_stem(self.prefix, batch_id)
+        for i, c in enumerate(candidates):
+            c.meta.setdefault("run_id", f"{batch_id}-{i:04d}")
+            c.meta.setdefault("task", "image")
+            meta = json_ready(c.as_result())
+            c.meta["image_path"] = str(self.writer.save_image(c.image, "outputs", f"{stem}_{i:04d}"))
+            c.meta["json_path"] = str(self.writer.save_json({**meta, "image_path": c.meta["image_path"]},
+                                                            "outputs", f"{stem}_{i:04d}"))
+        if candidates:
+            # The batch takes its task from where the candidates came from (generated, refined or loaded)
+            tasks = {c.meta["task"] for c in candidates}
+            task = tasks.pop() if len(tasks) == 1 else "image"
+            self.history.record({"task": f"{task}-batch", "run_id": batch_id,
+                                 "items": [json_ready(c.as_result()) for c in candidates]})
+        return candidates
+
+class Chain:
+    """Runs stages in order; each stage is timed as a telemetry span under ("chain", "run")."""
+    def __init__(self, logger: LoggerService, *stages: ChainStage, metrics: MetricsRegistry | None = None):
+        if not stages:
+            raise ValueError("A chain needs at least one stage.")
+        self.stages = list(stages)
+        self._logger = logger
+        self._metrics = metrics or get_metrics()
+        self._task = "chain"
+
+    @catch_exceptions
+    @measure_time
+    def run(self, images: List[Image.Image | Candidate] | None = None,
+            progress: Callable[[int, int], None] | None = None, cancel_event=None) -> Dict[str, Any]:
+        """
+        Feed `images` (or nothing, when the chain starts with Generate) through every stage.
+        `progress(done, total)` is called after each stage; setting `cancel_event` stops between stages.
+        """
+        candidates = [c if isinstance(c, Candidate) else Candidate(c) for c in images or []]
+        counts = []
+        try:
+            for n, st in enumerate(self.stages):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RunCancelled()
+                with stage(st.name):
+                    candidates = st(candidates, cancel_event=cancel_event)
+                counts.append({"stage": st.name, "candidates": len(candidates)})
+                if progress is not None:
+                    progress(n + 1, len(self.stages))
+        except RunCancelled:
+            self._logger.info("Chain cancelled")
+            return {"ok": False, "error": "Cancelled", "cancelled": True}
+        self._logger.info("Chain: " + " -> ".join(f"{c['stage']} ({c['candidates']})" for c in counts))
+        return {
+            "ok": True,
+            "run_id": new_run_id(),
+            "task": "chain",
+            "stages": counts,
+            "num_images": len(candidates),
+            "items": [c.as_result() for c in candidates],
+        }
@@ -0,0 +1,209 @@
+"""
+Pluggable inference backends for the image classifier.
+
+Each backend builds a callable with the transformers image-classification pipeline's calling
+convention, `pipe(image_or_images, top_k=..., batch_size=...)`, so the controller does not care
+which one is in use. All of them share the vectorised batch preprocessing in tkai.services.preprocess:
+    eager  - PyTorch model, float32 (the baseline)
+    int8   - same model with torch dynamic int8 quantization of the Linear layers
+    onnx   - model exported once to ONNX (cached on disk) and run by onnxruntime
+"""
+from __future__ import annotations
+import json
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from tkai.config import DEFAULTS
+from tkai.services.logger_service import LoggerService
+from tkai.services.telemetry import stage
+
+class ClassifierBackend(ABC):
+    name = "base"
+    num_threads: int | None = None  # intra-op threads; set by worker processes (see tkai.models.clf_pool)
+
+    @abstractmethod
+    def build(self, model_name: str, logger: LoggerService) -> Any:
+        pass
+
+def _batch_preprocessor(processor) -> Callable[[list], Any]:
+    """Vectorised preprocessing when the processor's options are covered, else the processor itself."""
+    from tkai.services.preprocess import ImagePreprocessor
+    fast = ImagePreprocessor.from_hf(processor)
+    if fast is not None:
+        return fast
+    return lambda images: processor(images, return_tensors="np")["pixel_values"]
+
+class ArrayImageClassifier:
+    """
+    Classifier fed with one preprocessed NumPy batch per forward pass.
+    Called like the transformers image-classification pipeline and returns the same structure.
+    """
+    def __init__(self, forward: Callable[[Any], Any], preprocess: Callable[[list], Any],
+                 id2label: Dict[int, str], multi_label: bool = False, nbytes: int = 0):
+        self.forward = forward          # float32 NCHW array -> logits array
+        self.preprocess = preprocess
+        self.id2label = id2label
+        self.multi_label = multi_label
+        self.nbytes = nbytes            # weights held by `forward`; the ModelRegistry budgets with it
+
+    @property
+    def min_decode_side(self) -> int | None:
+        """Smallest image side the preprocessing needs; lets callers decode large JPEGs at reduced scale."""
+        return getattr(self.preprocess, "min_decode_side", None)
+
+    def __call__(self, images, top_k: int = 5, batch_size: int | None = None):
+        single = not isinstance(images, list)
+        batch = [images] if single else images
+        step = batch_size or len(batch)
+        results: List[List[Dict[str, Any]]] = []
+        for i in range(0, len(batch), step):
+            with stage("preprocess"):
+                pixel_values = self.preprocess(batch[i:i + step])
+            with stage("forward"):
+                logits = self.forward(pixel_values)
+            with stage("postprocess"):
+                results.extend(self._postprocess(logits, top_k))
+        return results[0] if single else results
+
+    def _postprocess(self, logits, top_k: int):
+        import numpy as np
+        if self.multi_label:
+            scores = 1.0 / (1.0 + np.exp(-logits))
+        else:
+            shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+            scores = shifted / shifted.sum(axis=-1, keepdims=True)
+        top_k = min(int(top_k), scores.shape[-1])
+        out = []
+        for row in scores:
+            idx = np.argsort(-row)[:top_k]
+            out.append([{"label": self.id2label[int(j)], "score": float(row[j])} for j in idx])
+        return out
+
+def _label_info(config):
+    id2label = {int(k): v for k, v in config.id2label.items()}
+    multi_label = config.problem_type == "multi_label_classification" or config.num_labels == 1
+    return id2label, multi_label
+
+def _torch_classifier(model_name: str, transform: Callable[[Any], Any] | None = None) -> ArrayImageClassifier:
+    import torch
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+    from tkai.models.registry import module_nbytes
+
+    # safetensors checkpoints are memory-mapped and materialised in place (no random-init copy first)
+    model = AutoModelForImageClassification.from_pretrained(model_name, disable_mmap=False).eval()
+    if transform is not None:
+        model = transform(model)
+
+    def forward(pixel_values):
+        # from_numpy shares the preprocessed buffer; no copy on the way into the model
+        with torch.inference_mode():
+            return model(pixel_values=torch.from_numpy(pixel_values)).logits.float().numpy()
+
+    processor = AutoImageProcessor.from_pretrained(model_name)
+    return ArrayImageClassifier(forward, _batch_preprocessor(processor), *_label_info(model.config),
+                                nbytes=module_nbytes(model))
+
+def warm_up_classifier(pipe) -> None:
+    """One single-image call at the model's input size, so the first real batch skips lazy initialisation."""
+    from PIL import Image
+    side = getattr(pipe, "min_decode_side", None) or 64
+    pipe(Image.new("RGB", (side, side)), top_k=1)
+
+class EagerBackend(ClassifierBackend):
+    name = "eager"
+
+    def build(self, model_name: str, logger: LoggerService) -> Any:
+        return _torch_classifier(model_name)
+
+class DynamicInt8Backend(ClassifierBackend):
+    name = "int8"
+
+    def build(self, model_name: str, logger: LoggerService) -> Any:
+        import torch
+        def quantize(model):
+            # Weights of Linear layers become int8; activations are quantized on the fly
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        clf = _torch_classifier(model_name, transform=quantize)
+        logger.info("Applied dynamic int8 quantization to Linear layers")
+        return clf
+
+class OnnxBackend(ClassifierBackend):
+    name = "onnx"
+
+    def __init__(self, cache_dir: str | Path | None = None, opset: int = 17):
+        self._cache_dir = Path(cache_dir or DEFAULTS["onnx_cache_dir"])
+        self._opset = opset
+
+    def artifact_path(self, model_name: str) -> Path:
+        return self._cache_dir / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name) / "model.onnx"
+
+    def build(self, model_name: str, logger: LoggerService) -> Any:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend needs onnxruntime: pip install onnxruntime onnx") from e
+        from transformers import AutoConfig, AutoImageProcessor
+
+        config = AutoConfig.from_pretrained(model_name)
+        processor = AutoImageProcessor.from_pretrained(model_name)
+        path = self.artifact_path(model_name)
+        if not self._is_fresh(path, model_name):
+            self._export(model_name, processor, path, logger)
+        else:
+            logger.info(f"Using cached ONNX graph {path}")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            opts.intra_op_num_threads = self.num_threads
+        session = ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        forward = lambda pixel_values: session.run(None, {input_name: pixel_values})[0]
+        # The graph file (plus any external weight data) approximates the session's initializers
+        nbytes = sum(f.stat().st_size for f in path.parent.glob(path.name + "*"))
+        return ArrayImageClassifier(forward, _batch_preprocessor(processor), *_label_info(config), nbytes=nbytes)
+
+    def _is_fresh(self, path: Path, model_name: str) -> bool:
+        meta = path.with_suffix(".json")
+        if not path.exists() or not meta.exists():
+            return False
+        try:
+            info = json.loads(meta.read_text(encoding="utf-8"))
+        except ValueError:
+            return False
+        return info.get("model") == model_name and info.get("opset") == self._opset
+
+    def _export(self, model_name: str, processor, path: Path, logger: LoggerService):
+        import torch
+        from PIL import Image
+        from transformers import AutoModelForImageClassification
+
+        logger.info(f"Exporting {model_name} to ONNX at {path}...")
+        model = AutoModelForImageClassification.from_pretrained(model_name).eval()
+
+        class _LogitsOnly(torch.nn.Module):
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+            def forward(self, pixel_values):
+                return self.inner(pixel_values=pixel_values).logits
+
+        # Trace at the processor's real output size so resize/crop settings stay consistent
+        dummy = torch.from_numpy(processor(Image.new("RGB", (256, 256)), return_tensors="np")["pixel_values"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".onnx.tmp")
+        torch.onnx.export(_LogitsOnly(model), (dummy,), str(tmp), input_names=["pixel_values"],
+                          output_names=["logits"], opset_version=self._opset, dynamo=False,
+                          dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}})
+        tmp.replace(path)
+        path.with_suffix(".json").write_text(json.dumps({"model": model_name, "opset": self._opset,
+                                                         "torch": torch.__version__}), encoding="utf-8")
+
+BACKENDS = {cls.name: cls for cls in (EagerBackend, DynamicInt8Backend, OnnxBackend)}
+
+def get_backend(name: str | None) -> ClassifierBackend:
+    name = name or DEFAULTS["clf_backend"]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -1,65 +1,254 @@
 from __future__ import annotations
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 from PIL import Image
 
-from tkai.models.base import BaseModelController, measure_time, catch_exceptions, require_loaded
+from tkai.models.base import BaseModelController, measure_time, catch_exceptions, require_loaded, cached_result, recorded
+from tkai.models.clf_backends import get_backend, warm_up_classifier
+from tkai.models.clf_pool import ProcessPoolClassifier
+from tkai.models.registry import ModelRegistry
 from tkai.services.logger_service import LoggerService
-from tkai.services.io_utils import validate_image_path, load_image, save_json, timestamp
+from tkai.services.result_cache import ResultCache, hash_file
+from tkai.services.dedup import find_duplicates
+from tkai.services.io_utils import validate_image_path, load_image, load_images
+from tkai.services.output_writer import OutputWriter, wait_written
+from tkai.services.run_history import RunHistory, new_run_id, run_stem
+from tkai.services.telemetry import MetricsRegistry, current_trace, stage
 from tkai.config import DEFAULTS, MODEL_DESCRIPTIONS
 
 class ImageIOMixin:
-    def _load_image(self, path: str | Path) -> Image.Image:
-        return load_image(path)
+    def _load_image(self, path: str | Path, min_side: int | None = None) -> Image.Image:
+        return load_image(path, min_side)
+
+    def _load_images(self, paths: List[str | Path], min_side: int | None = None) -> List[Image.Image]:
+        return load_images(paths, workers=DEFAULTS["io_workers"], min_side=min_side)
 
 class ImageClassifierController(BaseModelController, ImageIOMixin):
     """
     Polymorphic controller for Image Classification using transformers pipeline.
-    Overridden methods: load_model(), run()
+    Overridden methods: _build_pipeline(), run()
     """
-    def __init__(self, logger: LoggerService):
-        super().__init__(logger)
-        self._name = DEFAULTS["clf_model"]
+    def __init__(self, logger: LoggerService, cache: ResultCache | None = None,
+                 registry: ModelRegistry | None = None, model_name: str | None = None,
+                 backend: str | None = None, writer: OutputWriter | None = None, history: RunHistory | None = None,
+                 metrics: MetricsRegistry | None = None, workers: int | None = None):
+        super().__init__(logger, cache=cache, registry=registry, writer=writer, history=history, metrics=metrics)
+        self._name = model_name or DEFAULTS["clf_model"]
         self._category = "Image → Labels"
-        self._pipe = None
+        self._task = "image-classification"
+        self._backend = get_backend(backend)
+        self._workers = max(1, int(workers or DEFAULTS["clf_workers"]))
 
-    @catch_exceptions
-    @measure_time
-    def load_model(self) -> Dict[str, Any]:
-        from transformers import pipeline as hf_pipeline
-        self._logger.info("Loading Image Classification model...")
-        self._pipe = hf_pipeline("image-classification", model=self._name, device=-1)  # CPU
-        self._loaded = True
-        return {"ok": True, "model": self._name, "device": "cpu"}
+    @property
+    def backend(self) -> str:
+        return self._backend.name
+
+    def set_backend(self, name: str) -> None:
+        """Switch inference backend; the previous backend's pipeline is unloaded."""
+        backend = get_backend(name)
+        self._replace_pipeline(lambda: setattr(self, "_backend", backend))
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def set_workers(self, n: int) -> None:
+        """Run inference in `n` worker processes (1 = in-process); takes effect on the next load."""
+        self._replace_pipeline(lambda: setattr(self, "_workers", max(1, int(n))))
+
+    def _replace_pipeline(self, change: Callable[[], None]) -> None:
+        # A stale worker pool keeps N processes with a model copy each alive; stop it rather than wait for eviction
+        old = self._registry_key()
+        change()
+        if self._registry_key() != old:
+            self._registry.unload(old)
+
+    def _registry_key(self):
+        return (self._task, self._name, self._backend.name, self._workers)
+
+    def _build_pipeline(self):
+        where = f"{self._workers} worker processes" if self._workers > 1 else "in-process"
+        self._logger.info(f"Loading Image Classification model {self._name} ({self._backend.name} backend, {where})...")
+        if self._workers > 1:
+            return ProcessPoolClassifier.for_backend(self._backend.name, self._name, self._workers, logger=self._logger)
+        return self._backend.build(self._name, self._logger)
+
+    def _warm_up(self, pipe) -> None:
+        if not isinstance(pipe, ProcessPoolClassifier):  # pool workers warm up as they start
+            warm_up_classifier(pipe)
+
+    def _decode_side(self, preview: bool = False) -> int | None:
+        """Smallest side to decode inputs at (None = full size); needs the pipeline to report its input size."""
+        need = getattr(self._pipe, "min_decode_side", None)
+        if not DEFAULTS["jpeg_draft"] or not need:
+            return None
+        return max(need, DEFAULTS["preview_max_px"]) if preview else need
 
     def summarize_info(self) -> Dict[str, str]:
         return {
             "Model Name": self._name,
             "Category": self._category,
+            "Backend": self._backend.name,
+            "Workers": str(self._workers),
             "Description": MODEL_DESCRIPTIONS.get(self._name, "N/A")
         }
 
     def validate_input(self, image_path: str, **kwargs) -> None:
+        # A path handed over from a fresh generation may still be in the writer queue
+        wait_written(image_path)
         validate_image_path(image_path)
 
+    def _run_cache_key(self, image_path: str, top_k: int | None = None, image: Image.Image | None = None) -> str | None:
+        if image is not None:
+            return None  # in-memory input; the file may still be queued on the writer
+        self.validate_input(image_path)
+        return ResultCache.make_key(self._name, {"image_sha256": hash_file(image_path)},
+                                    {"top_k": int(top_k or DEFAULTS["clf_topk"]), "backend": self._backend.name})
+
+    def _refresh_cached_run(self, hit: Dict[str, Any], image_path: str, top_k: int | None = None,
+                            image: Image.Image | None = None) -> None:
+        # The key is the file's content: a hit may come from a byte-identical file elsewhere
+        hit["image_path"] = str(image_path)
+
     @catch_exceptions
+    @recorded
+    @cached_result("_run_cache_key", refresh="_refresh_cached_run")
     @require_loaded
     @measure_time
-    def run(self, image_path: str, top_k: int | None = None) -> Dict[str, Any]:
+    def run(self, image_path: str, top_k: int | None = None, image: Image.Image | None = None) -> Dict[str, Any]:
+        """Classify one image file; pass `image` when it is already decoded (e.g. a fresh generation) to skip the read."""
         top_k = top_k or DEFAULTS["clf_topk"]
-        img = self._load_image(image_path)
+        if image is not None:
+            img = image if image.mode == "RGB" else image.convert("RGB")
+        else:
+            with stage("validate"):
+                self.validate_input(image_path)
+            # Decoded once: the same image feeds the model and the viewer
+            with stage("decode"):
+                img = self._load_image(image_path, self._decode_side(preview=True))
         self._logger.info(f"Classifying image: {image_path} | top_k={top_k}")
-        preds = self._pipe(img, top_k=int(top_k))
-        stem = f"clf_{timestamp()}"
+        preds = self._pipe(img, top_k=int(top_k))  # preprocess/forward/postprocess spans come from the backend
+        run_id = new_run_id()
+        stem = run_stem("clf", run_id)
         meta = {
             "ok": True,
+            "run_id": run_id,
             "task": "image-classification",
             "model": self._name,
+            "backend": self._backend.name,
             "image_path": str(image_path),
             "top_k": top_k,
             "predictions": preds,
         }
-        jpath = save_json(meta, "outputs", stem)
+        with stage("save"):
+            jpath = self._writer.save_json(meta, "outputs", stem)
+        meta["json_path"] = str(jpath)
+        meta["preview_image"] = img
+        return meta
+
+    @catch_exceptions
+    @recorded
+    @require_loaded
+    @measure_time
+    def run_batch(self, paths: List[str], batch_size: int | None = None, top_k: int | None = None,
+                  progress: Callable[[int, int], None] | None = None, cancel_event=None,
+                  dedup: bool | None = None, dedup_threshold: int | None = None) -> Dict[str, Any]:
+        """
+        Classify many images with batched forward passes and write one consolidated JSON.
+        With `dedup` (DEFAULTS["clf_dedup"]), exact copies, and with a `dedup_threshold` >= 0 also perceptual
+        near duplicates (tkai.services.dedup), are classified once per group; the other members get the
+        same predictions plus "duplicate_of".
+        `progress(done, total)` is called after each batch; setting `cancel_event` stops between batches.
+        """
+        t0 = time.perf_counter()
+        top_k = top_k or DEFAULTS["clf_topk"]
+        batch_size = batch_size or DEFAULTS["clf_batch_size"]
+        paths = [str(p) for p in paths]
+        if not paths:
+            raise ValueError("No images to classify.")
+        with stage("validate"):
+            for p in paths:
+                self.validate_input(p)
+        groups = None
+        todo = paths
+        if (DEFAULTS["clf_dedup"] if dedup is None else dedup) and len(paths) > 1:
+            with stage("dedup"):
+                groups = find_duplicates(paths, threshold=dedup_threshold)
+            todo = [paths[i] for i in groups.leaders]
+            self._logger.info(f"Dedup: {len(todo)} unique of {len(paths)} images "
+                              f"({groups.exact} exact, {groups.near} near duplicates) in {groups.hash_sec:.2f}s")
+        self._logger.info(f"Classifying {len(todo)} images | batch_size={batch_size} | top_k={top_k}")
+
+        results = []
+        # With a process pool each call gets one batch per worker, sharded by the pool
+        step = batch_size * self._workers
+        chunks = [todo[i:i + step] for i in range(0, len(todo), step)]
+        side = self._decode_side()
+        trace = current_trace()
+        def decode(chunk):
+            # Runs on the prefetch thread, so the span goes to this run's trace explicitly
+            with trace.stage("decode") if trace is not None else contextlib.nullcontext():
+                return self._load_images(chunk, side)
+        # Decode the next chunk while the current one is in the forward pass
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            pending = prefetch.submit(decode, chunks[0])
+            for n, chunk in enumerate(chunks):
+                if cancel_event is not None and cancel_event.is_set():
+                    pending.cancel()
+                    return {"ok": False, "error": "Cancelled", "cancelled": True}
+                imgs = pending.result()
+                if n + 1 < len(chunks):
+                    pending = prefetch.submit(decode, chunks[n + 1])
+                preds = self._pipe(imgs, top_k=int(top_k), batch_size=int(batch_size))
+                for path, p in zip(chunk, preds):
+                    results.append({"image_path": path, "predictions": p})
+                if progress is not None:
+                    progress(len(results), len(todo))
+        if groups is not None:
+            # Fan each group's predictions back out, in input order
+            by_leader = dict(zip(groups.leaders, results))
+            results = [by_leader[lead] if lead == i else
+                       {"image_path": paths[i], "predictions": by_leader[lead]["predictions"], "duplicate_of": paths[lead]}
+                       for i, lead in enumerate(groups.leader)]
+
+        dt = time.perf_counter() - t0
+        run_id = new_run_id()
+        stem = run_stem("clf_batch", run_id)
+        meta = {
+            "ok": True,
+            "run_id": run_id,
+            "task": "image-classification-batch",
+            "model": self._name,
+            "backend": self._backend.name,
+            "workers": self._workers,
+            "num_images": len(paths),
+            "batch_size": batch_size,
+            "top_k": top_k,
+            "duration_sec": dt,
+            "images_per_sec": len(paths) / dt if dt > 0 else None,
+            "dedup": groups.stats() if groups is not None else None,
+            "results": results,
+        }
+        with stage("save"):
+            jpath = self._writer.save_json(meta, "outputs", stem)
         meta["json_path"] = str(jpath)
         return meta
+
+    @catch_exceptions
+    @require_loaded
+    @measure_time
+    def classify_images(self, images: List[Image.Image], top_k: int | None = None,
+                        batch_size: int | None = None) -> Dict[str, Any]:
+        """Batched classification of in-memory images (see tkai.models.chain); nothing is read or written."""
+        top_k = top_k or DEFAULTS["clf_topk"]
+        batch_size = batch_size or DEFAULTS["clf_batch_size"]
+        if not images:
+            raise ValueError("No images to classify.")
+        images = [img if img.mode == "RGB" else img.convert("RGB") for img in images]
+        preds = self._pipe(images, top_k=int(top_k), batch_size=int(batch_size))
+        return {"ok": True, "task": "image-classification-batch", "model": self._name, "backend": self._backend.name,
+                "top_k": top_k, "predictions": preds}
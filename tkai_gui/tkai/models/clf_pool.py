@@ -0,0 +1,270 @@
+"""
+Multi-process execution mode for the image classifier.
+
+`ProcessPoolClassifier` has the same calling convention as the in-process classifiers
+(`pipe(image_or_images, top_k=..., batch_size=...)`), so ImageClassifierController uses it like any
+other pipeline. Each worker process builds its own pipeline with a pinned intra-op thread count;
+the dispatcher splits a call into chunks of `batch_size` images and hands the next chunk to whichever
+worker is idle, so preprocessing (GIL-bound in one process) and forward passes run on all cores.
+
+Images cross the process boundary as raw RGB bytes in a `multiprocessing.shared_memory` block per
+chunk (one memcpy each way, no pickled PIL objects); only small headers and the predictions travel
+over the pipes. A worker that dies is detected through its process sentinel, restarted, and its
+chunk is retried once on the fresh worker.
+"""
+from __future__ import annotations
+import functools
+import os
+import threading
+from collections import deque
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from tkai.config import DEFAULTS
+from tkai.services.telemetry import stage
+
+# (byte offset, height, width) of each RGB image in a chunk's shared memory block
+ImageHeader = Tuple[int, int, int]
+
+def build_backend_pipeline(backend: str, model_name: str, threads: int, log_file: str):
+    """Default worker factory: the named backend from tkai.models.clf_backends, limited to `threads`."""
+    from tkai.models.clf_backends import get_backend
+    from tkai.services.logger_service import LoggerService
+    impl = get_backend(backend)
+    impl.num_threads = threads
+    return impl.build(model_name, LoggerService(log_file=log_file))
+
+def _worker_main(conn, factory: Callable[..., Any], threads: int):
+    # Pin thread pools before torch / onnxruntime are imported by the factory
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+            torch.set_num_interop_threads(1)
+        except (ImportError, RuntimeError):
+            pass
+        pipe = factory(threads=threads)
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+    if DEFAULTS["warmup_on_load"]:
+        try:
+            from tkai.models.clf_backends import warm_up_classifier
+            warm_up_classifier(pipe)
+        except Exception:
+            pass  # only an optimisation; real batches report real errors
+    from tkai.models.registry import estimate_nbytes
+    conn.send(("ready", getattr(pipe, "min_decode_side", None), estimate_nbytes(pipe)))
+
+    import numpy as np
+    from PIL import Image
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return  # parent went away
+        if msg is None:
+            return
+        chunk_id, shm_name, headers, top_k, batch_size = msg
+        shm = SharedMemory(name=shm_name)
+        try:
+            images = [Image.fromarray(np.ndarray((h, w, 3), np.uint8, shm.buf, off)) for off, h, w in headers]
+            preds = pipe(images, top_k=top_k, batch_size=batch_size)
+            del images
+            conn.send(("ok", chunk_id, preds))
+        except Exception as e:
+            conn.send(("error", chunk_id, f"{type(e).__name__}: {e}"))
+        finally:
+            shm.close()
+
+class _Worker:
+    def __init__(self, ctx, factory, threads: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child_conn, factory, threads), daemon=True,
+                                name="tkai-clf-worker")
+        self.proc.start()
+        child_conn.close()
+        self.busy: Optional[int] = None  # chunk index in flight
+
+    def wait_ready(self, timeout: float) -> Tuple[Optional[int], int]:
+        """(min_decode_side, estimated model bytes) reported by the worker once its pipeline is loaded."""
+        if not self.conn.poll(timeout):
+            self.stop()
+            raise TimeoutError(f"Classifier worker did not start within {timeout:.0f}s")
+        try:
+            msg = self.conn.recv()
+        except EOFError:
+            msg = ("failed", f"exit code {self.proc.exitcode}")
+        if msg[0] != "ready":
+            self.stop()
+            raise RuntimeError(f"Classifier worker failed to load its pipeline: {msg[1]}")
+        return msg[1], msg[2]
+
+    def stop(self, timeout: float = 2.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join(timeout)
+        self.conn.close()
+
+class _Chunk:
+    def __init__(self, images: list):
+        import numpy as np
+        arrays = [np.asarray(img if img.mode == "RGB" else img.convert("RGB"), dtype=np.uint8) for img in images]
+        self.headers: List[ImageHeader] = []
+        offset = 0
+        for a in arrays:
+            self.headers.append((offset, a.shape[0], a.shape[1]))
+            offset += a.nbytes
+        self.shm = SharedMemory(create=True, size=max(offset, 1))
+        for (off, h, w), a in zip(self.headers, arrays):
+            np.ndarray((h, w, 3), np.uint8, self.shm.buf, off)[:] = a
+        self.attempts = 0
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+class ProcessPoolClassifier:
+    """Classifier pipeline backed by `workers` processes; call `shutdown()` to stop them."""
+    def __init__(self, factory: Callable[..., Any], workers: int, threads_per_worker: int | None = None,
+                 start_timeout: float | None = None, max_retries: int = 1, logger=None):
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.start_timeout = start_timeout or DEFAULTS["clf_worker_start_timeout"]
+        self.max_retries = max_retries
+        self.restarts = 0
+        self.chunks = 0
+        self._factory = factory
+        self._logger = logger
+        self._ctx = get_context("spawn")  # fork is unsafe with torch thread pools and Tk
+        self._lock = threading.Lock()
+        self._pool: List[_Worker] = []
+        self.min_decode_side: int | None = None
+        self.worker_nbytes = 0  # one worker's model copy, as estimated inside the worker
+        self._start()
+
+    @classmethod
+    def for_backend(cls, backend: str, model_name: str, workers: int, logger=None, **kwargs) -> "ProcessPoolClassifier":
+        factory = functools.partial(build_backend_pipeline, backend, model_name, log_file="logs/clf_workers.log")
+        return cls(factory, workers, logger=logger, **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        """Every worker holds its own copy of the model; the ModelRegistry budgets the pool with this."""
+        return self.worker_nbytes * self.workers
+
+    def __call__(self, images, top_k: int = 5, batch_size: int | None = None):
+        single = not isinstance(images, list)
+        batch = [images] if single else images
+        if not batch:
+            return []
+        step = max(1, int(batch_size or len(batch)))
+        if len(batch) > step * self.workers or single:
+            groups = [batch[i:i + step] for i in range(0, len(batch), step)]
+        else:
+            # Fewer images than one batch per worker: spread them so every worker gets a share
+            per = -(-len(batch) // self.workers)
+            groups = [batch[i:i + per] for i in range(0, len(batch), per)]
+        with self._lock, stage("forward"):
+            results = self._dispatch(groups, int(top_k), step)
+        flat = [p for group in results for p in group]
+        return flat[0] if single else flat
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "threads_per_worker": self.threads_per_worker,
+                "alive": sum(w.proc.is_alive() for w in self._pool), "restarts": self.restarts, "chunks": self.chunks}
+
+    def shutdown(self):
+        with self._lock:
+            for w in self._pool:
+                w.stop()
+            self._pool.clear()
+
+    # ---------- internals ----------
+    def _start(self):
+        # The first worker loads alone so one-time work (downloads, ONNX export) is not raced
+        first = _Worker(self._ctx, self._factory, self.threads_per_worker)
+        self.min_decode_side, self.worker_nbytes = first.wait_ready(self.start_timeout)
+        rest = [_Worker(self._ctx, self._factory, self.threads_per_worker) for _ in range(self.workers - 1)]
+        self._pool = [first]
+        try:
+            for w in rest:
+                w.wait_ready(self.start_timeout)
+                self._pool.append(w)
+        except Exception:
+            for w in self._pool + rest:
+                w.stop()
+            raise
+        self._log(f"Started {self.workers} classifier worker(s), {self.threads_per_worker} thread(s) each")
+
+    def _restart(self, index: int, reason: str):
+        old = self._pool[index]
+        self._log(f"Classifier worker pid {old.proc.pid} {reason}; restarting")
+        old.stop(timeout=0.5)
+        worker = _Worker(self._ctx, self._factory, self.threads_per_worker)
+        self._pool[index] = worker
+        worker.wait_ready(self.start_timeout)
+        self.restarts += 1
+
+    def _dispatch(self, groups: List[list], top_k: int, batch_size: int) -> List[list]:
+        results: List[Optional[list]] = [None] * len(groups)
+        chunks: Dict[int, _Chunk] = {}
+        todo: Deque[int] = deque(range(len(groups)))
+        try:
+            while todo or any(w.busy is not None for w in self._pool):
+                for w in self._pool:
+                    if w.busy is None and todo:
+                        i = todo.popleft()
+                        if i not in chunks:
+                            chunks[i] = _Chunk(groups[i])
+                        w.busy = i
+                        w.conn.send((i, chunks[i].shm.name, chunks[i].headers, top_k, batch_size))
+                busy = [w for w in self._pool if w.busy is not None]
+                ready = wait([w.conn for w in busy] + [w.proc.sentinel for w in busy])
+                for index, w in enumerate(list(self._pool)):
+                    if w.busy is None or (w.conn not in ready and w.proc.sentinel not in ready):
+                        continue
+                    i, w.busy = w.busy, None
+                    try:
+                        status, _, payload = w.conn.recv()
+                    except (EOFError, OSError):
+                        chunk = chunks[i]
+                        chunk.attempts += 1
+                        self._restart(index, f"died (exit code {w.proc.exitcode})")
+                        if chunk.attempts > self.max_retries:
+                            raise RuntimeError(f"Classifier worker crashed {chunk.attempts} times on the same batch")
+                        todo.appendleft(i)
+                        continue
+                    if status != "ok":
+                        raise RuntimeError(f"Classifier worker error: {payload}")
+                    results[i] = payload
+                    chunks.pop(i).release()
+                    self.chunks += 1
+        finally:
+            for chunk in chunks.values():
+                chunk.release()
+            for index, w in enumerate(self._pool):
+                if w.busy is not None:
+                    # Abandoned mid-call; its late reply would be read as the next call's answer
+                    w.busy = None
+                    self._restart(index, "was abandoned mid-batch")
+        return results  # type: ignore[return-value]
+
+    def _log(self, msg: str):
+        if self._logger is not None:
+            self._logger.info(msg)
+
+    def __del__(self):
+        try:
+            self.shutdown()
+        except Exception:
+            pass
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import contextlib
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Dict
+
+from tkai.config import DEFAULTS
+
+@dataclass(frozen=True)
+class PerfOptions:
+    """
+    CPU performance knobs for the diffusion pipeline.
+    attention_slicing / vae_tiling: True, False or "auto" (enabled once width*height exceeds large_image_px).
+    Thread counts of 0 keep torch's defaults.
+    """
+    dtype: str = "float32"            # "float32" | "bfloat16" (autocast, only where the CPU supports it)
+    channels_last: bool = False
+    attention_slicing: Any = "auto"
+    vae_tiling: Any = "auto"
+    large_image_px: int = 512 * 512
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    compile: bool = False
+
+    def build_key(self) -> str:
+        """Options baked into a loaded pipeline; pipelines built with different values are kept apart."""
+        return f"cl={int(self.channels_last)},compile={int(self.compile)}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+PERF_MODES: Dict[str, PerfOptions] = {
+    "default": PerfOptions(),
+    "bf16": PerfOptions(dtype="bfloat16", channels_last=True),
+    "channels-last": PerfOptions(channels_last=True),
+    "low-memory": PerfOptions(attention_slicing=True, vae_tiling=True),
+    "compiled": PerfOptions(channels_last=True, compile=True),
+}
+
+def resolve_perf_mode(mode: str | PerfOptions | None, intra_op_threads: int | None = None,
+                      inter_op_threads: int | None = None) -> PerfOptions:
+    """
+    A named mode (or PerfOptions as given) with thread counts from the arguments, else from
+    DEFAULTS["t2i_intra_op_threads"] / ["t2i_inter_op_threads"]; 0 or None keeps the mode's own.
+    """
+    if isinstance(mode, PerfOptions):
+        opts = mode
+    else:
+        name = mode or "default"
+        if name not in PERF_MODES:
+            raise ValueError(f"Unknown performance mode '{name}'. Choose from: {', '.join(PERF_MODES)}")
+        opts = PERF_MODES[name]
+    return with_overrides(opts, intra_op_threads=intra_op_threads or DEFAULTS["t2i_intra_op_threads"] or None,
+                          inter_op_threads=inter_op_threads or DEFAULTS["t2i_inter_op_threads"] or None)
+
+_bf16_supported = None
+
+def cpu_supports_bf16() -> bool:
+    """True when oneDNN reports native bf16 (avx512_bf16 / AMX); emulated bf16 is slower than fp32."""
+    global _bf16_supported
+    if _bf16_supported is None:
+        import torch
+        try:
+            _bf16_supported = bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+        except Exception:
+            _bf16_supported = False
+        if not _bf16_supported:
+            try:
+                with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+                    flags = f.read()
+                _bf16_supported = "avx512_bf16" in flags or "amx_bf16" in flags
+            except OSError:
+                pass
+    return _bf16_supported
+
+def configure_threads(opts: PerfOptions) -> Dict[str, Any]:
+    """Apply intra-/inter-op thread counts (process-wide) and report what is in effect."""
+    import torch
+    notes = {}
+    if opts.intra_op_threads > 0:
+        torch.set_num_threads(opts.intra_op_threads)
+    if opts.inter_op_threads > 0:
+        try:
+            torch.set_num_interop_threads(opts.inter_op_threads)
+        except RuntimeError as e:
+            # Only allowed once, before any inter-op parallel work has started
+            notes["inter_op_threads_error"] = str(e)
+    notes["intra_op_threads"] = torch.get_num_threads()
+    notes["inter_op_threads"] = torch.get_num_interop_threads()
+    return notes
+
+def prepare_pipeline(pipe, opts: PerfOptions):
+    """One-off, load-time transforms: channels-last weights and torch.compile of the UNet."""
+    import torch
+    if opts.channels_last:
+        for name in ("unet", "vae"):
+            module = getattr(pipe, name, None)
+            if module is not None:
+                module.to(memory_format=torch.channels_last)
+    if opts.compile and getattr(pipe, "unet", None) is not None:
+        pipe.unet = torch.compile(pipe.unet)
+    return pipe
+
+def _wanted(setting: Any, width: int, height: int, opts: PerfOptions) -> bool:
+    if setting == "auto":
+        return width * height > opts.large_image_px
+    return bool(setting)
+
+def configure_for_size(pipe, opts: PerfOptions, width: int, height: int) -> Dict[str, bool]:
+    """Toggle attention slicing / VAE tiling for this run's size (call with the pipeline's run lock held)."""
+    slicing = _wanted(opts.attention_slicing, width, height, opts)
+    tiling = _wanted(opts.vae_tiling, width, height, opts)
+    if hasattr(pipe, "enable_attention_slicing"):
+        pipe.enable_attention_slicing() if slicing else pipe.disable_attention_slicing()
+    else:
+        slicing = False
+    vae = getattr(pipe, "vae", None)
+    if vae is not None and hasattr(vae, "enable_tiling"):
+        vae.enable_tiling() if tiling else vae.disable_tiling()
+    else:
+        tiling = False
+    return {"attention_slicing": slicing, "vae_tiling": tiling}
+
+def effective_dtype(opts: PerfOptions) -> str:
+    if opts.dtype == "bfloat16" and cpu_supports_bf16():
+        return "bfloat16"
+    return "float32"
+
+def autocast(opts: PerfOptions):
+    """bfloat16 autocast on supporting CPUs, otherwise a no-op context."""
+    if effective_dtype(opts) != "bfloat16":
+        return contextlib.nullcontext()
+    import torch
+    return torch.autocast("cpu", dtype=torch.bfloat16)
+
+def with_overrides(opts: PerfOptions, **overrides) -> PerfOptions:
+    return replace(opts, **{k: v for k, v in overrides.items() if v is not None})
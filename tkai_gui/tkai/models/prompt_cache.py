@@ -0,0 +1,100 @@
+"""
+LRU cache of text-encoder outputs, so a prompt (and, above all, the negative prompt that stays the
+same across nearly every run) is encoded once per model rather than once per pipeline call.
+
+Works with pipelines whose encode_prompt() returns (prompt_embeds, negative_prompt_embeds), i.e.
+Stable Diffusion 1.x/2.x and their img2img variants (sd-turbo included). Pipelines that also need
+pooled embeddings (SDXL) are passed through untouched.
+"""
+from __future__ import annotations
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple
+
+from tkai.config import DEFAULTS
+from tkai.services.result_cache import normalize_text
+
+def supports_prompt_embeds(pipe) -> bool:
+    return _supports(type(pipe))
+
+@functools.lru_cache(maxsize=None)
+def _supports(cls) -> bool:
+    encode = getattr(cls, "encode_prompt", None)
+    if encode is None:
+        return False
+    call_params = inspect.signature(cls.__call__).parameters
+    return ("prompt_embeds" in call_params and "pooled_prompt_embeds" not in call_params
+            and "do_classifier_free_guidance" in inspect.signature(encode).parameters)
+
+class PromptEmbeddingCache:
+    """
+    Thread-safe LRU of per-prompt embeddings ([1, tokens, dim] tensors), keyed by
+    (model, dtype, normalized text) and bounded by `max_mb` of tensor memory.
+    """
+    def __init__(self, max_mb: float | None = None):
+        self.max_bytes = int((DEFAULTS["prompt_cache_mb"] if max_mb is None else max_mb) * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def encode(self, pipe, model_key: Tuple[Hashable, ...], texts: List[str]) -> List[Any]:
+        """Embeddings for `texts` in order; only texts not cached yet go through the text encoder, in one call."""
+        keys = [(*model_key, normalize_text(t)) for t in texts]
+        found: Dict[Tuple[Hashable, ...], Any] = {}
+        with self._lock:
+            for k in keys:
+                if k in self._entries:
+                    self._entries.move_to_end(k)
+                    found[k] = self._entries[k]
+            n_missing = sum(1 for k in keys if k not in found)
+            self.hits += len(keys) - n_missing
+            self.misses += n_missing
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            embeds, _ = pipe.encode_prompt([k[-1] for k in missing], pipe._execution_device, 1, False)
+            for k, e in zip(missing, embeds.split(1)):
+                found[k] = e.clone()  # own storage, so the size accounting is exact
+                self._put(k, found[k])
+        return [found[k] for k in keys]
+
+    def _put(self, key, tensor):
+        size = tensor.element_size() * tensor.nelement()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = tensor
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.element_size() * old.nelement()
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "mb": round(self._bytes / 1024 / 1024, 2),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+_default_cache: PromptEmbeddingCache | None = None
+_default_lock = threading.Lock()
+
+def get_prompt_cache() -> PromptEmbeddingCache:
+    """The process-wide embedding cache shared by every TextToImageController."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PromptEmbeddingCache()
+        return _default_cache
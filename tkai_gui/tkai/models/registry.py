@@ -0,0 +1,199 @@
+from __future__ import annotations
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from tkai.config import DEFAULTS
+
+def _tensor_nbytes(values, seen: set) -> int:
+    total = 0
+    for t in values:
+        if isinstance(t, (tuple, list)):  # packed quantized weights are (weight, bias) tuples
+            total += _tensor_nbytes(t, seen)
+        elif hasattr(t, "element_size") and hasattr(t, "numel") and id(t) not in seen:
+            seen.add(id(t))
+            total += t.numel() * t.element_size()
+    return total
+
+def module_nbytes(module: Any, seen: Optional[set] = None) -> int:
+    """Bytes held by a torch module's parameters and buffers, including dynamically quantized weights."""
+    seen = set() if seen is None else seen
+    try:
+        return _tensor_nbytes(list(module.parameters()) + list(module.buffers())
+                              + list(module.state_dict(keep_vars=True).values()), seen)
+    except Exception:
+        return 0
+
+def estimate_nbytes(pipe: Any) -> int:
+    """
+    Approximate resident size of a pipeline: its own `nbytes` when it reports one (NumPy/ONNX
+    classifiers, worker pools), else the parameters/buffers of its torch modules.
+    """
+    own = getattr(pipe, "nbytes", None)
+    if isinstance(own, int) and own > 0:
+        return own
+    modules = []
+    components = getattr(pipe, "components", None)  # diffusers pipelines
+    if isinstance(components, dict):
+        modules.extend(components.values())
+    modules.append(getattr(pipe, "model", None))  # transformers pipelines
+    modules.append(pipe)
+    seen, total = set(), 0
+    for m in modules:
+        if m is None or not hasattr(m, "parameters") or not callable(m.parameters):
+            continue
+        total += module_nbytes(m, seen)
+    return total
+
+def _release(pipe: Any):
+    """Stop pipelines that own resources beyond memory (e.g. the classifier process pool)."""
+    shutdown = getattr(pipe, "shutdown", None)
+    if callable(shutdown):
+        shutdown()
+
+class _Entry:
+    def __init__(self, pipe: Any, nbytes: int):
+        self.pipe = pipe
+        self.nbytes = nbytes
+        self.pins = 0
+        self.last_used = time.monotonic()
+        self.run_lock = threading.RLock()
+
+def _release_all(entries: List[_Entry]):
+    """Release evicted or unloaded entries; call without the registry lock held."""
+    if not entries:
+        return
+    for entry in entries:
+        _release(entry.pipe)
+    entries.clear()  # drop the last references before collecting
+    gc.collect()
+
+class ModelRegistry:
+    """
+    Process-wide pool of loaded pipelines, shared by every controller and window.
+    Pipelines are keyed by (task, model id, ...) and loaded lazily on first use. When the estimated
+    resident size exceeds `ram_budget_mb`, least-recently-used pipelines that are not currently
+    running are unloaded. Each pipeline carries a lock so it is never driven by two threads at once.
+    """
+    def __init__(self, ram_budget_mb: Optional[float] = None):
+        self._budget = int(ram_budget_mb * 1024 * 1024) if ram_budget_mb else None
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._load_locks: Dict[Hashable, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def set_budget(self, ram_budget_mb: Optional[float]):
+        with self._lock:
+            self._budget = int(ram_budget_mb * 1024 * 1024) if ram_budget_mb else None
+            evicted = self._evict_locked()
+        _release_all(evicted)
+
+    def peek(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.pipe if entry else None
+
+    def put(self, key: Hashable, pipe: Any) -> Any:
+        """Register an already-built pipeline (e.g. a local stand-in) under `key`."""
+        with self._lock:
+            self._entries[key] = _Entry(pipe, estimate_nbytes(pipe))
+            evicted = self._evict_locked(keep=key)
+        _release_all(evicted)
+        return pipe
+
+    def load(self, key: Hashable, loader: Callable[[], Any]) -> tuple:
+        """Return (pipe, loaded_now). Concurrent callers for the same key share one load."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return entry.pipe, False
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            existing = self.peek(key)
+            if existing is not None:
+                return existing, False
+            pipe = loader()
+            with self._lock:
+                self._entries[key] = _Entry(pipe, estimate_nbytes(pipe))
+                self.loads += 1
+                evicted = self._evict_locked(keep=key)
+            _release_all(evicted)
+            return pipe, True
+
+    def unload(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.pins:
+                return False
+            del self._entries[key]
+        _release_all([entry])
+        return True
+
+    @contextmanager
+    def hold(self, key: Hashable, loader: Callable[[], Any]) -> Iterator[Any]:
+        """Pin the pipeline against eviction and hold its run lock for the duration of a run."""
+        while True:
+            self.load(key, loader)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.pins += 1
+                    break
+        try:
+            with entry.run_lock:
+                entry.last_used = time.monotonic()
+                yield entry.pipe
+        finally:
+            with self._lock:
+                entry.pins -= 1
+                entry.last_used = time.monotonic()
+
+    def loaded(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"key": k, "mb": e.nbytes / (1024 * 1024), "in_use": e.pins > 0}
+                    for k, e in self._entries.items()]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": len(self._entries),
+                "resident_mb": sum(e.nbytes for e in self._entries.values()) / (1024 * 1024),
+                "budget_mb": self._budget / (1024 * 1024) if self._budget else None,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    # ---------- internals ----------
+    def _evict_locked(self, keep: Optional[Hashable] = None) -> List[_Entry]:
+        """
+        Drop least-recently-used entries until the budget is met and return them; the caller releases
+        them with _release_all() after unlocking (stopping a worker pool can take seconds).
+        """
+        if self._budget is None:
+            return []
+        total = sum(e.nbytes for e in self._entries.values())
+        candidates = sorted((e.last_used, k) for k, e in self._entries.items() if k != keep and not e.pins)
+        evicted = []
+        for _, k in candidates:
+            if total <= self._budget:
+                break
+            entry = self._entries.pop(k)
+            total -= entry.nbytes
+            self.evictions += 1
+            evicted.append(entry)
+        return evicted
+
+_default_registry: Optional[ModelRegistry] = None
+_default_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """The shared registry used by controllers unless one is injected."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry(ram_budget_mb=DEFAULTS["model_ram_budget_mb"])
+        return _default_registry
@@ -1,91 +1,333 @@
 from __future__ import annotations
-import torch
+import random
+import time
+import weakref
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 
 from PIL import Image
 
-from tkai.models.base import BaseModelController, measure_time, catch_exceptions, require_loaded
+from tkai.models.base import BaseModelController, measure_time, catch_exceptions, require_loaded, cached_result, recorded
+from tkai.models.registry import ModelRegistry
+from tkai.models.prompt_cache import PromptEmbeddingCache, get_prompt_cache, supports_prompt_embeds
+from tkai.models.perf_modes import (PerfOptions, resolve_perf_mode, configure_threads, prepare_pipeline,
+                                    configure_for_size, effective_dtype, autocast)
 from tkai.services.logger_service import LoggerService
-from tkai.services.io_utils import validate_prompt, save_image, save_json, timestamp
+from tkai.services.result_cache import ResultCache, normalize_text
+from tkai.services.io_utils import validate_prompt
+from tkai.services.output_writer import OutputWriter
+from tkai.services.run_history import RunHistory, new_run_id, run_stem
+from tkai.services.telemetry import MetricsRegistry, stage
 from tkai.config import DEFAULTS, MODEL_DESCRIPTIONS
 
+def _make_generator(seed: int):
+    """CPU generator seeded per image so each output is reproducible on its own."""
+    import torch
+    return torch.Generator(device="cpu").manual_seed(int(seed))
+
+def _random_seed() -> int:
+    """Seed for an item that came without one, recorded so the output can still be reproduced."""
+    return random.randrange(2 ** 32)
+
+# Linear latent -> RGB approximation for 4-channel SD 1.x/2.x latents; far cheaper than a VAE decode
+_LATENT_RGB_FACTORS = (
+    (0.298, 0.207, 0.208),
+    (0.187, 0.286, 0.173),
+    (-0.158, 0.189, 0.264),
+    (-0.184, -0.271, -0.473),
+)
+
+def latents_to_preview(latents, size: int = 128) -> Image.Image | None:
+    """Cheap low-res preview of the first latent in a batch, or None for unsupported latent spaces."""
+    import torch
+    if latents is None or latents.ndim != 4 or latents.shape[1] != len(_LATENT_RGB_FACTORS):
+        return None
+    factors = torch.tensor(_LATENT_RGB_FACTORS, dtype=torch.float32)
+    rgb = torch.einsum("chw,cr->hwr", latents[0].detach().float().cpu(), factors)
+    arr = ((rgb + 1.0) * 127.5).clamp(0, 255).to(torch.uint8).numpy()
+    img = Image.fromarray(arr, "RGB")
+    scale = size / max(img.size)
+    return img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.BILINEAR)
+
+# img2img views built with from_pipe(), dropped together with the text-to-image pipeline they share weights with
+_IMG2IMG: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+class RunCancelled(Exception):
+    """Raised from the step callback to abort the denoising loop."""
+
+def _step_callback(total_steps: int, progress: Callable[[Dict[str, Any]], None] | None = None,
+                   cancel_event=None, previews: bool = True):
+    """Build a diffusers `callback_on_step_end` that streams progress and honours cancellation."""
+    t0 = time.perf_counter()
+    def callback(pipe, step: int, timestep, callback_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled()
+        if progress is not None:
+            done = step + 1
+            elapsed = time.perf_counter() - t0
+            event = {"step": done, "total": total_steps, "elapsed_sec": elapsed,
+                     "eta_sec": elapsed / done * max(0, total_steps - done)}
+            if previews:
+                event["preview"] = latents_to_preview(callback_kwargs.get("latents"))
+            progress(event)
+        return callback_kwargs
+    return callback
+
 # Mixins for multiple inheritance
 class TextIOMixin:
     def _prepare_text(self, prompt: str, max_len: int) -> str:
         return validate_prompt(prompt, max_len=max_len)
 
 class ImageIOMixin:
-    def _save_outputs(self, img: Image.Image, meta: Dict[str, Any]) -> Dict[str, Any]:
-        stem = f"t2i_{timestamp()}"
-        out_img = save_image(img, "outputs", stem)
-        out_json = save_json(meta, "outputs", stem)
+    def _save_outputs(self, img: Image.Image, meta: Dict[str, Any], stem: str | None = None) -> Dict[str, Any]:
+        """Queue the image and its sidecar on the background writer; returns their final paths right away."""
+        stem = stem or run_stem("t2i", meta.get("run_id") or new_run_id())
+        with stage("save"):
+            out_img = self._writer.save_image(img, "outputs", stem)
+            out_json = self._writer.save_json(meta, "outputs", stem)
         return {"image_path": str(out_img), "json_path": str(out_json)}
 
 class TextToImageController(BaseModelController, TextIOMixin, ImageIOMixin):
     """
     Polymorphic controller for Text-to-Image using diffusers AutoPipelineForText2Image.
-    Overridden methods: load_model(), run()
+    Overridden methods: _build_pipeline(), run()
     """
-    def __init__(self, logger: LoggerService):
-        super().__init__(logger)
-        self._name = DEFAULTS["t2i_model"]
+    def __init__(self, logger: LoggerService, cache: ResultCache | None = None,
+                 registry: ModelRegistry | None = None, model_name: str | None = None,
+                 perf_mode: str | PerfOptions | None = None, writer: OutputWriter | None = None,
+                 history: RunHistory | None = None, metrics: MetricsRegistry | None = None,
+                 prompt_cache: PromptEmbeddingCache | None = None, intra_op_threads: int | None = None,
+                 inter_op_threads: int | None = None):
+        super().__init__(logger, cache=cache, registry=registry, writer=writer, history=history, metrics=metrics)
+        self._prompt_cache = prompt_cache or get_prompt_cache()
+        self._name = model_name or DEFAULTS["t2i_model"]
         self._category = "Text → Image"
-        self._pipe = None
+        self._task = "text-to-image"
+        self._threads = (intra_op_threads, inter_op_threads)
+        self._perf = resolve_perf_mode(perf_mode or DEFAULTS["t2i_perf_mode"], *self._threads)
 
-    @catch_exceptions
-    @measure_time
-    def load_model(self) -> Dict[str, Any]:
+    @property
+    def perf_options(self) -> PerfOptions:
+        return self._perf
+
+    def set_perf_mode(self, mode: str | PerfOptions) -> None:
+        """Switch performance mode; load-time options (channels-last, compile) select a separate pipeline."""
+        self._perf = resolve_perf_mode(mode, *self._threads)
+        if self._loaded:
+            self._logger.info(f"Threads: {configure_threads(self._perf)}")
+
+    def _registry_key(self):
+        return (self._task, self._name, self._perf.build_key())
+
+    def _build_pipeline(self):
         import torch
         from diffusers import AutoPipelineForText2Image
 
-        self._logger.info("Loading Text-to-Image model...")
-        device = "cpu"
-        torch.set_num_threads(max(1, torch.get_num_threads()))
-        self._pipe = AutoPipelineForText2Image.from_pretrained(
+        self._logger.info(f"Loading Text-to-Image model {self._name} ({self._perf.build_key()})...")
+        self._logger.info(f"Threads: {configure_threads(self._perf)}")
+        # Weights stay float32; bfloat16 is applied per run through autocast
+        # safetensors weights are memory-mapped and loaded straight into meta-initialised modules,
+        # so RAM does not briefly hold a randomly initialised copy as well
+        pipe = AutoPipelineForText2Image.from_pretrained(
             self._name,
             torch_dtype=torch.float32,
-            use_safetensors=True
+            use_safetensors=True,
+            low_cpu_mem_usage=True,
+            disable_mmap=False,
         )
-        self._pipe.to("cpu")
-        self._loaded = True
-        return {"ok": True, "model": self._name, "device": device}
+        pipe.to("cpu")
+        return prepare_pipeline(pipe, self._perf)
+
+    def _warm_up(self, pipe) -> None:
+        import torch
+        px = DEFAULTS["t2i_warmup_px"]
+        # One step at a tiny size runs the text encoder, UNet and VAE once
+        with torch.inference_mode(), autocast(self._perf):
+            pipe(prompt="warm-up", width=px, height=px, num_inference_steps=1, guidance_scale=0.0)
+
+    def _img2img_pipe(self):
+        """Image-to-image view of the held pipeline; shares its components, so no extra weights are loaded."""
+        pipe = self._pipe
+        img2img = _IMG2IMG.get(pipe)
+        if img2img is None:
+            from diffusers import AutoPipelineForImage2Image
+            img2img = _IMG2IMG[pipe] = AutoPipelineForImage2Image.from_pipe(pipe)
+        return img2img
+
+    def _call_pipe(self, width: int, height: int, img2img: bool = False, **kwargs):
+        """Run the held pipeline with this controller's performance mode; returns (images, perf metadata)."""
+        import torch
+        sizing = configure_for_size(self._pipe, self._perf, width, height)
+        # img2img takes its size from the input images
+        pipe, size = (self._img2img_pipe(), {}) if img2img else (self._pipe, {"width": int(width), "height": int(height)})
+        with torch.inference_mode(), autocast(self._perf):
+            kwargs = self._with_prompt_embeds(pipe, kwargs)
+            # Denoising and the VAE decode (and text encoding, without cached embeddings) happen in the pipeline call
+            with stage("forward"):
+                images = pipe(**size, **kwargs).images
+        perf = {
+            "mode": self._perf.as_dict(),
+            "dtype": effective_dtype(self._perf),
+            "intra_op_threads": torch.get_num_threads(),
+            "inter_op_threads": torch.get_num_interop_threads(),
+            **sizing,
+        }
+        return images, perf
+
+    def _with_prompt_embeds(self, pipe, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace prompt/negative_prompt with text-encoder embeddings from the prompt cache, when the pipeline takes them."""
+        if self._prompt_cache.max_bytes <= 0 or not supports_prompt_embeds(pipe):
+            return kwargs
+        import torch
+        kwargs = dict(kwargs)
+        prompt = kwargs.pop("prompt")
+        prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        negative = kwargs.pop("negative_prompt", None)
+        texts = list(prompts)
+        # Without classifier-free guidance (sd-turbo's guidance 0) the pipeline never encodes the negative prompt
+        if float(kwargs.get("guidance_scale", 0.0)) > 1.0:
+            negatives = negative if isinstance(negative, list) else [negative] * len(prompts)
+            texts += [n or "" for n in negatives]  # no negative prompt means the empty one
+        with stage("encode"):
+            embeds = self._prompt_cache.encode(pipe, (self._name, effective_dtype(self._perf)), texts)
+        kwargs["prompt_embeds"] = torch.cat(embeds[:len(prompts)])
+        if len(embeds) > len(prompts):
+            kwargs["negative_prompt_embeds"] = torch.cat(embeds[len(prompts):])
+        return kwargs
 
     def summarize_info(self) -> Dict[str, str]:
+        pc = self._prompt_cache.stats()
         return {
             "Model Name": self._name,
             "Category": self._category,
-            "Description": MODEL_DESCRIPTIONS.get(self._name, "N/A")
+            "Description": MODEL_DESCRIPTIONS.get(self._name, "N/A"),
+            "Prompt cache": f"{pc['hit_rate']:.0%} hits ({pc['hits']}/{pc['hits'] + pc['misses']}), "
+                            f"{pc['entries']} entries, {pc['mb']:.1f} MB",
         }
 
     def validate_input(self, prompt: str, negative_prompt: str = "", **kwargs) -> None:
         _ = self._prepare_text(prompt, DEFAULTS["prompt_maxlen"])
         # negative prompt may be empty; keep simple
 
+    def _resolve_params(self, width: int = None, height: int = None, steps: int = None, guidance: float = None):
+        return (
+            int(width or DEFAULTS["image_size"][0]),
+            int(height or DEFAULTS["image_size"][1]),
+            int(steps or DEFAULTS["t2i_steps"]),
+            float(guidance if guidance is not None else DEFAULTS["t2i_guidance"]),
+        )
+
+    def _run_cache_key(self, prompt: str, negative_prompt: str = "", width: int = None, height: int = None,
+                       steps: int = None, guidance: float = None, seed: int = None, **_) -> str | None:
+        if seed is None:
+            return None  # unseeded runs are meant to differ every time
+        width, height, steps, guidance = self._resolve_params(width, height, steps, guidance)
+        return ResultCache.make_key(
+            self._name,
+            {"prompt": normalize_text(prompt), "negative_prompt": normalize_text(negative_prompt)},
+            {"width": width, "height": height, "steps": steps, "guidance": guidance, "seed": int(seed),
+             "dtype": effective_dtype(self._perf)},
+        )
+
     @catch_exceptions
+    @recorded
+    @cached_result("_run_cache_key")
     @require_loaded
     @measure_time
-    def run(self, prompt: str, negative_prompt: str = "", width: int = None, height: int = None, steps: int = None, guidance: float = None) -> Dict[str, Any]:
-        width = width or DEFAULTS["image_size"][0]
-        height = height or DEFAULTS["image_size"][1]
-        steps = steps or DEFAULTS["t2i_steps"]
-        guidance = guidance if guidance is not None else DEFAULTS["t2i_guidance"]
+    def run(self, prompt: str, negative_prompt: str = "", width: int = None, height: int = None, steps: int = None, guidance: float = None, seed: int = None,
+            progress: Callable[[Dict[str, Any]], None] | None = None, cancel_event=None, previews: bool = True) -> Dict[str, Any]:
+        """
+        Generate one image. `progress(event)` receives {"step", "total", "elapsed_sec", "eta_sec", "preview"}
+        after every denoising step; setting `cancel_event` aborts the loop at the next step.
+        """
+        width, height, steps, guidance = self._resolve_params(width, height, steps, guidance)
 
-        prompt = self._prepare_text(prompt, DEFAULTS["prompt_maxlen"])
-        n_prompt = (negative_prompt or "").strip()
+        with stage("validate"):
+            prompt = self._prepare_text(prompt, DEFAULTS["prompt_maxlen"])
+            n_prompt = (negative_prompt or "").strip()
+
+        self._logger.info(f"Generating image {width}x{height}, steps={steps}, guidance={guidance}, seed={seed}")
+        extra = {}
+        if progress is not None or cancel_event is not None:
+            extra["callback_on_step_end"] = _step_callback(steps, progress, cancel_event, previews)
+            extra["callback_on_step_end_tensor_inputs"] = ["latents"]
+        try:
+            images, perf = self._call_pipe(
+                width, height,
+                prompt=prompt,
+                negative_prompt=n_prompt if n_prompt else None,
+                num_inference_steps=int(steps),
+                guidance_scale=float(guidance),
+                generator=_make_generator(seed) if seed is not None else None,
+                **extra
+            )
+            img = images[0]
+        except RunCancelled:
+            self._logger.info("Generation cancelled")
+            return {"ok": False, "error": "Cancelled", "cancelled": True}
+
+        meta = self._item_meta(new_run_id(), prompt, n_prompt, seed, width, height, steps, guidance, perf)
+        paths = self._save_outputs(img, meta)
+        meta.update(paths)
+        meta["preview_image"] = img
+        return meta
 
-        self._logger.info(f"Generating image {width}x{height}, steps={steps}, guidance={guidance}")
-        img = self._pipe(
-            prompt=prompt,
-            negative_prompt=n_prompt if n_prompt else None,
-            num_inference_steps=int(steps),
-            guidance_scale=float(guidance),
-            width=int(width),
-            height=int(height)
-        ).images[0]
-
-        meta = {
+    def _batch_plan(self, prompts: List[str], seeds: List[int] | None, num_images_per_prompt: int,
+                    base_seed: int) -> Tuple[List[str], List[int]]:
+        with stage("validate"):
+            prompts = [self._prepare_text(p, DEFAULTS["prompt_maxlen"]) for p in prompts]
+        if not prompts:
+            raise ValueError("No prompts given.")
+        if seeds is None:
+            seeds = [base_seed + i for i in range(int(num_images_per_prompt))]
+        seeds = [int(s) for s in seeds]
+        if not seeds:
+            raise ValueError("At least one image per prompt is required.")
+        return prompts, seeds
+
+    def _render(self, prompts: List[str], seeds: List[int], n_prompt: str, width: int, height: int, steps: int,
+                guidance: float, batch_size: int, cancel_event=None) -> Iterator[Tuple[List[Tuple[str, int, Image.Image]], Dict[str, Any]]]:
+        """
+        Render every prompt once per seed with as few pipeline calls as possible. Yields one
+        ([(prompt, seed, image), ...], perf) per micro-batch; raises RunCancelled when `cancel_event` is set.
+        """
+        per_prompt = len(seeds)
+        batch_size = max(1, int(batch_size))
+        if per_prompt <= batch_size:
+            # Whole prompts per call: as many as fit, each with all of its seeds
+            per_call = batch_size // per_prompt
+            calls = [(prompts[i:i + per_call], seeds) for i in range(0, len(prompts), per_call)]
+        else:
+            # More seeds than one call may render: each call is one prompt with a slice of its seeds
+            calls = [([p], seeds[j:j + batch_size]) for p in prompts for j in range(0, per_prompt, batch_size)]
+        self._logger.info(f"Generating {len(prompts) * per_prompt} images ({len(prompts)} prompts x {per_prompt} seeds), "
+                          f"{width}x{height}, steps={steps}, micro-batch={max(len(c) * len(cs) for c, cs in calls)}")
+        for chunk, chunk_seeds in calls:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RunCancelled()
+            n = len(chunk_seeds)
+            # diffusers expands prompts prompt-major: p0 x n, p1 x n, ...
+            generators = [_make_generator(s) for _ in chunk for s in chunk_seeds]
+            extra = {}
+            if cancel_event is not None:
+                extra["callback_on_step_end"] = _step_callback(steps, cancel_event=cancel_event)
+            images, perf = self._call_pipe(
+                width, height,
+                prompt=chunk,
+                negative_prompt=[n_prompt] * len(chunk) if n_prompt else None,
+                num_images_per_prompt=n,
+                num_inference_steps=int(steps),
+                guidance_scale=float(guidance),
+                generator=generators,
+                **extra
+            )
+            yield [(chunk[j // n], chunk_seeds[j % n], img) for j, img in enumerate(images)], perf
+
+    def _item_meta(self, run_id: str, prompt: str, n_prompt: str, seed: int | None, width: int, height: int,
+                   steps: int, guidance: float, perf: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "ok": True,
+            "run_id": run_id,
             "task": "text-to-image",
             "model": self._name,
             "prompt": prompt,
@@ -94,7 +336,161 @@ class TextToImageController(BaseModelController, TextIOMixin, ImageIOMixin):
             "height": height,
             "steps": steps,
             "guidance": guidance,
+            "seed": seed,
+            "perf": perf,
         }
-        paths = self._save_outputs(img, meta)
-        meta.update(paths)
-        return meta
+
+    @catch_exceptions
+    @recorded
+    @require_loaded
+    @measure_time
+    def run_batch(self, prompts: List[str], negative_prompt: str = "", seeds: List[int] | None = None,
+                  num_images_per_prompt: int = 1, base_seed: int = 0, batch_size: int | None = None,
+                  width: int = None, height: int = None, steps: int = None, guidance: float = None,
+                  progress: Callable[[int, int], None] | None = None, cancel_event=None) -> Dict[str, Any]:
+        """
+        Generate images for several prompts with as few pipeline calls as possible.
+        Each prompt is rendered once per entry in `seeds`; without `seeds`, `num_images_per_prompt`
+        images are rendered with seeds base_seed, base_seed+1, ... Prompts are grouped into
+        micro-batches of at most `batch_size` images per pipeline call.
+        `progress(done, total)` is called after each micro-batch; setting `cancel_event` stops between them.
+        """
+        width, height, steps, guidance = self._resolve_params(width, height, steps, guidance)
+        batch_size = batch_size or DEFAULTS["t2i_batch_size"]
+        prompts, seeds = self._batch_plan(prompts, seeds, num_images_per_prompt, base_seed)
+        n_prompt = (negative_prompt or "").strip()
+
+        batch_id = new_run_id()
+        batch_stem = run_stem("t2i", batch_id)
+        items = []
+        total = len(prompts) * len(seeds)
+        try:
+            for rendered, perf in self._render(prompts, seeds, n_prompt, width, height, steps, guidance,
+                                               batch_size, cancel_event):
+                for prompt, seed, img in rendered:
+                    meta = self._item_meta(f"{batch_id}-{len(items):04d}", prompt, n_prompt, seed,
+                                           width, height, steps, guidance, perf)
+                    meta.update(self._save_outputs(img, meta, stem=f"{batch_stem}_{len(items):04d}"))
+                    items.append(meta)
+                if progress is not None:
+                    progress(len(items), total)
+        except RunCancelled:
+            return {"ok": False, "error": "Cancelled", "cancelled": True, "items": items}
+
+        return {
+            "ok": True,
+            "run_id": batch_id,
+            "task": "text-to-image-batch",
+            "model": self._name,
+            "num_images": len(items),
+            "batch_size": batch_size,
+            "items": items,
+        }
+
+    @catch_exceptions
+    @require_loaded
+    @measure_time
+    def generate_images(self, prompts: List[str], negative_prompt: str = "", seeds: List[int] | None = None,
+                        num_images_per_prompt: int = 1, base_seed: int = 0, batch_size: int | None = None,
+                        width: int = None, height: int = None, steps: int = None, guidance: float = None,
+                        progress: Callable[[int, int], None] | None = None, cancel_event=None) -> Dict[str, Any]:
+        """
+        Same rendering as run_batch(), but nothing is written: each item keeps its image in memory under
+        "preview_image" for the next stage of a chain (see tkai.models.chain). Not recorded in the history.
+        """
+        width, height, steps, guidance = self._resolve_params(width, height, steps, guidance)
+        batch_size = batch_size or DEFAULTS["t2i_batch_size"]
+        prompts, seeds = self._batch_plan(prompts, seeds, num_images_per_prompt, base_seed)
+        n_prompt = (negative_prompt or "").strip()
+
+        batch_id = new_run_id()
+        items = []
+        total = len(prompts) * len(seeds)
+        try:
+            for rendered, perf in self._render(prompts, seeds, n_prompt, width, height, steps, guidance,
+                                               batch_size, cancel_event):
+                for prompt, seed, img in rendered:
+                    meta = self._item_meta(f"{batch_id}-{len(items):04d}", prompt, n_prompt, seed,
+                                           width, height, steps, guidance, perf)
+                    meta["preview_image"] = img
+                    items.append(meta)
+                if progress is not None:
+                    progress(len(items), total)
+        except RunCancelled:
+            return {"ok": False, "error": "Cancelled", "cancelled": True}
+        return {"ok": True, "run_id": batch_id, "task": "text-to-image-batch", "model": self._name,
+                "num_images": len(items), "items": items}
+
+    @catch_exceptions
+    @require_loaded
+    @measure_time
+    def refine_images(self, images: List[Image.Image], prompts: List[str], negative_prompt: str = "",
+                      seeds: List[int | None] | None = None, strength: float | None = None, steps: int = None,
+                      guidance: float = None, batch_size: int | None = None, width: int | None = None,
+                      height: int | None = None, cancel_event=None) -> Dict[str, Any]:
+        """
+        Image-to-image pass over in-memory images, one prompt (and optional seed) per image, using an
+        img2img pipeline that shares the loaded text-to-image weights. Only int(steps * strength)
+        denoising steps run. With `width`/`height`, images are first upscaled to that size, which turns
+        low-resolution drafts into full-size images. Images without a seed get a random one, recorded
+        in their item. Items carry the refined image under "preview_image"; nothing is written.
+        """
+        _, _, steps, guidance = self._resolve_params(None, None, steps, guidance)
+        strength = float(strength if strength is not None else DEFAULTS["img2img_strength"])
+        batch_size = int(batch_size or DEFAULTS["t2i_batch_size"])
+        if len(prompts) != len(images):
+            raise ValueError("refine_images needs one prompt per image.")
+        if not 0.0 < strength <= 1.0:
+            raise ValueError("strength must be in (0, 1].")
+        if int(steps * strength) < 1:
+            raise ValueError(f"steps x strength must be at least 1 (got {steps} x {strength}).")
+        # Generators are per item, so unseeded items draw their own seed instead of unseeding the whole call
+        seeds = [int(s) if s is not None else _random_seed() for s in (seeds or [None] * len(images))]
+        with stage("validate"):
+            prompts = [self._prepare_text(p, DEFAULTS["prompt_maxlen"]) for p in prompts]
+        n_prompt = (negative_prompt or "").strip()
+        source_sizes = [img.size for img in images]
+        if width or height:
+            target = (int(width or images[0].width), int(height or images[0].height))
+            with stage("upscale"):
+                images = [img if img.size == target else img.convert("RGB").resize(target, Image.LANCZOS)
+                          for img in images]
+
+        # One pipeline call needs equally sized inputs; keep the original order in the output
+        by_size: Dict[Tuple[int, int], List[int]] = {}
+        for i, img in enumerate(images):
+            by_size.setdefault(img.size, []).append(i)
+        calls = [idx[j:j + batch_size] for idx in by_size.values() for j in range(0, len(idx), batch_size)]
+        self._logger.info(f"Refining {len(images)} images, strength={strength}, steps={steps}, {len(calls)} call(s)")
+
+        batch_id = new_run_id()
+        items: List[Dict[str, Any] | None] = [None] * len(images)
+        for idx in calls:
+            if cancel_event is not None and cancel_event.is_set():
+                return {"ok": False, "error": "Cancelled", "cancelled": True}
+            extra = {}
+            if cancel_event is not None:
+                extra["callback_on_step_end"] = _step_callback(steps, cancel_event=cancel_event)
+            width, height = images[idx[0]].size
+            try:
+                out, perf = self._call_pipe(
+                    width, height, img2img=True,
+                    image=[images[i] for i in idx],
+                    prompt=[prompts[i] for i in idx],
+                    negative_prompt=[n_prompt] * len(idx) if n_prompt else None,
+                    strength=strength,
+                    num_inference_steps=int(steps),
+                    guidance_scale=float(guidance),
+                    generator=[_make_generator(seeds[i]) for i in idx],
+                    **extra
+                )
+            except RunCancelled:
+                return {"ok": False, "error": "Cancelled", "cancelled": True}
+            for i, img in zip(idx, out):
+                meta = self._item_meta(f"{batch_id}-{i:04d}", prompts[i], n_prompt, seeds[i],
+                                       width, height, steps, guidance, perf)
+                meta.update(task="image-to-image", strength=strength, source_size=list(source_sizes[i]),
+                            preview_image=img)
+                items[i] = meta
+        return {"ok": True, "run_id": batch_id, "task": "image-to-image-batch", "model": self._name,
+                "num_images": len(items), "items": items}
@@ -0,0 +1,143 @@
+"""
+Duplicate detection for large classification jobs.
+
+Every file gets a SHA-256 of its bytes (exact duplicates). With a `threshold` >= 0 (opt-in), each
+distinct file also gets a 64-bit difference hash (dHash) of a 9x8 grayscale thumbnail plus its mean
+colour (near duplicates: re-encodes, resizes, small edits). Both run on a thread pool; JPEGs are
+decoded at reduced scale, so hashing costs a small fraction of a forward pass. Hamming distances are
+computed block-wise with numpy, and images are grouped around the first image of each group (a
+"leader"): every member is within `threshold` bits and COLOR_TOLERANCE of the image the model
+actually sees, so chains of small differences never merge unrelated images, and neither do images
+that only share their grayscale structure (flat or gradient images in different colours).
+Files that cannot be read or decoded are never merged: each stays its own group.
+"""
+from __future__ import annotations
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from tkai.config import DEFAULTS
+from tkai.services.result_cache import hash_file
+
+HASH_SIDE = 8
+COLOR_TOLERANCE = 12.0  # max difference of any mean RGB channel (0-255) between near duplicates
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+@dataclass
+class DedupResult:
+    """`leader[i]` is the index of the input whose predictions input i reuses (itself for leaders)."""
+    leader: List[int]
+    exact: int = 0
+    near: int = 0
+    unreadable: int = 0
+    threshold: int = 0
+    hash_sec: float = 0.0
+
+    @property
+    def leaders(self) -> List[int]:
+        return [i for i, lead in enumerate(self.leader) if lead == i]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"images": len(self.leader), "unique": len(self.leaders), "exact_duplicates": self.exact,
+                "near_duplicates": self.near, "unreadable": self.unreadable, "threshold": self.threshold,
+                "hash_sec": round(self.hash_sec, 4)}
+
+def _thumbnail(path: str | Path) -> Tuple[np.ndarray, np.ndarray] | None:
+    """Grayscale hash pixels and mean RGB colour of one file; None if it cannot be decoded."""
+    try:
+        with Image.open(path) as img:
+            if img.format == "JPEG":
+                img.draft("RGB", (HASH_SIDE * 8, HASH_SIDE * 8))  # libjpeg scales down while decoding
+            small = img.convert("RGB").resize((HASH_SIDE + 1, HASH_SIDE), Image.BOX)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    color = np.asarray(small, dtype=np.float32).reshape(-1, 3).mean(axis=0)
+    return np.asarray(small.convert("L"), dtype=np.int16), color
+
+def fingerprints(paths: List[str | Path], workers: int | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (dHashes as uint64, mean RGB colours [n, 3], decoded flags), one row per path. A dHash bit is set
+    where a pixel is brighter than its right neighbour; undecodable files get hash 0 and flag False.
+    """
+    n = len(paths)
+    hashes, colors, ok = np.zeros(n, dtype=np.uint64), np.zeros((n, 3), dtype=np.float32), np.zeros(n, dtype=bool)
+    if not n:
+        return hashes, colors, ok
+    with ThreadPoolExecutor(max_workers=workers or DEFAULTS["io_workers"]) as pool:
+        thumbs = list(pool.map(_thumbnail, paths))
+    ok[:] = [t is not None for t in thumbs]
+    if ok.any():
+        pixels = np.stack([t[0] for t in thumbs if t is not None])
+        bits = (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(pixels), -1)
+        hashes[ok] = np.packbits(bits, axis=1).view(">u8").ravel()
+        colors[ok] = [t[1] for t in thumbs if t is not None]
+    return hashes, colors, ok
+
+def dhashes(paths: List[str | Path], workers: int | None = None) -> np.ndarray:
+    """64-bit difference hashes (uint64), one per path; see fingerprints()."""
+    return fingerprints(paths, workers)[0]
+
+def _digest(path: str | Path) -> str | None:
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+def hamming_matches(hashes: np.ndarray, threshold: int, block: int = 64) -> List[np.ndarray]:
+    """
+    For each hash, the indices of earlier hashes within `threshold` differing bits (ascending).
+    Works `block` rows at a time, so memory grows with block x len(hashes) rather than len(hashes)^2.
+    """
+    n = len(hashes)
+    matches: List[np.ndarray] = []
+    for start in range(0, n, block):
+        rows = hashes[start:start + block]
+        # XOR against every earlier hash, then popcount byte by byte
+        dist = _POPCOUNT[(rows[:, None] ^ hashes[None, :start + len(rows)]).view(np.uint8)]
+        dist = dist.reshape(len(rows), -1, 8).sum(axis=2)
+        for r in range(len(rows)):
+            i = start + r
+            matches.append(np.flatnonzero(dist[r, :i] <= threshold))
+    return matches
+
+def find_duplicates(paths: List[str | Path], threshold: int | None = None, workers: int | None = None) -> DedupResult:
+    """Group `paths` into exact and near duplicates; see the module docstring."""
+    t0 = time.perf_counter()
+    threshold = DEFAULTS["clf_dedup_threshold"] if threshold is None else int(threshold)
+    workers = workers or DEFAULTS["io_workers"]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(_digest, paths))
+
+    leader = list(range(len(paths)))
+    first_by_digest: Dict[str, int] = {}
+    for i, d in enumerate(digests):
+        if d is not None:
+            leader[i] = first_by_digest.setdefault(d, i)
+    distinct = [i for i, lead in enumerate(leader) if lead == i]
+    exact = len(paths) - len(distinct)
+    unreadable = sum(d is None for d in digests)
+
+    near = 0
+    if threshold >= 0 and len(distinct) > 1:
+        hashes, colors, ok = fingerprints([paths[i] for i in distinct], workers)
+        unreadable = sum(digests[i] is None or not ok[k] for k, i in enumerate(distinct))
+        matchable = np.zeros(len(distinct), dtype=bool)  # group leaders that decoded
+        for k, earlier in enumerate(hamming_matches(hashes, threshold)):
+            if not ok[k]:
+                continue  # undecodable: its own group, never matched against
+            lead = earlier[matchable[earlier]]
+            lead = lead[np.abs(colors[lead] - colors[k]).max(axis=1) <= COLOR_TOLERANCE]
+            if len(lead):
+                leader[distinct[k]] = distinct[lead[0]]
+                near += 1
+            else:
+                matchable[k] = True
+    # Exact copies follow their original into its near-duplicate group
+    leader = [leader[lead] for lead in leader]
+    return DedupResult(leader, exact=exact, near=near, unreadable=unreadable, threshold=threshold,
+                       hash_sec=time.perf_counter() - t0)
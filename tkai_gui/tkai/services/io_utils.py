@@ -1,6 +1,7 @@
 from __future__ import annotations
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
@@ -8,7 +9,9 @@ from typing import Tuple, Optional, Any, Dict, List
 
 from PIL import Image
 
-SUPPORTED_IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+SUPPORTED_IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+# In-memory values attached to results for the UI; never written to JSON, the result cache or the wire
+TRANSIENT_KEYS = ("preview_image",)
 
 def ensure_dir(path: str | Path) -> Path:
     p = Path(path)
@@ -34,9 +37,34 @@ def validate_image_path(path: str | Path) -> Path:
         raise ValueError(f"Unsupported image format: {p.suffix}")
     return p
 
-def load_image(path: str | Path) -> Image.Image:
+def load_image(path: str | Path, min_side: int | None = None) -> Image.Image:
+    """
+    Open an image as RGB. For JPEGs, `min_side` lets libjpeg decode at 1/2, 1/4 or 1/8 scale while
+    keeping both sides >= min_side, which is far cheaper than a full decode followed by a downscale.
+    """
     p = validate_image_path(path)
-    return Image.open(p).convert("RGB")
+    img = Image.open(p)
+    if min_side and img.format == "JPEG":
+        img.draft("RGB", (int(min_side), int(min_side)))
+    return img.convert("RGB")
+
+def list_images(folder: str | Path) -> List[Path]:
+    d = Path(folder)
+    if not d.is_dir():
+        raise NotADirectoryError(f"Folder not found: {d}")
+    return sorted(p for p in d.iterdir() if p.is_file() and p.suffix.lower() in SUPPORTED_IMAGE_EXTS)
+
+def load_images(paths: List[str | Path], workers: int = 4, min_side: int | None = None) -> List[Image.Image]:
+    """Decode several images in parallel (PIL releases the GIL while decoding)."""
+    if workers <= 1 or len(paths) <= 1:
+        return [load_image(p, min_side) for p in paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda p: load_image(p, min_side), paths))
+
+def json_ready(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of `result` without the in-memory TRANSIENT_KEYS, also dropped from lists of items."""
+    return {k: [json_ready(x) if isinstance(x, dict) else x for x in v] if isinstance(v, list) else v
+            for k, v in result.items() if k not in TRANSIENT_KEYS}
 
 def save_image(img: Image.Image, out_dir: str | Path, stem: str) -> Path:
     ensure_dir(out_dir)
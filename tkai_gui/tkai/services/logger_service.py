@@ -1,32 +1,165 @@
+"""
+Asynchronous, rotating logging for the GUI, CLI and model workers.
+
+Callers only format the record and put it on a bounded queue (a full queue drops the record and
+counts it, it never blocks a model worker). One listener thread per log file does all I/O:
+  - a size-rotated text log (or time-rotated with `rotate_when`, e.g. "midnight")
+  - optionally a JSON-lines twin (<log>.jsonl) whose records carry the keyword fields passed to
+    info()/warning()/..., such as run IDs and stage timings
+  - the console
+  - a bounded ring buffer of recent lines for the GUI
+Every LoggerService for the same file shares that pipeline, so creating one per controller is cheap.
+"""
+from __future__ import annotations
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from collections import deque
 from datetime import datetime
+from typing import Any, Deque, Dict, List
+
+from tkai.config import DEFAULTS
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+                 "level": record.levelname, "msg": record.getMessage(), "thread": record.threadName}
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, default=str)
+
+class _RingHandler(logging.Handler):
+    def __init__(self, ring: Deque[str]):
+        super().__init__()
+        self.ring = ring
+
+    def emit(self, record: logging.LogRecord):
+        self.ring.append(self.format(record))
+
+def _file_handler(path: str, max_bytes: int, backups: int, when: str | None) -> logging.Handler:
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backups, encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+
+class _Sink:
+    """Queue, listener thread and handlers for one log file."""
+    def __init__(self, log_file: str, structured: bool, max_bytes: int, backups: int, when: str | None,
+                 ring_size: int, queue_size: int, console: bool):
+        self.ring: Deque[str] = deque(maxlen=ring_size)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        text_handlers: List[logging.Handler] = [_file_handler(log_file, max_bytes, backups, when), _RingHandler(self.ring)]
+        if console:
+            text_handlers.append(logging.StreamHandler())
+        for h in text_handlers:
+            h.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers = list(text_handlers)
+        if structured:
+            jsonl = _file_handler(os.path.splitext(log_file)[0] + ".jsonl", max_bytes, backups, when)
+            jsonl.setFormatter(_JsonLinesFormatter())
+            handlers.append(jsonl)
+        self.handlers = handlers
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        self.queue_handler = _DroppingQueueHandler(self.queue)
+        # One logger per file; nothing propagates to the root logger (or gets written twice)
+        self.logger = logging.getLogger(f"tkai.sink{id(self):x}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.handlers[:] = [self.queue_handler]
+        self.stopped = False
+
+    def flush(self):
+        if not self.stopped:
+            self.queue.join()  # the listener marks each record done after all handlers ran
+        for h in self.handlers:
+            h.flush()
+
+    def stop(self):
+        if not self.stopped:
+            self.stopped = True
+            self.listener.stop()  # drains the queue first
+            for h in self.handlers:
+                h.close()
+
+_sinks: Dict[str, _Sink] = {}
+_sinks_lock = threading.Lock()
+
+@atexit.register
+def _stop_all():
+    with _sinks_lock:
+        for sink in _sinks.values():
+            sink.stop()
 
 class LoggerService:
     """
-    Simple file + memory logger for the GUI.
+    Non-blocking file + memory logger. Keyword arguments to info()/warning()/error()/exception()
+    become fields of the JSON-lines record, e.g. logger.info("done", run_id=rid, duration_sec=dt).
+    Options default to DEFAULTS["log_*"] and are fixed by the first LoggerService created for a file.
     """
-    def __init__(self, log_file: str = "logs/app.log"):
+    def __init__(self, log_file: str = "logs/app.log", structured: bool | None = None,
+                 max_bytes: int | None = None, backups: int | None = None, rotate_when: str | None = None,
+                 ring_size: int | None = None, console: bool = True):
         self.log_file = log_file
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s [%(levelname)s] %(message)s",
-            handlers=[
-                logging.FileHandler(self.log_file, encoding="utf-8"),
-                logging.StreamHandler()
-            ],
-        )
-        self._logger = logging.getLogger("tkai")
-
-    def info(self, msg: str):
-        self._logger.info(msg)
-
-    def warning(self, msg: str):
-        self._logger.warning(msg)
-
-    def error(self, msg: str):
-        self._logger.error(msg)
-
-    def exception(self, msg: str):
-        self._logger.exception(msg)
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        key = os.path.abspath(log_file)
+        with _sinks_lock:
+            sink = _sinks.get(key)
+            if sink is None or sink.stopped:
+                sink = _sinks[key] = _Sink(
+                    log_file,
+                    structured=DEFAULTS["log_json"] if structured is None else structured,
+                    max_bytes=max_bytes or DEFAULTS["log_max_mb"] * 1024 * 1024,
+                    backups=DEFAULTS["log_backups"] if backups is None else backups,
+                    when=rotate_when or DEFAULTS["log_rotate_when"],
+                    ring_size=ring_size or DEFAULTS["log_ring_size"],
+                    queue_size=DEFAULTS["log_queue_size"],
+                    console=console,
+                )
+        self._sink = sink
+        self._logger = sink.logger
+
+    @property
+    def ring(self) -> Deque[str]:
+        """Most recent formatted lines (bounded); shared by every LoggerService on this file."""
+        return self._sink.ring
+
+    @property
+    def dropped(self) -> int:
+        """Records discarded because the queue was full."""
+        return self._sink.queue_handler.dropped
+
+    def recent(self, n: int | None = None) -> List[str]:
+        lines = list(self._sink.ring)
+        return lines[-n:] if n else lines
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        self._sink.flush()
+
+    def info(self, msg: str, **fields: Any):
+        self._logger.info(msg, extra={"fields": fields})
+
+    def warning(self, msg: str, **fields: Any):
+        self._logger.warning(msg, extra={"fields": fields})
+
+    def error(self, msg: str, **fields: Any):
+        self._logger.error(msg, extra={"fields": fields})
+
+    def exception(self, msg: str, **fields: Any):
+        self._logger.exception(msg, extra={"fields": fields})
@@ -0,0 +1,193 @@
+"""
+Background writer for run outputs (images and JSON sidecars).
+
+Model workers hand finished results to `OutputWriter.save_image` / `save_json`, which return the final
+path immediately; encoding and disk I/O happen on a writer thread. The queue is bounded, so a worker
+only blocks when the disk falls that far behind. Each file is written to a temp name in the target
+directory and renamed into place, so readers never see a partial file.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from PIL import Image
+
+from tkai.config import DEFAULTS
+from tkai.services.io_utils import ensure_dir
+from tkai.services.telemetry import MetricsRegistry, get_metrics
+
+_IMAGE_FORMATS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+# Paths queued but not yet renamed into place, across all writers (see is_pending)
+_pending: Counter = Counter()
+_pending_lock = threading.Lock()
+_written = threading.Condition(_pending_lock)
+
+def is_pending(path: str | Path) -> bool:
+    """True while `path` is queued or being written; such outputs count as present."""
+    with _pending_lock:
+        return _pending[str(Path(path).resolve())] > 0
+
+def wait_written(path: str | Path, timeout: float | None = None) -> bool:
+    """Block until `path` is no longer queued or being written (by any writer); False on timeout."""
+    key = str(Path(path).resolve())
+    with _written:
+        return _written.wait_for(lambda: _pending[key] <= 0, timeout)
+
+def _atomic_write(path: Path, write: Callable[[Path], None]) -> int:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
+
+class OutputWriter:
+    """
+    Single-thread background writer with a bounded queue.
+    image_format: "png" (lossless, `png_compress_level` 0-9; low levels are much faster to encode),
+    "webp" or "jpeg" (lossy, `quality`).
+    """
+    def __init__(self, max_queue: int | None = None, image_format: str | None = None,
+                 png_compress_level: int | None = None, quality: int | None = None, logger=None,
+                 metrics: MetricsRegistry | None = None):
+        self.image_format = (image_format or DEFAULTS["output_image_format"]).lower()
+        if self.image_format not in _IMAGE_FORMATS:
+            raise ValueError(f"Unsupported output format '{self.image_format}'. Choose from: {', '.join(_IMAGE_FORMATS)}")
+        self.png_compress_level = DEFAULTS["png_compress_level"] if png_compress_level is None else int(png_compress_level)
+        self.quality = DEFAULTS["output_quality"] if quality is None else int(quality)
+        self._logger = logger  # a LoggerService; see log()
+        self._metrics = metrics or get_metrics()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue or DEFAULTS["writer_queue_size"])
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopping = False  # the stop sentinel is queued; nothing after it will be processed
+        self.written = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._worker, name="tkai-output-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def image_suffix(self) -> str:
+        return _IMAGE_FORMATS[self.image_format]
+
+    def save_image(self, img: Image.Image, out_dir: str | Path, stem: str) -> Path:
+        """Queue `img` for encoding; returns the path it will have once written."""
+        path = Path(ensure_dir(out_dir)) / f"{stem}{self.image_suffix}"
+        self._enqueue(path, lambda tmp: img.save(tmp, **self._save_args()))
+        return path
+
+    def save_json(self, meta: Dict[str, Any], out_dir: str | Path, stem: str) -> Path:
+        """Queue `meta` for writing as JSON; it is serialized now, so later edits by the caller are not written."""
+        path = Path(ensure_dir(out_dir)) / f"{stem}.json"
+        text = json.dumps(meta, indent=2, default=str)
+        self._enqueue(path, lambda tmp: tmp.write_text(text, encoding="utf-8"))
+        return path
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Block until everything queued so far is on disk; False if `timeout` ran out first.
+        After close() this only waits for the writer thread to finish what was left.
+        """
+        done = threading.Event()
+        with self._lock:
+            stopping = self._stopping
+            if not stopping:
+                self._queue.put((None, done.set))
+        if stopping:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return done.wait(timeout)
+
+    def close(self, timeout: float | None = None):
+        """Flush and stop the writer thread; further saves raise RuntimeError."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def attach_logger(self, logger) -> None:
+        """Report write failures to `logger` (a LoggerService) unless the writer already has one."""
+        if self._logger is None:
+            self._logger = logger
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self._queue.qsize(), "written": self.written, "failed": self.failed,
+                "bytes_written": self.bytes_written, "format": self.image_format}
+
+    # ---------- internals ----------
+    def _save_args(self) -> Dict[str, Any]:
+        if self.image_format == "png":
+            return {"format": "PNG", "compress_level": self.png_compress_level}
+        if self.image_format == "webp":
+            return {"format": "WEBP", "quality": self.quality, "method": 4}
+        return {"format": "JPEG", "quality": self.quality}
+
+    def _enqueue(self, path: Path, write: Callable[[Path], None]):
+        # Resolve now: the working directory may change before the writer thread gets to it
+        path = path.resolve()
+        # Under the lock, so close() cannot queue its stop sentinel between the check and the put
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Output writer is closed.")
+            with _pending_lock:
+                _pending[str(path)] += 1
+            self._queue.put((path, write))  # blocks only when the queue is full (back-pressure)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, write = item
+            if path is None:
+                write()  # flush marker
+                continue
+            try:
+                t0 = time.perf_counter()
+                self.bytes_written += _atomic_write(path, write)
+                self.written += 1
+                # The real encode + disk cost; controllers' "save" stage only covers queueing
+                self._metrics.observe("writer", path.suffix.lstrip(".") or "file", {"save": time.perf_counter() - t0})
+            except Exception as e:
+                self.failed += 1
+                (self._logger or logging.getLogger("tkai")).error(f"Failed to write {path}: {e}")
+            finally:
+                with _written:
+                    _pending[str(path)] -= 1
+                    if _pending[str(path)] <= 0:
+                        del _pending[str(path)]
+                        _written.notify_all()
+
+_default_writer: OutputWriter | None = None
+_default_lock = threading.Lock()
+
+def get_writer(logger=None) -> OutputWriter:
+    """
+    The shared writer used by controllers unless one is injected; flushed at interpreter exit.
+    Write failures are logged to the first `logger` (LoggerService) handed in.
+    """
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = OutputWriter(logger=logger)
+            atexit.register(_default_writer.close)
+        elif logger is not None:
+            _default_writer.attach_logger(logger)
+        return _default_writer
@@ -0,0 +1,26 @@
+from __future__ import annotations
+import importlib
+import sys
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Imported lazily: nothing on the UI import path may pull these in
+HEAVY_MODULES = ("torch", "transformers", "diffusers")
+
+def preload_modules(modules: Iterable[str] = HEAVY_MODULES,
+                    on_progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, float]:
+    """Import heavy ML modules ahead of first use; returns seconds spent per module (0 if already loaded)."""
+    modules = list(modules)
+    timings: Dict[str, float] = {}
+    for i, name in enumerate(modules, start=1):
+        if on_progress is not None:
+            on_progress(name, i, len(modules))
+        t0 = time.perf_counter()
+        if name not in sys.modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                timings[name] = -1.0
+                continue
+        timings[name] = time.perf_counter() - t0
+    return timings
@@ -0,0 +1,129 @@
+"""
+Batched image preprocessing for classifiers: resize/crop per image in PIL (C code, no float copies),
+then rescale, normalise, reorder channels and transpose the whole batch in a few vectorised NumPy
+operations that write straight into the model's float32 NCHW input array.
+"""
+from __future__ import annotations
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+def _field(obj: Any, key: str):
+    """Read `key` from a dict or attribute-style size object (transformers 4.x dicts, 5.x SizeDict)."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+def shortest_edge_size(width: int, height: int, shortest_edge: int) -> Tuple[int, int]:
+    """Scale so the shorter side equals `shortest_edge`, keeping the aspect ratio (transformers' rounding)."""
+    short, long = (width, height) if width <= height else (height, width)
+    new_short, new_long = shortest_edge, int(shortest_edge * long / short)
+    return (new_short, new_long) if width <= height else (new_long, new_short)
+
+class ImagePreprocessor:
+    """
+    Vectorised equivalent of the common transformers image-processor path:
+    resize -> center crop -> rescale -> normalize -> (optional RGB->BGR) -> NCHW float32.
+    """
+    def __init__(self, resize: Tuple[int, int] | int, crop: Tuple[int, int] | None = None,
+                 rescale_factor: float | None = 1 / 255, mean: Sequence[float] | None = None,
+                 std: Sequence[float] | None = None, flip_channel_order: bool = False,
+                 resample: int = Image.BILINEAR):
+        # `resize` is either (height, width) or an int meaning "shortest edge"
+        self.resize = resize
+        self.crop = crop
+        self.flip_channel_order = flip_channel_order
+        self.resample = resample
+        # Fold rescale and normalisation into one multiply-add per channel: x * scale + shift
+        scale = np.full(3, rescale_factor if rescale_factor else 1.0, dtype=np.float32)
+        shift = np.zeros(3, dtype=np.float32)
+        if mean is not None and std is not None:
+            std = np.asarray(std, dtype=np.float32)
+            scale = scale / std
+            shift = -np.asarray(mean, dtype=np.float32) / std
+        if flip_channel_order:
+            scale, shift = scale[::-1].copy(), shift[::-1].copy()
+        self._scale = scale.reshape(1, 3, 1, 1)
+        self._shift = shift.reshape(1, 3, 1, 1)
+
+    @classmethod
+    def from_hf(cls, processor: Any) -> "ImagePreprocessor | None":
+        """Mirror a transformers image processor, or None when it uses options this class does not cover."""
+        if any(getattr(processor, k, None) for k in ("do_pad", "crop_pct", "do_reduce_labels")):
+            return None
+        size = getattr(processor, "size", None)
+        if getattr(processor, "do_resize", True) is False or size is None:
+            return None
+        if _field(size, "shortest_edge"):
+            resize = int(_field(size, "shortest_edge"))
+        elif _field(size, "height") and _field(size, "width"):
+            resize = (int(_field(size, "height")), int(_field(size, "width")))
+        else:
+            return None
+        crop = None
+        if getattr(processor, "do_center_crop", False):
+            cs = getattr(processor, "crop_size", None)
+            if not (_field(cs, "height") and _field(cs, "width")):
+                return None
+            crop = (int(_field(cs, "height")), int(_field(cs, "width")))
+        elif isinstance(resize, int):
+            return None  # variable output size cannot be stacked into one batch
+        # Processors without the flag (e.g. MobileViT) do not normalise
+        normalize = bool(getattr(processor, "do_normalize", False))
+        return cls(
+            resize=resize,
+            crop=crop,
+            rescale_factor=processor.rescale_factor if getattr(processor, "do_rescale", True) else None,
+            mean=processor.image_mean if normalize else None,
+            std=processor.image_std if normalize else None,
+            flip_channel_order=bool(getattr(processor, "do_flip_channel_order", False)),
+            resample=int(getattr(processor, "resample", None) or Image.BILINEAR),
+        )
+
+    @property
+    def output_size(self) -> Tuple[int, int]:
+        """(height, width) of each image in the model input."""
+        if self.crop is not None:
+            return self.crop
+        return self.resize
+
+    @property
+    def min_decode_side(self) -> int:
+        """Smallest source side that still gives full detail after resizing (used for JPEG draft decoding)."""
+        if isinstance(self.resize, int):
+            return self.resize
+        return max(self.resize)
+
+    def _resize_crop(self, img: Image.Image) -> Image.Image:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if isinstance(self.resize, int):
+            size = shortest_edge_size(img.width, img.height, self.resize)
+        else:
+            size = (self.resize[1], self.resize[0])
+        if img.size != size:
+            img = img.resize(size, self.resample)
+        if self.crop is not None:
+            ch, cw = self.crop
+            top, left = (img.height - ch) // 2, (img.width - cw) // 2
+            if top or left or img.size != (cw, ch):
+                img = img.crop((left, top, left + cw, top + ch))
+        return img
+
+    def __call__(self, images: List[Image.Image | np.ndarray]) -> np.ndarray:
+        h, w = self.output_size
+        batch = np.empty((len(images), h, w, 3), dtype=np.uint8)
+        for i, img in enumerate(images):
+            if isinstance(img, np.ndarray):
+                img = Image.fromarray(img)
+            batch[i] = np.asarray(self._resize_crop(img))
+        # NHWC uint8 -> NCHW float32 in one pass, then the per-channel multiply-add in place
+        out = np.empty((len(images), 3, h, w), dtype=np.float32)
+        channels = batch[..., ::-1] if self.flip_channel_order else batch
+        np.copyto(out, channels.transpose(0, 3, 1, 2), casting="unsafe")
+        out *= self._scale
+        out += self._shift
+        return out
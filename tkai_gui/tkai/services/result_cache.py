@@ -0,0 +1,137 @@
+from __future__ import annotations
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from tkai.services.io_utils import json_ready
+from tkai.services.output_writer import is_pending
+
+def hash_file(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+class ResultCache:
+    """
+    Content-addressed cache of finished runs, persisted as an index under <root>/.cache/.
+    Entries point at the PNG/JSON files already written to <root>; evicting an entry only
+    forgets it, the output files themselves are never deleted.
+    Limits: `max_entries` and `max_bytes` (size of the referenced output files), evicted LRU-first.
+    """
+    def __init__(self, root: str | Path = "outputs", max_entries: int = 1000, max_bytes: int = 2 << 30):
+        self._root = Path(root).resolve()
+        self._index_path = self._root / ".cache" / "index.json"
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(model: str, inputs: Dict[str, Any], params: Dict[str, Any]) -> str:
+        payload = json.dumps({"model": model, "inputs": inputs, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._files_exist(entry["result"]):
+                # Outputs were removed behind our back
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = copy.deepcopy(entry["result"])
+        result["cached"] = True
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        stored = {k: v for k, v in json_ready(result).items() if k not in ("cached", "duration_sec")}
+        # Outputs still queued on the background writer are measured once they land (see _entry_bytes)
+        pending = any(is_pending(p) for p in self._paths(stored))
+        entry = {"result": copy.deepcopy(stored), "bytes": None if pending else self._output_bytes(stored)}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save_index()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": sum(self._entry_bytes(e) for e in self._entries.values()),
+            }
+
+    # ---------- internals ----------
+    def _evict(self):
+        total = sum(self._entry_bytes(e) for e in self._entries.values())
+        while self._entries and (len(self._entries) > self._max_entries or total > self._max_bytes):
+            _, old = self._entries.popitem(last=False)
+            total -= self._entry_bytes(old)
+            self.evictions += 1
+
+    def _entry_bytes(self, entry: Dict[str, Any]) -> int:
+        if entry["bytes"] is None:
+            if any(is_pending(p) for p in self._paths(entry["result"])):
+                return 0
+            entry["bytes"] = self._output_bytes(entry["result"])
+        return entry["bytes"]
+
+    def _paths(self, result: Dict[str, Any]):
+        return [Path(v) for k, v in result.items() if k.endswith("_path") and isinstance(v, str) and v]
+
+    def _files_exist(self, result: Dict[str, Any]) -> bool:
+        return all(p.exists() or is_pending(p) for p in self._paths(result))
+
+    def _output_bytes(self, result: Dict[str, Any]) -> int:
+        total = 0
+        for p in self._paths(result):
+            try:
+                if p.resolve().is_relative_to(self._root):
+                    total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = OrderedDict((e["key"], {"result": e["result"], "bytes": e["bytes"]}) for e in data)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = OrderedDict()
+
+    def _save_index(self):
+        self._index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path.with_suffix(".tmp")
+        data = [{"key": k, **e} for k, e in self._entries.items()]
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._index_path)
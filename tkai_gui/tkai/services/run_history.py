@@ -0,0 +1,259 @@
+"""
+Queryable run history in SQLite (outputs/history.sqlite3).
+
+Every finished run is recorded once, keyed by its run ID, with indexed columns for the usual
+lookups (task, model, prompt, predicted label, time); the full result stays available as JSON.
+Classification predictions go to a separate `labels` table so batch runs are searchable per image.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from tkai.config import DEFAULTS
+from tkai.services.io_utils import json_ready, timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id       TEXT PRIMARY KEY,
+    batch_id     TEXT,
+    created_at   REAL NOT NULL,
+    task         TEXT NOT NULL,
+    model        TEXT,
+    prompt       TEXT,
+    seed         INTEGER,
+    image_path   TEXT,
+    json_path    TEXT,
+    top_label    TEXT,
+    top_score    REAL,
+    duration_sec REAL,
+    result       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_task_created ON runs (task, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs (model);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt ON runs (prompt COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_runs_json_path ON runs (json_path);
+CREATE TABLE IF NOT EXISTS labels (
+    run_id     TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    image_path TEXT,
+    rank       INTEGER NOT NULL,
+    label      TEXT NOT NULL,
+    score      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_labels_label ON labels (label COLLATE NOCASE, score);
+CREATE INDEX IF NOT EXISTS idx_labels_run ON labels (run_id);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+RUN_COLUMNS = ("run_id", "batch_id", "created_at", "task", "model", "prompt", "seed", "image_path",
+               "json_path", "top_label", "top_score", "duration_sec")
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+def run_stem(prefix: str, run_id: str) -> str:
+    """Output file stem: readable timestamp plus the run ID prefix, so concurrent runs never collide."""
+    return f"{prefix}_{timestamp()}_{run_id[:8]}"
+
+def _escape_like(text: str) -> str:
+    """Escapes LIKE wildcards so user input matches literally (use with ESCAPE '\\')."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class RunHistory:
+    """Thread-safe run store; one connection guarded by a lock (writes are tiny, WAL keeps readers unblocked)."""
+    def __init__(self, db_path: str | Path | None = None):
+        self.db_path = Path(db_path or DEFAULTS["history_db"]).resolve()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    # ---------- writing ----------
+    def record(self, result: Dict[str, Any]) -> List[str]:
+        """Store a finished run (batch results expand to one row per image); returns the run IDs written."""
+        result = json_ready(result)
+        rows, labels = self._rows_for(result)
+        with self._lock, self._conn:
+            self._insert(rows, labels)
+        return [r["run_id"] for r in rows]
+
+    def import_outputs(self, folder: str | Path = "outputs") -> int:
+        """
+        Index JSON sidecars written before the history existed. Safe to run repeatedly: files already
+        recorded (by json_path) are skipped. Returns the number of runs added.
+        """
+        added = 0
+        for path in sorted(Path(folder).glob("*.json")):
+            try:
+                meta = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if not isinstance(meta, dict) or meta.get("task") not in _TASKS:
+                continue
+            meta.setdefault("json_path", str(path))
+            if meta["task"] == "text-to-image" and not meta.get("image_path"):
+                png = path.with_suffix(".png")
+                meta["image_path"] = str(png) if png.exists() else None
+            # Deterministic ID so a second import of the same file is a no-op
+            meta.setdefault("run_id", uuid.uuid5(uuid.NAMESPACE_URL, str(path.resolve())).hex)
+            with self._lock:
+                known = self._conn.execute("SELECT 1 FROM runs WHERE json_path = ? LIMIT 1", (meta["json_path"],)).fetchone()
+            if known:
+                continue
+            rows, labels = self._rows_for(meta, created_at=path.stat().st_mtime)
+            with self._lock, self._conn:
+                self._insert(rows, labels)
+            added += len(rows)
+        self.set_setting("imported_outputs", str(time.time()))
+        return added
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    # ---------- reading ----------
+    def query(self, task: str | None = None, model: str | None = None, text: str | None = None,
+              label: str | None = None, since: float | None = None, until: float | None = None,
+              limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest first. `text` matches anywhere in the prompt; `label` matches any predicted label (prefix)."""
+        where, params = self._where(task, model, text, label, since, until)
+        sql = (f"SELECT {', '.join('r.' + c for c in RUN_COLUMNS)} FROM runs r {where} "
+               f"ORDER BY r.created_at DESC LIMIT ? OFFSET ?")
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, (*params, int(limit), int(offset)))]
+
+    def count(self, task: str | None = None, model: str | None = None, text: str | None = None,
+              label: str | None = None, since: float | None = None, until: float | None = None) -> int:
+        where, params = self._where(task, model, text, label, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM runs r {where}", params).fetchone()[0]
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Full stored result of one run."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row["result"]) if row else None
+
+    def models(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT model FROM runs WHERE model IS NOT NULL ORDER BY model")]
+
+    def get_setting(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- internals ----------
+    @staticmethod
+    def _where(task, model, text, label, since, until) -> Tuple[str, list]:
+        clauses, params = [], []
+        if task:
+            clauses.append("r.task = ?")
+            params.append(task)
+        if model:
+            clauses.append("r.model = ?")
+            params.append(model)
+        if text:
+            clauses.append("r.prompt LIKE ? ESCAPE '\\'")
+            params.append("%" + _escape_like(text) + "%")
+        if label:
+            clauses.append("r.run_id IN (SELECT run_id FROM labels WHERE label LIKE ? ESCAPE '\\' COLLATE NOCASE)")
+            params.append(_escape_like(label) + "%")
+        if since is not None:
+            clauses.append("r.created_at >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("r.created_at < ?")
+            params.append(float(until))
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _insert(self, rows: List[Dict[str, Any]], labels: List[tuple]):
+        sql = (f"INSERT OR IGNORE INTO runs ({', '.join(RUN_COLUMNS)}, result) "
+               f"VALUES ({', '.join('?' * (len(RUN_COLUMNS) + 1))})")
+        inserted = set()
+        for r in rows:
+            if self._conn.execute(sql, tuple(r.get(c) for c in RUN_COLUMNS) + (r["result"],)).rowcount:
+                inserted.add(r["run_id"])
+        # Re-recording a run must not duplicate its labels
+        self._conn.executemany("INSERT INTO labels (run_id, image_path, rank, label, score) VALUES (?, ?, ?, ?, ?)",
+                               [l for l in labels if l[0] in inserted])
+
+    @staticmethod
+    def _rows_for(result: Dict[str, Any], created_at: float | None = None) -> Tuple[List[Dict[str, Any]], List[tuple]]:
+        created_at = created_at or time.time()
+        task = result.get("task")
+        run_id = result.get("run_id") or new_run_id()
+        if task in _ITEM_BATCHES:
+            # One row per image, under the item's own task; chain saves may carry predictions too
+            rows, labels = [], []
+            for i, item in enumerate(result.get("items", [])):
+                item = {**item, "run_id": item.get("run_id") or f"{run_id}-{i:04d}"}
+                row = RunHistory._row(item, created_at, batch_id=run_id)
+                preds = item.get("predictions") or []
+                labels += [(row["run_id"], item.get("image_path"), rank, p["label"], p.get("score"))
+                           for rank, p in enumerate(preds)]
+                if preds:
+                    row["top_label"], row["top_score"] = preds[0]["label"], preds[0].get("score")
+                rows.append(row)
+            return rows, labels
+        row = RunHistory._row({**result, "run_id": run_id}, created_at)
+        labels = []
+        if task == "image-classification":
+            labels = [(run_id, result.get("image_path"), rank, p["label"], p.get("score"))
+                      for rank, p in enumerate(result.get("predictions") or [])]
+        elif task == "image-classification-batch":
+            labels = [(run_id, r.get("image_path"), rank, p["label"], p.get("score"))
+                      for r in result.get("results", []) for rank, p in enumerate(r.get("predictions") or [])]
+        top = next((l for l in labels if l[2] == 0), None)
+        if top is not None:
+            row["top_label"], row["top_score"] = top[3], top[4]
+        return [row], labels
+
+    @staticmethod
+    def _row(meta: Dict[str, Any], created_at: float, batch_id: str | None = None) -> Dict[str, Any]:
+        image_path = meta.get("image_path")
+        return {
+            "run_id": meta["run_id"],
+            "batch_id": batch_id,
+            "created_at": created_at,
+            "task": meta.get("task"),
+            "model": meta.get("model"),
+            "prompt": meta.get("prompt"),
+            "seed": meta.get("seed"),
+            "image_path": image_path,
+            "json_path": meta.get("json_path"),
+            "duration_sec": meta.get("duration_sec"),
+            "result": json.dumps(meta, default=str),
+        }
+
+_ITEM_BATCHES = ("text-to-image-batch", "image-to-image-batch", "image-batch")
+_TASKS = ("text-to-image", "image-to-image", "image", "image-classification", "image-classification-batch") + _ITEM_BATCHES
+
+_default_history: RunHistory | None = None
+_default_lock = threading.Lock()
+
+def get_history() -> RunHistory:
+    """The shared history used by controllers unless one is injected."""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = RunHistory()
+        return _default_history
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import heapq
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class Job:
+    """
+    A unit of work submitted to a JobScheduler lane.
+    The job function receives the Job itself so it can report progress and poll for cancellation.
+    """
+    def __init__(self, job_id: int, lane: str, fn: Callable[["Job"], Any], name: str = "", priority: int = 0,
+                 on_done: Optional[Callable[["Job"], None]] = None,
+                 on_progress: Optional[Callable[["Job", Dict[str, Any]], None]] = None,
+                 dispatch: Optional[Callable[[Callable[[], None]], None]] = None,
+                 coalesce: Optional[Callable[[Any, Callable[[], None]], None]] = None,
+                 on_cancel: Optional[Callable[["Job"], None]] = None):
+        self.id = job_id
+        self.lane = lane
+        self.name = name or f"job-{job_id}"
+        self.priority = priority
+        self.status = QUEUED
+        self.result: Any = None
+        self.cancel_event = threading.Event()
+        self._fn = fn
+        self._on_done = on_done
+        self._on_progress = on_progress
+        self._dispatch = dispatch or (lambda cb: cb())
+        self._coalesce = coalesce
+        self._on_cancel = on_cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self._on_cancel is not None:
+            self._on_cancel(self)
+
+    def report(self, **progress):
+        """
+        Forward a progress event to the UI thread (no-op without an on_progress callback).
+        With a `coalesce` function (jobs submitted with coalesce_progress=True), events not yet delivered
+        are superseded by the newest one; use that only when every event carries the full state (progress
+        bars). Otherwise each event is dispatched and delivered in order.
+        """
+        if self._on_progress is None:
+            return
+        cb = lambda: self._on_progress(self, progress)
+        if self._coalesce is not None:
+            self._coalesce(("progress", self.id), cb)
+        else:
+            self._dispatch(cb)
+
+    def _finish(self, status: str, result: Any):
+        self.status = status
+        self.result = result
+        if self._on_done is not None:
+            self._dispatch(lambda: self._on_done(self))
+
+    def __repr__(self):
+        return f"Job(id={self.id}, lane={self.lane!r}, name={self.name!r}, status={self.status})"
+
+class JobScheduler:
+    """
+    Bounded, prioritised job queues with one persistent worker thread per lane.
+    Use one lane per model controller so a loaded pipeline is only ever driven from one thread.
+    Lower priority values run first; equal priorities run in submission order.
+    Callbacks are marshalled through `dispatch` (e.g. lambda cb: root.after(0, cb) for Tk); progress
+    callbacks of jobs submitted with coalesce_progress=True go through `coalesce(key, cb)` instead when
+    given (see tkai.ui.frame_batcher).
+    """
+    def __init__(self, dispatch: Optional[Callable[[Callable[[], None]], None]] = None, max_queue: int = 32,
+                 coalesce: Optional[Callable[[Any, Callable[[], None]], None]] = None):
+        self._dispatch = dispatch or (lambda cb: cb())
+        self._coalesce = coalesce
+        self._max_queue = max_queue
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._queues: Dict[str, queue.PriorityQueue] = {}
+        self._workers: Dict[str, threading.Thread] = {}
+        self._jobs: Dict[int, Job] = {}
+        self._closed = False
+
+    def submit(self, lane: str, fn: Callable[[Job], Any], name: str = "", priority: int = 0,
+               on_done: Optional[Callable[[Job], None]] = None,
+               on_progress: Optional[Callable[[Job, Dict[str, Any]], None]] = None,
+               coalesce_progress: bool = False) -> Job:
+        """
+        Queue `fn(job)` on `lane`. Raises queue.Full when the lane's queue is at capacity.
+        With `coalesce_progress`, only the latest undelivered progress event reaches `on_progress`.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down.")
+            q = self._lane_queue(lane)
+            job = Job(next(self._ids), lane, fn, name=name, priority=priority,
+                      on_done=on_done, on_progress=on_progress, dispatch=self._dispatch,
+                      coalesce=self._coalesce if coalesce_progress else None, on_cancel=self._drop_if_queued)
+            q.put_nowait((priority, next(self._seq), job))
+            self._jobs[job.id] = job
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job (freeing its queue slot), or signal a running one to stop at its next checkpoint."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in (QUEUED, RUNNING):
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self, lane: Optional[str] = None) -> int:
+        return sum(self.cancel(j.id) for j in self.active(lane))
+
+    def active(self, lane: Optional[str] = None) -> List[Job]:
+        """Queued and running jobs, optionally restricted to one lane."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in jobs if j.status in (QUEUED, RUNNING) and (lane is None or j.lane == lane)]
+
+    def shutdown(self, wait: bool = False, timeout: float | None = None):
+        """
+        Cancel everything and stop the lane workers. Never blocks on a full lane (it runs on the UI
+        thread at exit): queued jobs are dropped without callbacks, running ones are signalled.
+        """
+        with self._lock:
+            self._closed = True
+            queues = list(self._queues.values())
+            workers = list(self._workers.values())
+        for q in queues:
+            while True:
+                try:
+                    _, _, job = q.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.status = CANCELLED
+                    with self._lock:
+                        self._jobs.pop(job.id, None)
+            try:
+                q.put_nowait((float("inf"), next(self._seq), None))  # sentinel sorts last
+            except queue.Full:
+                pass  # cannot happen once drained and closed; the worker is a daemon either way
+        self.cancel_all()  # what is left is running
+        if wait:
+            for w in workers:
+                w.join(timeout)
+
+    # ---------- internals ----------
+    def _lane_queue(self, lane: str) -> queue.PriorityQueue:
+        q = self._queues.get(lane)
+        if q is None:
+            q = queue.PriorityQueue(maxsize=self._max_queue)
+            self._queues[lane] = q
+            t = threading.Thread(target=self._worker, args=(lane, q), name=f"tkai-{lane}", daemon=True)
+            self._workers[lane] = t
+            t.start()
+        return q
+
+    def _drop_if_queued(self, job: Job):
+        """Job.cancel() hook: a job still waiting leaves its lane's queue (freeing the slot) and retires now."""
+        q = self._queues.get(job.lane)
+        if q is None or job.status != QUEUED:
+            return
+        with q.mutex:
+            index = next((i for i, entry in enumerate(q.queue) if entry[2] is job), None)
+            if index is None:
+                return  # a worker has already taken it and will see the cancel flag
+            q.queue.pop(index)
+            heapq.heapify(q.queue)
+            q.not_full.notify()
+        self._retire(job, CANCELLED, {"ok": False, "error": "Cancelled", "cancelled": True})
+
+    def _worker(self, lane: str, q: queue.PriorityQueue):
+        while True:
+            _, _, job = q.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self._retire(job, CANCELLED, {"ok": False, "error": "Cancelled", "cancelled": True})
+                continue
+            job.status = RUNNING
+            try:
+                result = job._fn(job)
+            except Exception as e:
+                self._retire(job, FAILED, {"ok": False, "error": str(e)})
+                continue
+            if isinstance(result, dict) and result.get("cancelled"):
+                self._retire(job, CANCELLED, result)
+            else:
+                self._retire(job, DONE, result)
+
+    def _retire(self, job: Job, status: str, result: Any):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        job._finish(status, result)
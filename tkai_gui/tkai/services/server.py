@@ -0,0 +1,270 @@
+"""
+Local HTTP inference service wrapping the model controllers.
+
+Endpoints (JSON in, JSON out):
+    POST /generate   {"prompt": ..., "negative_prompt", "width", "height", "steps", "guidance", "seed"}
+    POST /classify   {"image_path": ..., "top_k": ...}
+    GET  /health
+    GET  /metrics              counters, cache/writer stats and per-stage latency percentiles (JSON)
+    GET  /metrics/prometheus   the same telemetry in Prometheus text format
+Classification requests arriving within `coalesce_ms` of each other are merged into one
+run_batch() forward pass. Generation requests go through a bounded queue; when it is full the
+service answers 503 instead of starting more work.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tkai.config import DEFAULTS
+from tkai.services.io_utils import validate_image_path, json_ready
+from tkai.services.telemetry import get_metrics
+
+class ClassifyCoalescer:
+    """Collects concurrent classify requests and runs them as one batch on the classifier's worker."""
+    def __init__(self, controller, executor: ThreadPoolExecutor, window_ms: float = 10, max_batch: int = 32):
+        self._ctrl = controller
+        self._executor = executor
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.images = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, image_path: str, top_k: int) -> Dict[str, Any]:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_path, top_k, fut))
+        return await fut
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self._window
+            while len(pending) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            groups: Dict[int, List[Tuple[str, asyncio.Future]]] = {}
+            for path, top_k, fut in pending:
+                groups.setdefault(top_k, []).append((path, fut))
+            for top_k, items in groups.items():
+                await self._run_group(loop, top_k, items)
+
+    async def _run_group(self, loop, top_k: int, items: List[Tuple[str, asyncio.Future]]):
+        paths = [p for p, _ in items]
+        try:
+            if len(paths) == 1:
+                results = [await loop.run_in_executor(self._executor, lambda: self._ctrl.run(image_path=paths[0], top_k=top_k))]
+            else:
+                res = await loop.run_in_executor(
+                    self._executor, lambda: self._ctrl.run_batch(paths, batch_size=len(paths), top_k=top_k))
+                if res.get("ok"):
+                    results = [{"ok": True, "task": "image-classification", "model": res.get("model"), "top_k": top_k,
+                                "batch_size": len(paths), "batch_json_path": res.get("json_path"), **r}
+                               for r in res["results"]]
+                else:
+                    # Usually one undecodable upload; classify one by one so only that request fails
+                    results = await loop.run_in_executor(
+                        self._executor, lambda: [self._ctrl.run(image_path=p, top_k=top_k) for p in paths])
+            self.batches += 1
+            self.images += len(paths)
+        except Exception as e:
+            results = [{"ok": False, "error": str(e)}] * len(paths)
+        for (_, fut), r in zip(items, results):
+            if not fut.done():
+                fut.set_result(r)
+
+class InferenceService:
+    """Transport-independent request handling; `handle()` is what the HTTP layer (and tests) call."""
+    def __init__(self, t2i=None, clf=None, coalesce_ms: float = 10, max_batch: int = 32, gen_queue_size: int = 4):
+        self._t2i = t2i
+        self._clf = clf
+        # One worker thread per controller, like the GUI's scheduler lanes
+        self._t2i_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tkai-srv-t2i")
+        self._clf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tkai-srv-clf")
+        self._coalescer = ClassifyCoalescer(clf, self._clf_executor, coalesce_ms, max_batch) if clf else None
+        self._gen_queue_size = gen_queue_size
+        self._gen_queue: Optional[asyncio.Queue] = None
+        self._gen_task: Optional[asyncio.Task] = None
+        self._started = time.monotonic()
+        self.counters: Dict[str, int] = {"requests": 0, "generate": 0, "classify": 0, "rejected": 0, "errors": 0}
+
+    async def start(self):
+        self._gen_queue = asyncio.Queue(maxsize=self._gen_queue_size)
+        self._gen_task = asyncio.create_task(self._gen_loop())
+        if self._coalescer:
+            self._coalescer.start()
+
+    async def stop(self):
+        if self._gen_task:
+            self._gen_task.cancel()
+            try:
+                await self._gen_task
+            except asyncio.CancelledError:
+                pass
+        if self._coalescer:
+            await self._coalescer.stop()
+        self._t2i_executor.shutdown(wait=False)
+        self._clf_executor.shutdown(wait=False)
+
+    async def handle(self, method: str, path: str, body: bytes = b"") -> Tuple[int, Dict[str, Any] | str]:
+        """(status, payload); the payload is a JSON object, or plain text for /metrics/prometheus."""
+        self.counters["requests"] += 1
+        route = (method.upper(), path.split("?", 1)[0].rstrip("/") or "/")
+        try:
+            if route == ("GET", "/health"):
+                return 200, {"ok": True, "uptime_sec": time.monotonic() - self._started}
+            if route == ("GET", "/metrics"):
+                return 200, self.metrics()
+            if route == ("GET", "/metrics/prometheus"):
+                return 200, get_metrics().to_prometheus()
+            if route == ("POST", "/generate"):
+                return await self._generate(self._parse(body))
+            if route == ("POST", "/classify"):
+                return await self._classify(self._parse(body))
+            return 404, {"ok": False, "error": f"No route for {route[0]} {route[1]}"}
+        except (ValueError, FileNotFoundError) as e:
+            return 400, {"ok": False, "error": str(e)}
+        except Exception as e:
+            self.counters["errors"] += 1
+            return 500, {"ok": False, "error": str(e)}
+
+    def metrics(self) -> Dict[str, Any]:
+        m: Dict[str, Any] = dict(self.counters)
+        m["generate_queue_depth"] = self._gen_queue.qsize() if self._gen_queue else 0
+        if self._coalescer:
+            m["classify_batches"] = self._coalescer.batches
+            m["classify_batched_images"] = self._coalescer.images
+        for ctrl in (self._t2i, self._clf):
+            cache = getattr(ctrl, "_cache", None)
+            if cache is not None:
+                m["cache"] = cache.stats()
+                break
+        for ctrl in (self._t2i, self._clf):
+            writer = getattr(ctrl, "_writer", None)
+            if writer is not None:
+                m["writer"] = writer.stats()
+                break
+        m["telemetry"] = get_metrics().snapshot()
+        return m
+
+    # ---------- internals ----------
+    @staticmethod
+    def _parse(body: bytes) -> Dict[str, Any]:
+        try:
+            data = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise ValueError("JSON body must be an object.")
+        return data
+
+    async def _generate(self, req: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if self._t2i is None:
+            return 404, {"ok": False, "error": "Text-to-image is not enabled."}
+        if not str(req.get("prompt", "")).strip():
+            raise ValueError("Prompt cannot be empty.")
+        params = {k: req[k] for k in ("prompt", "negative_prompt", "width", "height", "steps", "guidance", "seed")
+                  if req.get(k) is not None}
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._gen_queue.put_nowait((params, fut))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return 503, {"ok": False, "error": "Generation queue is full, retry later."}
+        self.counters["generate"] += 1
+        res = json_ready(await fut)
+        return (200 if res.get("ok") else 500), res
+
+    async def _gen_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            params, fut = await self._gen_queue.get()
+            try:
+                res = await loop.run_in_executor(self._t2i_executor, lambda: self._t2i.run(**params))
+            except Exception as e:
+                res = {"ok": False, "error": str(e)}
+            if not fut.done():
+                fut.set_result(res)
+
+    async def _classify(self, req: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if self._clf is None:
+            return 404, {"ok": False, "error": "Image classification is not enabled."}
+        path = str(validate_image_path(str(req.get("image_path", ""))))
+        top_k = int(req.get("top_k") or DEFAULTS["clf_topk"])
+        self.counters["classify"] += 1
+        res = json_ready(await self._coalescer.submit(path, top_k))
+        return (200 if res.get("ok") else 500), res
+
+# ---------- minimal HTTP/1.1 transport ----------
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+async def _handle_connection(service: InferenceService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                             max_body: int = 1 << 20):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return
+        method, path, _ = (request_line.split(" ", 2) + ["", ""])[:3]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            k, _, v = line.partition(":")
+            headers[k.strip().lower()] = v.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            status, payload = 400, {"ok": False, "error": "Invalid Content-Length header."}
+        elif length > max_body:
+            status, payload = 413, {"ok": False, "error": "Request body too large."}
+        else:
+            body = await reader.readexactly(length) if length else b""
+            status, payload = await service.handle(method, path, body)
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\nConnection: close\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + data)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(service: InferenceService, host: str = "127.0.0.1", port: int = 8765):
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
@@ -0,0 +1,231 @@
+"""
+Run instrumentation: per-stage spans, process resources and rolling latency percentiles.
+
+`measure_time` opens a RunTrace for each controller call. Code inside the call marks stages with
+`with stage("decode"): ...`; stage() finds the active trace through a thread-local and is a no-op
+outside a run. Worker threads that act on behalf of a run use `trace.stage(...)` directly.
+Finished traces are fed to a MetricsRegistry, which keeps the last `metrics_window` samples per
+(controller, op, stage) and reports count/mean/p50/p95/p99, as JSON or Prometheus text.
+
+Stage names used by the controllers: validate, decode, preprocess, forward, postprocess, save.
+Stages may overlap (e.g. decode is prefetched during forward), so they need not sum to the total.
+"""
+from __future__ import annotations
+import contextlib
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from tkai.config import DEFAULTS
+
+STAGES = ("validate", "decode", "preprocess", "forward", "postprocess", "save")
+QUANTILES = (0.5, 0.95, 0.99)
+TOTAL = "total"  # pseudo-stage holding the wall time of the whole call
+
+_local = threading.local()
+
+class RunTrace:
+    """Stage durations of one controller call; thread-safe so helper threads can add spans."""
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+def current_trace() -> Optional[RunTrace]:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+@contextlib.contextmanager
+def trace_run() -> Iterator[RunTrace]:
+    """Make a new RunTrace current on this thread (traces nest, e.g. load_model inside run)."""
+    trace = RunTrace()
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(trace)
+    try:
+        yield trace
+    finally:
+        stack.pop()
+
+def stage(name: str):
+    """Time a block as `name` on the current thread's run; does nothing outside a traced run."""
+    trace = current_trace()
+    return trace.stage(name) if trace is not None else contextlib.nullcontext()
+
+# ---------- process resources ----------
+def _proc_status() -> Dict[str, int]:
+    """VmRSS / VmHWM (bytes) and Threads from /proc (Linux); empty elsewhere."""
+    out: Dict[str, int] = {}
+    try:
+        with open("/proc/self/status", encoding="ascii", errors="ignore") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    out[key] = int(value.split()[0]) * 1024
+                elif key == "Threads":
+                    out[key] = int(value)
+    except OSError:
+        pass
+    return out
+
+def resource_snapshot() -> Dict[str, Any]:
+    """Current and peak RSS plus thread counts; cheap enough to take after every run."""
+    status = _proc_status()
+    rss, peak, os_threads = status.get("VmRSS"), status.get("VmHWM"), status.get("Threads")
+    if rss is None:
+        try:
+            import psutil  # optional; covers macOS and Windows
+            proc = psutil.Process()
+            info = proc.memory_info()
+            rss, os_threads = info.rss, proc.num_threads()
+            peak = getattr(info, "peak_wset", None)
+        except ImportError:
+            pass
+    if peak is None:
+        try:
+            import resource
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        except ImportError:
+            pass
+    threads: Dict[str, int] = {"python": threading.active_count()}
+    if os_threads is not None:
+        threads["os"] = os_threads
+    torch = sys.modules.get("torch")  # never import torch just to report on it
+    if torch is not None:
+        threads["torch_intra_op"] = torch.get_num_threads()
+        threads["torch_inter_op"] = torch.get_num_interop_threads()
+    return {"rss_mb": rss / 2**20 if rss else None, "peak_rss_mb": peak / 2**20 if peak else None,
+            "threads": threads}
+
+# ---------- aggregation ----------
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+class _Series:
+    __slots__ = ("window", "count", "total")
+
+    def __init__(self, size: int):
+        self.window: Deque[float] = deque(maxlen=size)
+        self.count = 0      # lifetime, for Prometheus _count/_sum
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.window.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        values = sorted(self.window)
+        out = {"count": self.count, "sum_sec": self.total, "window": len(values),
+               "mean_sec": sum(values) / len(values) if values else None}
+        for q in QUANTILES:
+            out[f"p{round(q * 100)}_sec"] = percentile(values, q) if values else None
+        return out
+
+class MetricsRegistry:
+    """Rolling per-stage latency windows keyed by (controller, op, stage), plus error counts."""
+    def __init__(self, window: int | None = None):
+        self.window = int(window or DEFAULTS["metrics_window"])
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._last_resources: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, controller: str, op: str, stages: Dict[str, float], total: float | None = None,
+                ok: bool = True, resources: Dict[str, Any] | None = None):
+        with self._lock:
+            items = list(stages.items()) + ([(TOTAL, total)] if total is not None else [])
+            for name, seconds in items:
+                key = (controller, op, name)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(self.window)
+                series.add(float(seconds))
+            if not ok:
+                self._errors[(controller, op)] = self._errors.get((controller, op), 0) + 1
+            if resources:
+                self._last_resources = resources
+
+    def snapshot(self, resources: bool = True) -> Dict[str, Any]:
+        """{"stages": [{controller, op, stage, count, p50_sec, ...}], "errors": [...], "process": {...}}"""
+        with self._lock:
+            stages = [{"controller": c, "op": o, "stage": s, **self._series[(c, o, s)].summary()}
+                      for c, o, s in sorted(self._series)]
+            errors = sorted(self._errors.items())
+        return {
+            "window": self.window,
+            "stages": stages,
+            "errors": [{"controller": c, "op": o, "count": n} for (c, o), n in errors],
+            "process": resource_snapshot() if resources else dict(self._last_resources),
+        }
+
+    def to_prometheus(self, prefix: str = "tkai") -> str:
+        """Prometheus text exposition format (summaries over the rolling window, lifetime _count/_sum)."""
+        snap = self.snapshot()
+        lines = [f"# HELP {prefix}_stage_seconds Controller stage latency over the last {self.window} calls.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for row in snap["stages"]:
+            labels = f'controller="{_esc(row["controller"])}",op="{_esc(row["op"])}",stage="{_esc(row["stage"])}"'
+            for q in QUANTILES:
+                value = row[f"p{round(q * 100)}_sec"]
+                if value is not None:
+                    lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{q}"}} {value:.6g}')
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {row['count']}")
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {row['sum_sec']:.6g}")
+        lines += [f"# HELP {prefix}_errors_total Failed controller calls.", f"# TYPE {prefix}_errors_total counter"]
+        for row in snap["errors"]:
+            lines.append(f'{prefix}_errors_total{{controller="{_esc(row["controller"])}",op="{_esc(row["op"])}"}} {row["count"]}')
+        proc = snap["process"]
+        for name, key, help_text in (("rss_bytes", "rss_mb", "Resident set size."),
+                                     ("peak_rss_bytes", "peak_rss_mb", "Peak resident set size.")):
+            if proc.get(key) is not None:
+                lines += [f"# HELP {prefix}_process_{name} {help_text}", f"# TYPE {prefix}_process_{name} gauge",
+                          f"{prefix}_process_{name} {int(proc[key] * 2**20)}"]
+        lines += [f"# HELP {prefix}_threads Thread counts by kind.", f"# TYPE {prefix}_threads gauge"]
+        for kind, n in proc.get("threads", {}).items():
+            lines.append(f'{prefix}_threads{{kind="{kind}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._errors.clear()
+
+def _esc(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_default_metrics: MetricsRegistry | None = None
+_default_lock = threading.Lock()
+
+def get_metrics() -> MetricsRegistry:
+    """The shared registry controllers report to unless one is injected."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRegistry()
+        return _default_metrics
@@ -0,0 +1,159 @@
+"""
+Persistent thumbnail cache (outputs/.thumbs).
+
+Thumbnails are keyed by the source file's resolved path, size and mtime plus the thumbnail size, so an
+edited or replaced image gets a fresh thumbnail and stale ones are simply never looked up again.
+Building one decodes the source at reduced scale where the format allows it (JPEG draft mode);
+reading one back is a single small JPEG decode, which is what makes reopening a gallery instant.
+The cache is capped at DEFAULTS["thumb_cache_max_mb"]: a hit refreshes the file's mtime, and once the
+cap is exceeded the least recently used thumbnails are deleted, since stale ones are never looked up.
+All methods are thread-safe and meant to be called from worker threads, never the Tk thread.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from PIL import Image
+
+from tkai.config import DEFAULTS
+from tkai.services.io_utils import ensure_dir
+from tkai.services.output_writer import is_pending
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: str | Path | None = None, size: int | None = None, quality: int = 85,
+                 max_mb: float | None = None):
+        self.cache_dir = Path(cache_dir or DEFAULTS["thumb_cache_dir"]).resolve()
+        self.size = int(size or DEFAULTS["thumb_px"])
+        self.quality = quality
+        self.max_bytes = int((DEFAULTS["thumb_cache_max_mb"] if max_mb is None else max_mb) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._total: int | None = None  # bytes on disk; unknown until the first prune scans the folder
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, path: str | Path, size: int | None = None) -> Optional[Path]:
+        """Where the thumbnail of `path` lives (None if the source is missing or still being written)."""
+        src = Path(path).resolve()
+        if is_pending(src):
+            return None
+        try:
+            st = src.stat()
+        except OSError:
+            return None
+        key = hashlib.sha1(f"{src}|{st.st_size}|{st.st_mtime_ns}|{size or self.size}".encode("utf-8")).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.jpg"
+
+    def get(self, path: str | Path, size: int | None = None) -> Optional[Image.Image]:
+        """RGB thumbnail that fits in size×size, built and stored on first use; None if unreadable."""
+        size = size or self.size
+        thumb_path = self.cache_path(path, size)
+        if thumb_path is None:
+            return None
+        try:
+            with Image.open(thumb_path) as cached:
+                img = cached.convert("RGB")
+        except OSError:
+            pass  # not cached yet (or a damaged entry, which is rebuilt)
+        else:
+            with self._lock:
+                self.hits += 1
+            try:
+                os.utime(thumb_path)  # recently used: pruned last
+            except OSError:
+                pass
+            return img
+        img = self._build(path, size)
+        if img is None:
+            return None
+        with self._lock:
+            self.misses += 1
+        self._store(img, thumb_path)
+        return img
+
+    def iter_thumbnails(self, paths: Iterable[str | Path], size: int | None = None) -> Iterator[Tuple[str, Image.Image]]:
+        """(path, thumbnail) for each readable path, in order; stops early if the consumer does."""
+        for p in paths:
+            img = self.get(p, size)
+            if img is not None:
+                yield str(p), img
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """
+        Delete least recently used thumbnails until the cache holds at most `max_bytes` (default: 90% of
+        the cap, so a full cache is not rescanned at every store). Returns the number of files removed.
+        """
+        target = int(self.max_bytes * 0.9) if max_bytes is None else max_bytes
+        entries = []
+        for f in self.cache_dir.glob("*/*.jpg"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue  # removed by a concurrent prune
+            entries.append((st.st_mtime_ns, st.st_size, f))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, f in sorted(entries, key=lambda e: e[0]):
+            if total <= target:
+                break
+            try:
+                f.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._total = total
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    # ---------- internals ----------
+    @staticmethod
+    def _build(path: str | Path, size: int) -> Optional[Image.Image]:
+        try:
+            with Image.open(path) as src:
+                src.draft("RGB", (size, size))  # JPEG: decode at 1/2..1/8 scale
+                img = src.convert("RGB")
+        except OSError:
+            return None
+        img.thumbnail((size, size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return img
+
+    def _store(self, img: Image.Image, thumb_path: Path):
+        ensure_dir(thumb_path.parent)
+        tmp = thumb_path.with_name(f".{thumb_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            img.save(tmp, format="JPEG", quality=self.quality)
+            os.replace(tmp, thumb_path)
+            size = thumb_path.stat().st_size
+        except OSError:
+            tmp.unlink(missing_ok=True)  # the cache is an optimisation; a failed write only costs a rebuild
+            return
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+            due = self._total is None or self._total > self.max_bytes
+        if due and self._prune_lock.acquire(blocking=False):  # one pruning thread is enough
+            try:
+                self.prune()
+            finally:
+                self._prune_lock.release()
+
+_default_thumbnails: ThumbnailCache | None = None
+_default_lock = threading.Lock()
+
+def get_thumbnails() -> ThumbnailCache:
+    """The shared thumbnail cache used by the gallery and the history browser."""
+    global _default_thumbnails
+    with _default_lock:
+        if _default_thumbnails is None:
+            _default_thumbnails = ThumbnailCache()
+        return _default_thumbnails
@@ -1,5 +1,8 @@
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any
+from typing import Optional, Deque, Dict, Any
+
+from tkai.config import DEFAULTS
 
 @dataclass
 class AppState:
@@ -8,6 +11,7 @@ class AppState:
     last_negative_prompt: str = "blurry, low quality, watermark, extra fingers, extra hands"
     last_image_path: Optional[str] = None
     last_output_path: Optional[str] = None
-    logs: List[str] = field(default_factory=list)
+    # Bounded; the app shares the LoggerService ring buffer here instead of keeping every line forever
+    logs: Deque[str] = field(default_factory=lambda: deque(maxlen=DEFAULTS["log_ring_size"]))
     model_loaded: Dict[str, bool] = field(default_factory=lambda: {"Text-to-Image": False, "Image Classification": False})
     metadata: Dict[str, Any] = field(default_factory=dict)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List
+
+from PIL import ImageTk
+
+from tkai.models.chain import Candidate
+
+COLUMNS = 4
+
+class DraftPicker(ttk.Frame):
+    """
+    Grid of low-resolution drafts with a checkbox each. "Refine selected" hands the ticked candidates
+    to `on_refine`; "Select best" asks `on_auto_pick` (the classifier) and ticks what it returns via select().
+    """
+    def __init__(self, master, candidates: List[Candidate], on_refine: Callable[[List[Candidate]], None],
+                 on_auto_pick: Callable[[List[Candidate]], None] | None = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.candidates = candidates
+        self.on_refine = on_refine
+        self.on_auto_pick = on_auto_pick
+        self._vars: Dict[str, tk.BooleanVar] = {}
+        self._captions: Dict[str, tk.StringVar] = {}
+        self._photos: List[ImageTk.PhotoImage] = []  # keeps the tiles' PhotoImages alive
+        self._build()
+
+    def _build(self):
+        top = ttk.Frame(self)
+        top.pack(fill="x")
+        self.btn_refine = ttk.Button(top, text="Refine selected", command=self._refine)
+        self.btn_refine.pack(side="right")
+        if self.on_auto_pick is not None:
+            self.btn_auto = ttk.Button(top, text="Select best (classifier)", command=lambda: self.on_auto_pick(self.candidates))
+            self.btn_auto.pack(side="right", padx=6)
+        self.info_var = tk.StringVar(value=f"{len(self.candidates)} drafts; tick the ones worth a full-size render.")
+        ttk.Label(top, textvariable=self.info_var).pack(side="left")
+
+        grid = ttk.Frame(self)
+        grid.pack(fill="both", expand=True, pady=(6, 0))
+        for i, c in enumerate(self.candidates):
+            rid = c.meta["run_id"]
+            photo = ImageTk.PhotoImage(c.image)
+            self._photos.append(photo)
+            self._vars[rid] = tk.BooleanVar(value=False)
+            self._captions[rid] = tk.StringVar(value=f"seed {c.meta.get('seed')}")
+            tile = ttk.Frame(grid)
+            tile.grid(row=i // COLUMNS, column=i % COLUMNS, padx=4, pady=4)
+            ttk.Label(tile, image=photo).pack()
+            ttk.Checkbutton(tile, textvariable=self._captions[rid], variable=self._vars[rid]).pack()
+
+    def select(self, run_ids: List[str], scores: Dict[str, float] | None = None):
+        """Tick exactly `run_ids`; `scores` (run_id -> score) are shown next to the seeds."""
+        for rid, var in self._vars.items():
+            var.set(rid in run_ids)
+        for c in self.candidates:
+            rid = c.meta["run_id"]
+            if scores and rid in scores:
+                self._captions[rid].set(f"seed {c.meta.get('seed')} ({scores[rid]:.2f})")
+
+    def selected(self) -> List[Candidate]:
+        return [c for c in self.candidates if self._vars[c.meta["run_id"]].get()]
+
+    def _refine(self):
+        chosen = self.selected()
+        if not chosen:
+            self.info_var.set("Tick at least one draft first.")
+            return
+        self.on_refine(chosen)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import itertools
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from tkai.config import DEFAULTS
+
+class FrameBatcher:
+    """
+    Collects UI updates from any thread and applies them on the Tk thread at most once per frame.
+
+    `dispatch(cb)` queues a callback that always runs (job completions); `post(key, cb)` queues one
+    that replaces any pending callback with the same key (status text, progress bars, previews), so
+    a job reporting a thousand progress events between two frames costs one repaint, not a thousand.
+    Callbacks run in the order they were last queued.
+    """
+    def __init__(self, widget, fps: int | None = None, clock: Callable[[], float] = time.monotonic):
+        self._widget = widget
+        self._frame_sec = 1.0 / (fps or DEFAULTS["ui_fps"])
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[Hashable, Callable[[], Any]]" = OrderedDict()
+        self._seq = itertools.count()
+        self._scheduled = False
+        self._last_flush = float("-inf")
+        self.frames = 0
+        self.callbacks = 0
+
+    def dispatch(self, cb: Callable[[], Any]):
+        self._queue(("call", next(self._seq)), cb)
+
+    def post(self, key: Hashable, cb: Callable[[], Any]):
+        self._queue(("post", key), cb)
+
+    def _queue(self, key, cb):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = cb
+            if self._scheduled:
+                return
+            self._scheduled = True
+            wait = self._last_flush + self._frame_sec - self._clock()
+        self._widget.after(round(wait * 1000) if wait > 0 else 0, self.flush)
+
+    def flush(self):
+        """Run everything queued so far (Tk thread only)."""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+            self._scheduled = False
+            self._last_flush = self._clock()
+        self.frames += 1
+        for cb in pending.values():
+            self.callbacks += 1
+            try:
+                cb()
+            except Exception:
+                # One failing callback must not swallow the rest of the frame
+                report = getattr(self._widget, "report_callback_exception", None)
+                if report is not None:
+                    report(*sys.exc_info())
+                else:
+                    traceback.print_exc()
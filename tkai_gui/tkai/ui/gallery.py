@@ -0,0 +1,186 @@
+from __future__ import annotations
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from pathlib import Path
+from tkinter import ttk
+from typing import Callable, Dict, List
+
+from PIL import ImageTk
+
+from tkai.config import DEFAULTS
+from tkai.services.io_utils import list_images
+from tkai.services.scheduler import JobScheduler
+from tkai.services.thumbnails import ThumbnailCache, get_thumbnails
+
+TILE_PAD = 8
+CAPTION_PX = 16
+
+class Gallery(ttk.Frame):
+    """
+    Virtualized thumbnail grid. Only tiles in (or one row around) the viewport exist on the canvas;
+    thumbnails come from the on-disk ThumbnailCache via jobs on the scheduler's "thumbs" lane, and the
+    Tk PhotoImages are kept in an LRU so scrolling back is free and memory stays bounded.
+    """
+    def __init__(self, master, jobs: JobScheduler, thumbnails: ThumbnailCache | None = None,
+                 on_open: Callable[[str], None] | None = None, tile_px: int | None = None,
+                 photo_cache: int | None = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.jobs = jobs
+        self.thumbnails = thumbnails or get_thumbnails()
+        self.on_open = on_open
+        self.tile_px = tile_px or DEFAULTS["thumb_px"]
+        self.photo_cache = photo_cache or DEFAULTS["gallery_photo_cache"]
+        self.items: List[str] = []
+        self._columns = 1
+        self._tiles: Dict[int, int] = {}   # item index -> canvas image id of the visible tiles
+        self._photos: "OrderedDict[str, ImageTk.PhotoImage]" = OrderedDict()
+        self._job = None
+        self._render_pending = False
+
+        self.canvas = tk.Canvas(self, bg="#f0f0f0", highlightthickness=0)
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=self.scroll.set)
+        self.scroll.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda _e: self._relayout())
+        self.canvas.bind("<Double-1>", self._on_double_click)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(seq, self._on_wheel)
+
+    @property
+    def pitch(self) -> tuple[int, int]:
+        return self.tile_px + TILE_PAD, self.tile_px + TILE_PAD + CAPTION_PX
+
+    # ---------- items ----------
+    def set_items(self, paths: List[str | Path]):
+        self.items = [str(p) for p in paths]
+        self._clear_tiles(keep=range(0))
+        self.canvas.yview_moveto(0)
+        self._relayout()
+
+    def load_folder(self, folder: str | Path = "outputs"):
+        """List `folder` off the UI thread, newest first, and show it."""
+        def scan(job):
+            stamped = []
+            for p in list_images(folder) if Path(folder).is_dir() else []:
+                try:
+                    stamped.append((p.stat().st_mtime, p))
+                except OSError:
+                    continue  # deleted (or unreadable) since it was listed
+            return [p for _, p in sorted(stamped, key=lambda t: t[0], reverse=True)]
+        self.jobs.submit("thumbs", scan, name=f"List {folder}",
+                         on_done=lambda job: self.winfo_exists() and isinstance(job.result, list)
+                         and self.set_items(job.result))
+
+    # ---------- layout / virtualization ----------
+    def _relayout(self):
+        width = max(1, self.canvas.winfo_width())
+        pw, ph = self.pitch
+        columns = max(1, width // pw)
+        rows = (len(self.items) + columns - 1) // columns
+        self.canvas.configure(scrollregion=(0, 0, width, max(rows * ph, 1)))
+        if columns != self._columns:
+            self._columns = columns
+            self.canvas.delete("all")  # every tile moves; rebuild the visible ones
+            self._tiles.clear()
+        self._schedule_render()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._schedule_render()
+
+    def _on_wheel(self, event):
+        step = -1 if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0 else 1
+        self.canvas.yview_scroll(step * 2, "units")
+        self._schedule_render()
+
+    def _schedule_render(self):
+        # Coalesce bursts of scroll/resize events into one render per idle cycle
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _visible_range(self) -> range:
+        _, ph = self.pitch
+        top = self.canvas.canvasy(0)
+        bottom = top + max(1, self.canvas.winfo_height())
+        first_row = max(0, int(top // ph) - 1)
+        last_row = int(bottom // ph) + 1
+        return range(first_row * self._columns, min(len(self.items), (last_row + 1) * self._columns))
+
+    def _render(self):
+        self._render_pending = False
+        if not self.winfo_exists():
+            return
+        visible = self._visible_range()
+        self._clear_tiles(keep=visible)
+        missing = []
+        for i in visible:
+            if i not in self._tiles:
+                self._draw_tile(i)
+            path = self.items[i]
+            if path in self._photos:
+                self._photos.move_to_end(path)
+            else:
+                missing.append(path)
+        if missing:
+            self._request(missing)
+
+    def _clear_tiles(self, keep: range):
+        for i in [i for i in self._tiles if i not in keep]:
+            self.canvas.delete(f"tile{i}")
+            del self._tiles[i]
+
+    def _draw_tile(self, i: int):
+        pw, ph = self.pitch
+        row, col = divmod(i, self._columns)
+        x, y = col * pw + TILE_PAD // 2, row * ph + TILE_PAD // 2
+        tag = f"tile{i}"
+        self.canvas.create_rectangle(x, y, x + self.tile_px, y + self.tile_px, outline="#c8c8c8", tags=tag)
+        photo = self._photos.get(self.items[i])
+        self._tiles[i] = self.canvas.create_image(x + self.tile_px // 2, y + self.tile_px // 2, anchor="center",
+                                                  image=photo or "", tags=tag)
+        name = Path(self.items[i]).name
+        caption = name if len(name) <= self.tile_px // 7 else name[: self.tile_px // 7 - 1] + "…"
+        self.canvas.create_text(x + self.tile_px // 2, y + self.tile_px + 2, text=caption, anchor="n",
+                                font=("TkDefaultFont", 8), tags=tag)
+
+    # ---------- thumbnails ----------
+    def _request(self, paths: List[str]):
+        if self._job is not None:
+            self._job.cancel()  # its thumbnails are no longer on screen
+        size = self.tile_px
+        def load(job):
+            for path, thumb in self.thumbnails.iter_thumbnails(paths, size):
+                if job.cancelled:
+                    return {"ok": False, "cancelled": True}
+                job.report(path=path, thumb=thumb)
+            return {"ok": True}
+        try:
+            self._job = self.jobs.submit("thumbs", load, name="Gallery thumbnails", on_progress=self._on_thumb)
+        except queue.Full:
+            self._job = None
+            self.after(100, self._schedule_render)  # lane is busy with stale requests; retry shortly
+
+    def _on_thumb(self, job, progress: dict):
+        if not self.winfo_exists():
+            return
+        path = progress["path"]
+        photo = ImageTk.PhotoImage(progress["thumb"])  # PhotoImages may only be created on the Tk thread
+        self._photos[path] = photo
+        self._photos.move_to_end(path)
+        # Never evict what is on screen: the cache is at least twice the visible tile count
+        limit = max(self.photo_cache, 2 * len(self._tiles))
+        while len(self._photos) > limit:
+            self._photos.popitem(last=False)
+        for i, item_id in self._tiles.items():
+            if self.items[i] == path:
+                self.canvas.itemconfigure(item_id, image=photo)
+
+    def _on_double_click(self, event):
+        pw, ph = self.pitch
+        col, row = int(self.canvas.canvasx(event.x) // pw), int(self.canvas.canvasy(event.y) // ph)
+        i = row * self._columns + col
+        if col < self._columns and 0 <= i < len(self.items) and self.on_open is not None:
+            self.on_open(self.items[i])
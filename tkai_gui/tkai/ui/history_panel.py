@@ -0,0 +1,148 @@
+from __future__ import annotations
+import queue
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, List
+
+from PIL import ImageTk
+
+from tkai.config import DEFAULTS
+from tkai.services.run_history import RunHistory
+from tkai.services.scheduler import JobScheduler
+from tkai.services.thumbnails import ThumbnailCache, get_thumbnails
+
+THUMB_PX = 48
+TASK_FILTERS = {"All": None, "Text-to-Image": "text-to-image", "Image-to-Image": "image-to-image",
+                "Classification": "image-classification", "Classification (batch)": "image-classification-batch"}
+
+class HistoryPanel(ttk.Frame):
+    """
+    Paginated browser over the run history. Queries and thumbnail decoding run as jobs on the
+    scheduler's "history" lane; only the rows of the visible page get thumbnails, which are served
+    from the shared on-disk ThumbnailCache.
+    """
+    def __init__(self, master, history: RunHistory, jobs: JobScheduler,
+                 on_open: Callable[[Dict[str, Any]], None] | None = None, page_size: int | None = None,
+                 thumbnails: ThumbnailCache | None = None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.history = history
+        self.jobs = jobs
+        self.thumbnails = thumbnails or get_thumbnails()
+        self.on_open = on_open
+        self.page_size = page_size or DEFAULTS["history_page_size"]
+        self.page = 0
+        self.total = 0
+        self._job = None
+        self._thumbs: Dict[str, ImageTk.PhotoImage] = {}  # keeps PhotoImages of the current page alive
+        self._build()
+        self.refresh()
+
+    def _build(self):
+        filters = ttk.Frame(self)
+        filters.pack(fill="x")
+        ttk.Label(filters, text="Task:").pack(side="left")
+        self.task_var = tk.StringVar(value="All")
+        ttk.Combobox(filters, textvariable=self.task_var, values=list(TASK_FILTERS), state="readonly",
+                     width=20).pack(side="left", padx=(4, 10))
+        ttk.Label(filters, text="Prompt contains:").pack(side="left")
+        self.text_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.text_var, width=24).pack(side="left", padx=(4, 10))
+        ttk.Label(filters, text="Label:").pack(side="left")
+        self.label_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=self.label_var, width=14).pack(side="left", padx=(4, 10))
+        ttk.Button(filters, text="Search", command=lambda: self.refresh(page=0)).pack(side="left")
+        ttk.Button(filters, text="Import outputs/", command=self.import_outputs).pack(side="right")
+
+        ttk.Style(self).configure("History.Treeview", rowheight=THUMB_PX + 4)
+        cols = ("time", "task", "model", "summary", "seed")
+        self.tree = ttk.Treeview(self, columns=cols, style="History.Treeview", selectmode="browse")
+        self.tree.heading("#0", text="")
+        self.tree.column("#0", width=THUMB_PX + 20, stretch=False)
+        for col, text, width in (("time", "Time", 130), ("task", "Task", 150), ("model", "Model", 180),
+                                 ("summary", "Prompt / top label", 320), ("seed", "Seed", 70)):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, stretch=col == "summary")
+        self.tree.pack(fill="both", expand=True, pady=4)
+        self.tree.bind("<Double-1>", lambda _e: self._open_selected())
+
+        nav = ttk.Frame(self)
+        nav.pack(fill="x")
+        self.btn_prev = ttk.Button(nav, text="< Prev", command=lambda: self.refresh(page=self.page - 1))
+        self.btn_prev.pack(side="left")
+        self.btn_next = ttk.Button(nav, text="Next >", command=lambda: self.refresh(page=self.page + 1))
+        self.btn_next.pack(side="left", padx=6)
+        self.page_var = tk.StringVar(value="")
+        ttk.Label(nav, textvariable=self.page_var).pack(side="left", padx=6)
+
+    # ---------- loading ----------
+    def _filters(self) -> Dict[str, Any]:
+        return {"task": TASK_FILTERS.get(self.task_var.get()),
+                "text": self.text_var.get().strip() or None,
+                "label": self.label_var.get().strip() or None}
+
+    def refresh(self, page: int | None = None):
+        if page is not None:
+            self.page = max(0, page)
+        if self._job is not None:
+            self._job.cancel()  # stop decoding thumbnails for the page we are leaving
+        filters, page, size = self._filters(), self.page, self.page_size
+
+        def load(job):
+            total = self.history.count(**filters)
+            rows = self.history.query(**filters, limit=size, offset=page * size)
+            job.report(rows=rows, total=total)
+            for row in rows:
+                if job.cancelled:
+                    break
+                thumb = self.thumbnails.get(row["image_path"], THUMB_PX) if row.get("image_path") else None
+                if thumb is not None:
+                    job.report(run_id=row["run_id"], thumb=thumb)
+            return {"ok": True}
+
+        try:
+            self._job = self.jobs.submit("history", load, name=f"History page {page + 1}",
+                                         on_progress=self._on_progress)
+        except queue.Full:
+            self._job = None
+            self.page_var.set("History is busy; search again in a moment")
+
+    def _on_progress(self, job, progress: dict):
+        if job is not self._job or not self.winfo_exists():
+            return
+        if "rows" in progress:
+            self._show_rows(progress["rows"], progress["total"])
+        elif "thumb" in progress and self.tree.exists(progress["run_id"]):
+            photo = ImageTk.PhotoImage(progress["thumb"])
+            self._thumbs[progress["run_id"]] = photo
+            self.tree.item(progress["run_id"], image=photo)
+
+    def _show_rows(self, rows: List[Dict[str, Any]], total: int):
+        self.total = total
+        self.tree.delete(*self.tree.get_children())
+        self._thumbs.clear()
+        for r in rows:
+            summary = r.get("prompt") or (f"{r['top_label']} ({r['top_score']:.3f})" if r.get("top_label") else "")
+            self.tree.insert("", "end", iid=r["run_id"], values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["created_at"])), r["task"], r.get("model") or "",
+                summary, "" if r.get("seed") is None else r["seed"]))
+        pages = max(1, (total + self.page_size - 1) // self.page_size)
+        self.page_var.set(f"Page {self.page + 1} of {pages} ({total} runs)")
+        self.btn_prev.state(["!disabled"] if self.page > 0 else ["disabled"])
+        self.btn_next.state(["!disabled"] if self.page + 1 < pages else ["disabled"])
+
+    def _open_selected(self):
+        sel = self.tree.selection()
+        if sel and self.on_open is not None:
+            result = self.history.get(sel[0])
+            if result is not None:
+                self.on_open(result)
+
+    def import_outputs(self):
+        try:
+            self.jobs.submit("history", lambda job: self.history.import_outputs("outputs"), name="Import outputs",
+                             on_done=lambda job: self.winfo_exists() and self.refresh(page=0))
+        except queue.Full:
+            self.page_var.set("History is busy; import again in a moment")
+            return
+        self.page_var.set("Importing outputs/...")
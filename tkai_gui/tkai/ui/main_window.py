@@ -1,24 +1,44 @@
 from __future__ import annotations
-import threading
+import os
+import queue
+import random
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from pathlib import Path
 from typing import Optional
 
 from PIL import Image
 
 from tkai.ui.styles import apply_styles
 from tkai.ui.widgets import StatusBar, Console, ImageViewer
+from tkai.ui.frame_batcher import FrameBatcher
+from tkai.ui.history_panel import HistoryPanel
+from tkai.ui.gallery import Gallery
+from tkai.ui.metrics_panel import MetricsPanel
+from tkai.ui.draft_picker import DraftPicker
 from tkai.state import AppState
 from tkai.services.logger_service import LoggerService
 from tkai.models.t2i_controller import TextToImageController
 from tkai.models.clf_controller import ImageClassifierController
+from tkai.models.chain import Candidate, Chain, Classify, Draft, Filter, Refine, Save
+from tkai.models.clf_backends import BACKENDS
+from tkai.models.perf_modes import PERF_MODES
+from tkai.services.io_utils import list_images, load_image
+from tkai.services.result_cache import ResultCache
+from tkai.services.run_history import get_history
+from tkai.services.telemetry import get_metrics
+from tkai.services.preload import preload_modules
+from tkai.services.scheduler import JobScheduler, CANCELLED, RUNNING
 from tkai.config import DEFAULTS
 
+PRIORITY_LOAD = 0
+PRIORITY_RUN = 10
+
 OOP_EXPLANATION = """
 • Multiple Inheritance: Controllers use mixins (TextIOMixin, ImageIOMixin) + BaseModelController.
 • Encapsulation: Protected attrs (_model, _name, _category, _loaded) hide internal state.
 • Polymorphism: Same method names (load_model, run, summarize_info) on different controllers.
-• Method Overriding: Each controller implements its own load_model() and run().
+• Method Overriding: Each controller implements its own _build_pipeline() and run().
 • Multiple Decorators: @measure_time, @catch_exceptions, @require_loaded stacked on methods.
 """
 
@@ -31,13 +51,33 @@ class TkAIMainWindow(ttk.Frame):
 
         apply_styles(self.master)
 
-        # Controllers
-        self.t2i = TextToImageController(logger=self.logger)
-        self.clf = ImageClassifierController(logger=self.logger)
+        # Controllers share one on-disk result cache
+        self.cache = ResultCache("outputs", max_entries=DEFAULTS["cache_max_entries"],
+                                 max_bytes=DEFAULTS["cache_max_mb"] * 1024 * 1024)
+        # ...and one run history, which every finished run is written through to
+        self.history = get_history()
+        self.t2i = TextToImageController(logger=self.logger, cache=self.cache, history=self.history)
+        self.clf = ImageClassifierController(logger=self.logger, cache=self.cache, history=self.history)
+        self._last_image: Optional[Image.Image] = None  # full-size image behind state.last_output_path
+        self._history_win: Optional[tk.Toplevel] = None
+        self._gallery_win: Optional[tk.Toplevel] = None
+        self._metrics_win: Optional[tk.Toplevel] = None
+        self._drafts_win: Optional[tk.Toplevel] = None
+        self._draft_picker: Optional[DraftPicker] = None
+        # One persistent worker lane per controller; callbacks are marshalled back onto the Tk thread and
+        # applied at most once per frame, with bursts of progress events collapsed to the latest one
+        self.ui = FrameBatcher(self.master)
+        self.jobs = JobScheduler(dispatch=self.ui.dispatch, coalesce=self.ui.post, max_queue=DEFAULTS["job_queue_size"])
 
         self._build_ui()
         self._bind_events()
 
+        # Paint the window first; torch/diffusers/transformers are imported in the background
+        if DEFAULTS["preload_modules"]:
+            self.after(200, self._start_preload)
+        if self.history.get_setting("imported_outputs") is None:
+            self.after(500, self._import_outputs)
+
     # ---------- UI ----------
     def _build_ui(self):
         # Top bar
@@ -47,16 +87,36 @@ class TkAIMainWindow(ttk.Frame):
         self.task_var = tk.StringVar(value=self.state.selected_task)
         ttk.Combobox(top, textvariable=self.task_var, state="readonly",
                      values=["Text-to-Image", "Image Classification"], width=24).pack(side="left")
+        ttk.Label(top, text="Model:").pack(side="left", padx=(12,4))
+        self.model_var = tk.StringVar(value=self.t2i.model_name)
+        # Editable so any local path or hub id can be typed in
+        self.cmb_model = ttk.Combobox(top, textvariable=self.model_var, values=DEFAULTS["t2i_models"], width=34)
+        self.cmb_model.pack(side="left")
         self.btn_load = ttk.Button(top, text="Load Model", command=self.on_load_model)
         self.btn_load.pack(side="left", padx=8)
+        ttk.Label(top, text="T2I perf:").pack(side="left", padx=(12,4))
+        self.perf_var = tk.StringVar(value=DEFAULTS["t2i_perf_mode"])
+        self.cmb_perf = ttk.Combobox(top, textvariable=self.perf_var, state="readonly", values=list(PERF_MODES), width=14)
+        self.cmb_perf.pack(side="left")
+        ttk.Label(top, text="CLF backend:").pack(side="left", padx=(12,4))
+        self.backend_var = tk.StringVar(value=DEFAULTS["clf_backend"])
+        self.cmb_backend = ttk.Combobox(top, textvariable=self.backend_var, state="readonly", values=list(BACKENDS), width=8)
+        self.cmb_backend.pack(side="left")
+        ttk.Label(top, text="CLF workers:").pack(side="left", padx=(12,4))
+        self.workers_var = tk.StringVar(value=str(DEFAULTS["clf_workers"]))
+        worker_choices = sorted({1, 2, 4, os.cpu_count() or 1})
+        self.cmb_workers = ttk.Combobox(top, textvariable=self.workers_var, state="readonly",
+                                        values=[str(n) for n in worker_choices], width=4)
+        self.cmb_workers.pack(side="left")
 
         # Input section
         input_frame = ttk.LabelFrame(self, text="User Input")
         input_frame.pack(fill="x", pady=6)
 
-        self.input_mode = tk.StringVar(value="Text")  # Text | Image
+        self.input_mode = tk.StringVar(value="Text")  # Text | Image | Folder
         ttk.Radiobutton(input_frame, text="Text", variable=self.input_mode, value="Text").pack(side="left")
         ttk.Radiobutton(input_frame, text="Image", variable=self.input_mode, value="Image").pack(side="left", padx=(8,0))
+        ttk.Radiobutton(input_frame, text="Folder", variable=self.input_mode, value="Folder").pack(side="left", padx=(8,0))
 
         self.txt_prompt = tk.Text(input_frame, height=4, width=60)
         self.txt_prompt.insert("end", "a cozy reading nook with a warm lamp, watercolor style")
@@ -67,20 +127,37 @@ class TkAIMainWindow(ttk.Frame):
         ttk.Label(input_frame, text="Negative prompt:").pack(anchor="w", padx=6)
         self.txt_negative.pack(fill="x", padx=6, pady=(0,6))
 
+        seed_row = ttk.Frame(input_frame)
+        seed_row.pack(fill="x")
+        ttk.Label(seed_row, text="Seed (blank = random, fixed seeds are cached):").pack(side="left", padx=6)
+        self.entry_seed = ttk.Entry(seed_row, width=12)
+        self.entry_seed.pack(side="left")
+
         browse_row = ttk.Frame(input_frame)
         browse_row.pack(fill="x")
         self.entry_image = ttk.Entry(browse_row)
         self.entry_image.pack(side="left", fill="x", expand=True, padx=6, pady=4)
         ttk.Button(browse_row, text="Browse...", command=self.on_browse).pack(side="left", padx=6)
+        ttk.Button(browse_row, text="Folder...", command=self.on_browse_folder).pack(side="left", padx=(0,6))
 
         btns = ttk.Frame(input_frame)
         btns.pack(fill="x", pady=(4,2))
         self.btn_run1 = ttk.Button(btns, text="Run Model 1")
         self.btn_run2 = ttk.Button(btns, text="Run Model 2")
+        self.btn_drafts = ttk.Button(btns, text="Drafts...")
         self.btn_clear = ttk.Button(btns, text="Clear")
+        self.btn_cancel = ttk.Button(btns, text="Cancel Jobs")
+        self.btn_history = ttk.Button(btns, text="History...")
+        self.btn_gallery = ttk.Button(btns, text="Gallery...")
+        self.btn_metrics = ttk.Button(btns, text="Metrics...")
         self.btn_run1.pack(side="left")
         self.btn_run2.pack(side="left", padx=6)
+        self.btn_drafts.pack(side="left", padx=(0,6))
         self.btn_clear.pack(side="left")
+        self.btn_cancel.pack(side="left", padx=6)
+        self.btn_history.pack(side="left")
+        self.btn_gallery.pack(side="left", padx=6)
+        self.btn_metrics.pack(side="left")
 
         # Output + info
         out = ttk.Frame(self)
@@ -89,7 +166,7 @@ class TkAIMainWindow(ttk.Frame):
         left = ttk.LabelFrame(out, text="Model Output")
         left.pack(side="left", fill="both", expand=True, padx=(0,6))
 
-        self.viewer = ImageViewer(left)
+        self.viewer = ImageViewer(left, jobs=self.jobs, batcher=self.ui)
         self.viewer.pack(fill="both", expand=True, padx=6, pady=6)
 
         self.txt_output = tk.Text(left, height=10, wrap="word")
@@ -115,22 +192,36 @@ class TkAIMainWindow(ttk.Frame):
         self.txt_notes.pack(fill="x", padx=6, pady=6)
 
         # Console + status
-        self.console = Console(self)
+        self.console = Console(self, batcher=self.ui)
         self.console.pack(fill="x", pady=(6,0))
-        self.status = StatusBar(self)
+        self.status = StatusBar(self, batcher=self.ui)
         self.status.pack(fill="x")
 
-        self._set_running(False)
+        self._refresh_job_status()
 
     def _bind_events(self):
         self.btn_run1.configure(command=lambda: self._run_clicked(which=1))
         self.btn_run2.configure(command=lambda: self._run_clicked(which=2))
+        self.btn_drafts.configure(command=self._drafts_clicked)
         self.btn_clear.configure(command=self._clear)
+        self.btn_cancel.configure(command=self._cancel_jobs)
+        self.btn_history.configure(command=self.open_history)
+        self.btn_gallery.configure(command=self.open_gallery)
+        self.btn_metrics.configure(command=self.open_metrics)
         # Update info pane on task change
         def on_task_change(*_):
             self.state.selected_task = self.task_var.get()
+            _, ctrl = self._lane_for(self.state.selected_task)
+            choices = DEFAULTS["t2i_models"] if ctrl is self.t2i else DEFAULTS["clf_models"]
+            self.cmb_model.configure(values=choices)
+            self.model_var.set(ctrl.model_name)
             self._refresh_model_info()
         self.task_var.trace_add("write", on_task_change)
+        self.cmb_model.bind("<<ComboboxSelected>>", lambda _e: self.on_model_selected())
+        self.cmb_model.bind("<Return>", lambda _e: self.on_model_selected())
+        self.cmb_perf.bind("<<ComboboxSelected>>", lambda _e: self.on_perf_selected())
+        self.cmb_backend.bind("<<ComboboxSelected>>", lambda _e: self.on_backend_selected())
+        self.cmb_workers.bind("<<ComboboxSelected>>", lambda _e: self.on_workers_selected())
 
     # ---------- Handlers ----------
     def on_browse(self):
@@ -143,75 +234,312 @@ class TkAIMainWindow(ttk.Frame):
             self.state.last_image_path = path
             self.console.log(f"Selected image: {path}")
 
+    def on_browse_folder(self):
+        path = filedialog.askdirectory()
+        if path:
+            self.entry_image.delete(0, "end")
+            self.entry_image.insert(0, path)
+            self.input_mode.set("Folder")
+            self.console.log(f"Selected folder: {path}")
+
+    def _start_preload(self):
+        fn = lambda job: preload_modules(on_progress=lambda name, i, n: job.report(module=name, index=i, total=n))
+        self._submit("preload", fn, name="Preload ML libraries", priority=PRIORITY_LOAD,
+                     on_done=self._after_preload, on_progress=self._on_preload_progress)
+
+    def _on_preload_progress(self, job, progress: dict):
+        self.status.set(f"Loading ML libraries in background: {progress['module']} "
+                        f"({progress['index']}/{progress['total']})...")
+        self.status.set_progress((progress["index"] - 1) / progress["total"])
+
+    def _after_preload(self, job):
+        self.status.set_progress(None)
+        timings = job.result if isinstance(job.result, dict) else {}
+        if "ok" in timings:  # failed job
+            self.console.log(f"Preload failed: {timings.get('error')}")
+        else:
+            self.console.log("ML libraries ready: " + ", ".join(
+                f"{m} {t:.1f}s" if t >= 0 else f"{m} missing" for m, t in timings.items()))
+        self.status.set("Ready.")
+        self._refresh_job_status()
+        self._preload_models()
+
+    def _preload_models(self):
+        # Opt-in: models load on their own lanes so a run queued meanwhile simply waits for them
+        for task in ("Text-to-Image", "Image Classification"):
+            lane, ctrl = self._lane_for(task)
+            if lane in DEFAULTS["preload_models"]:
+                self._submit(lane, lambda job, ctrl=ctrl: ctrl.load_model(), name=f"Preload {task}",
+                             priority=PRIORITY_LOAD, on_done=lambda job, task=task: self._after_model_preload(task, job.result))
+
+    def _after_model_preload(self, task: str, res):
+        if res and res.get("ok"):
+            self.state.model_loaded[task] = True
+            self.console.log(f"{task} model preloaded: {self._load_summary(res)}")
+        else:
+            self.console.log(f"{task} preload failed: {res.get('error') if res else 'Unknown error'}")
+        self._refresh_job_status()
+
+    def _import_outputs(self):
+        # One-time indexing of JSON sidecars written before the run history existed
+        self._submit("history", lambda job: self.history.import_outputs("outputs"), name="Index existing outputs",
+                     priority=PRIORITY_RUN, on_done=self._after_import)
+
+    def _after_import(self, job):
+        if isinstance(job.result, int):
+            self.console.log(f"Run history: indexed {job.result} earlier run(s) from outputs/")
+        else:  # failed job
+            self.console.log(f"History import failed: {job.result.get('error')}")
+        self._refresh_job_status()
+
+    def open_history(self):
+        if self._history_win is not None and self._history_win.winfo_exists():
+            self._history_win.deiconify()
+            self._history_win.lift()
+            return
+        self._history_win = tk.Toplevel(self.master)
+        self._history_win.title("Run History")
+        self._history_win.geometry("980x560")
+        HistoryPanel(self._history_win, self.history, self.jobs, on_open=self._render_result).pack(fill="both", expand=True)
+
+    def open_gallery(self):
+        if self._gallery_win is not None and self._gallery_win.winfo_exists():
+            self._gallery_win.deiconify()
+            self._gallery_win.lift()
+            return
+        self._gallery_win = tk.Toplevel(self.master)
+        self._gallery_win.title("Outputs Gallery")
+        self._gallery_win.geometry("900x600")
+        gallery = Gallery(self._gallery_win, self.jobs, on_open=self._open_image)
+        gallery.pack(fill="both", expand=True)
+        gallery.load_folder("outputs")
+
+    def open_metrics(self):
+        if self._metrics_win is not None and self._metrics_win.winfo_exists():
+            self._metrics_win.deiconify()
+            self._metrics_win.lift()
+            return
+        self._metrics_win = tk.Toplevel(self.master)
+        self._metrics_win.title("Performance Metrics")
+        self._metrics_win.geometry("820x420")
+        MetricsPanel(self._metrics_win, get_metrics()).pack(fill="both", expand=True)
+
+    def _open_image(self, path: str):
+        # Decode at (at most) viewer resolution off the UI thread
+        self._submit("history", lambda job: load_image(path, DEFAULTS["preview_max_px"]), name=f"Open {Path(path).name}",
+                     priority=PRIORITY_RUN, on_done=lambda job: self._show_opened(path, job.result))
+
+    def _show_opened(self, path: str, img):
+        if isinstance(img, dict):  # failed job
+            self.console.log(f"Preview error: {img.get('error')}")
+        else:
+            self.viewer.show_pil_image(img)
+            self.state.last_output_path = path
+            self._last_image = None  # decoded at preview size; classification reads the file
+            self.txt_output.delete("1.0", "end")
+            self.txt_output.insert("end", f"Image: {path}")
+        self._refresh_job_status()
+
+    def on_model_selected(self):
+        name = self.model_var.get().strip()
+        lane, ctrl = self._lane_for(self.task_var.get())
+        if not name or name == ctrl.model_name:
+            return
+        # Switch on the controller's own lane so it never changes under a running job
+        self._submit(lane, lambda job: ctrl.set_model(name), name=f"Switch to {name}", priority=PRIORITY_RUN,
+                     on_done=lambda job: (self.console.log(f"Model set to {name} (loads on first run)"),
+                                          self._refresh_model_info()))
+
+    def on_perf_selected(self):
+        mode = self.perf_var.get()
+        self._submit("t2i", lambda job: self.t2i.set_perf_mode(mode), name=f"Perf mode {mode}", priority=PRIORITY_RUN,
+                     on_done=lambda job: self.console.log(f"Text-to-Image performance mode: {mode}"))
+
+    def on_backend_selected(self):
+        name = self.backend_var.get()
+        self._submit("clf", lambda job: self.clf.set_backend(name), name=f"Backend {name}", priority=PRIORITY_RUN,
+                     on_done=lambda job: (self.console.log(f"Classifier backend: {name} (loads on first run)"),
+                                          self._refresh_model_info()))
+
+    def on_workers_selected(self):
+        n = int(self.workers_var.get())
+        where = f"{n} worker processes" if n > 1 else "in-process"
+        self._submit("clf", lambda job: self.clf.set_workers(n), name=f"Workers {n}", priority=PRIORITY_RUN,
+                     on_done=lambda job: (self.console.log(f"Classifier runs {where} (loads on first run)"),
+                                          self._refresh_model_info()))
+
     def on_load_model(self):
         task = self.task_var.get()
-        self._set_running(True)
-        self.status.set(f"Loading {task} model...")
-
-        def worker():
-            try:
-                if task == "Text-to-Image":
-                    res = self.t2i.load_model()
-                else:
-                    res = self.clf.load_model()
-            finally:
-                self.master.after(0, lambda: self._after_load(task, res))
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    def _after_load(self, task, res):
-        self._set_running(False)
-        if res and res.get("ok"):
+        lane, ctrl = self._lane_for(task)
+        self._submit(lane, lambda job: ctrl.load_model(), name=f"Load {task}", priority=PRIORITY_LOAD,
+                     on_done=lambda job: self._after_load(task, job))
+
+    def _after_load(self, task, job):
+        res = job.result
+        if job.status == CANCELLED:
+            self.console.log(f"Load of {task} cancelled.")
+            self.status.set("Load cancelled.")
+        elif res and res.get("ok"):
             self.state.model_loaded[task] = True
             self.console.log(f"{task} loaded: {res}")
-            self.status.set(f"{task} model loaded.")
+            self.status.set(f"{task} model loaded: {self._load_summary(res)}")
             self._refresh_model_info()
         else:
             err = res.get("error") if res else "Unknown error"
             messagebox.showerror("Load Failed", err)
             self.console.log(f"Load error: {err}")
             self.status.set("Load failed.")
+        self._refresh_job_status()
+
+    @staticmethod
+    def _load_summary(res: dict) -> str:
+        parts = ["shared" if res.get("shared") else f"{res.get('load_sec', 0):.1f}s + {res.get('warmup_sec', 0):.1f}s warm-up"]
+        if res.get("rss_mb") is not None:
+            parts.append(f"RSS {res['rss_mb']:.0f} MB")
+        if res.get("rss_delta_mb") is not None:
+            parts.append(f"+{res['rss_delta_mb']:.0f} MB")
+        return ", ".join(parts)
 
     def _run_clicked(self, which: int):
         # which 1 = T2I, which 2 = CLF by default; but allow polymorphic behavior based on selected task & mode
         mode = self.input_mode.get()
         task = self.task_var.get()
-        self._set_running(True)
-        self.status.set("Running...")
-
-        def worker():
-            try:
-                if which == 1:
-                    # Prefer text-to-image unless user chose classifier explicitly with image input
-                    if task == "Text-to-Image" or mode == "Text":
-                        prompt = self.txt_prompt.get("1.0", "end").strip()
-                        negative = self.txt_negative.get().strip()
-                        res = self.t2i.run(prompt=prompt, negative_prompt=negative,
-                                           width=DEFAULTS["image_size"][0], height=DEFAULTS["image_size"][1],
-                                           steps=DEFAULTS["t2i_steps"], guidance=DEFAULTS["t2i_guidance"])
-                    else:
-                        img_path = self.entry_image.get().strip() or (self.state.last_output_path or "")
-                        res = self.clf.run(image_path=img_path, top_k=DEFAULTS["clf_topk"])
-                else:
-                    # which == 2
-                    if task == "Image Classification" or mode == "Image":
-                        img_path = self.entry_image.get().strip() or (self.state.last_output_path or "")
-                        res = self.clf.run(image_path=img_path, top_k=DEFAULTS["clf_topk"])
-                    else:
-                        prompt = self.txt_prompt.get("1.0", "end").strip()
-                        negative = self.txt_negative.get().strip()
-                        res = self.t2i.run(prompt=prompt, negative_prompt=negative,
-                                           width=DEFAULTS["image_size"][0], height=DEFAULTS["image_size"][1],
-                                           steps=DEFAULTS["t2i_steps"], guidance=DEFAULTS["t2i_guidance"])
-            finally:
-                self.master.after(0, lambda: self._after_run(res))
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    def _after_run(self, res):
-        self._set_running(False)
+        if which == 1:
+            # Prefer text-to-image unless user chose classifier explicitly with image input
+            use_t2i = task == "Text-to-Image" or mode == "Text"
+        else:
+            use_t2i = not (task == "Image Classification" or mode in ("Image", "Folder"))
+
+        # Widgets are read here on the Tk thread; the job only sees plain values
+        if use_t2i:
+            prompt = self.txt_prompt.get("1.0", "end").strip()
+            negative = self.txt_negative.get().strip()
+            seed_text = self.entry_seed.get().strip()
+            seed = int(seed_text) if seed_text.lstrip("-").isdigit() else None
+            fn = lambda job: self.t2i.run(prompt=prompt, negative_prompt=negative,
+                                          width=DEFAULTS["image_size"][0], height=DEFAULTS["image_size"][1],
+                                          steps=DEFAULTS["t2i_steps"], guidance=DEFAULTS["t2i_guidance"], seed=seed,
+                                          progress=lambda ev: job.report(**ev), cancel_event=job.cancel_event)
+            lane, name = "t2i", f"Generate '{prompt[:30]}'"
+        else:
+            lane, (fn, name) = "clf", self._classify_job(mode)
+        self._submit(lane, fn, name=name, priority=PRIORITY_RUN,
+                     on_done=self._after_run, on_progress=self._on_progress)
+
+    # ---------- draft-then-refine ----------
+    def _drafts_clicked(self):
+        prompt = self.txt_prompt.get("1.0", "end").strip()
+        negative = self.txt_negative.get().strip()
+        seed_text = self.entry_seed.get().strip()
+        # Drafts need concrete seeds: refinement re-uses each kept draft's seed
+        base_seed = int(seed_text) if seed_text.lstrip("-").isdigit() else random.randrange(2**31 - DEFAULTS["draft_count"])
+        fn = lambda job: Chain(self.logger, Draft(self.t2i, [prompt], negative_prompt=negative, base_seed=base_seed,
+                                                  progress=lambda done, total: job.report(done=done, total=total))
+                               ).run(cancel_event=job.cancel_event)
+        self._submit("t2i", fn, name=f"Drafts '{prompt[:30]}'", priority=PRIORITY_RUN,
+                     on_done=lambda job: self._show_drafts(job, negative), on_progress=self._on_progress)
+
+    def _show_drafts(self, job, negative: str):
+        res = job.result
+        if job.status == CANCELLED or not res or not res.get("ok"):
+            self._after_run(job)
+            return
+        self.status.set_progress(None)
+        self.status.set(f"{res['num_images']} drafts ready.")
+        if self._drafts_win is not None and self._drafts_win.winfo_exists():
+            self._drafts_win.destroy()
+        self._drafts_win = tk.Toplevel(self.master)
+        self._drafts_win.title("Drafts")
+        self._draft_picker = DraftPicker(self._drafts_win, [Candidate.from_result(item) for item in res["items"]],
+                                         on_refine=lambda chosen: self._refine_drafts(chosen, negative),
+                                         on_auto_pick=self._rank_drafts)
+        self._draft_picker.pack(fill="both", expand=True, padx=6, pady=6)
+        self._refresh_job_status()
+
+    def _rank_drafts(self, candidates):
+        def rank(job):
+            # The worker scores its own copies; the picker's candidates are only read on the Tk thread
+            ranked = [Candidate(c.image, dict(c.meta)) for c in candidates]
+            res = Chain(self.logger, Classify(self.clf), Filter(keep=DEFAULTS["draft_keep"])).run(ranked)
+            return {**res, "ranked": ranked} if res.get("ok") else res
+        self._submit("clf", rank, name=f"Rank {len(candidates)} drafts", priority=PRIORITY_RUN,
+                     on_done=self._after_rank)
+
+    def _after_rank(self, job):
+        res = job.result
+        picker = self._draft_picker
         if res and res.get("ok"):
+            if picker is not None and picker.winfo_exists():
+                # Every draft was scored; the filter's survivors get ticked
+                picker.select([item["run_id"] for item in res["items"]],
+                              {c.meta["run_id"]: c.score for c in res["ranked"] if c.score is not None})
+        else:
+            self.console.log(f"Ranking drafts failed: {res.get('error') if res else 'Unknown error'}")
+        self._refresh_job_status()
+
+    def _refine_drafts(self, candidates, negative: str):
+        width, height = DEFAULTS["image_size"]
+        # Copies, so the picker keeps showing the drafts
+        chosen = [Candidate(c.image, dict(c.meta)) for c in candidates]
+        fn = lambda job: Chain(self.logger, Refine(self.t2i, negative_prompt=negative, width=width, height=height),
+                               Save(prefix="draft", history=self.history)).run(chosen, cancel_event=job.cancel_event)
+        self._submit("t2i", fn, name=f"Refine {len(chosen)} draft(s) to {width}x{height}", priority=PRIORITY_RUN,
+                     on_done=self._after_run)
+
+    def _classify_job(self, mode: str):
+        target = self.entry_image.get().strip()
+        if mode == "Folder":
+            def fn(job):
+                return self.clf.run_batch(paths=list_images(target), batch_size=DEFAULTS["clf_batch_size"],
+                                          top_k=DEFAULTS["clf_topk"], cancel_event=job.cancel_event,
+                                          progress=lambda done, total: job.report(done=done, total=total))
+            return fn, f"Classify folder {Path(target).name}"
+        img_path = target or (self.state.last_output_path or "")
+        # A fresh generation is classified from memory rather than re-read from outputs/
+        image = self._last_image if not target and img_path == self.state.last_output_path else None
+        return (lambda job: self.clf.run(image_path=img_path, top_k=DEFAULTS["clf_topk"], image=image),
+                f"Classify {Path(img_path).name}")
+
+    def _submit(self, lane: str, fn, name: str, priority: int, on_done, on_progress=None):
+        try:
+            # Runs report full-state progress (steps, done/total), so only the latest event matters
+            job = self.jobs.submit(lane, fn, name=name, priority=priority, on_done=on_done, on_progress=on_progress,
+                                   coalesce_progress=True)
+        except queue.Full:
+            messagebox.showwarning("Queue Full", "Too many jobs are waiting. Try again when some have finished.")
+            return None
+        self.console.log(f"Queued #{job.id}: {job.name}")
+        self._refresh_job_status()
+        return job
+
+    def _on_progress(self, job, progress: dict):
+        if "step" in progress:
+            # Diffusion step: live ETA and low-res latent preview
+            self.status.set(f"#{job.id} {job.name}: step {progress['step']}/{progress['total']}, "
+                            f"ETA {progress['eta_sec']:.1f}s")
+            self.status.set_progress(progress["step"] / progress["total"])
+            if progress.get("preview") is not None:
+                self.viewer.show_pil_image(progress["preview"])
+        elif "done" in progress:
+            self.status.set(f"#{job.id} {job.name}: {progress['done']}/{progress['total']}")
+            self.status.set_progress(progress["done"] / progress["total"])
+
+    def _cancel_jobs(self):
+        n = self.jobs.cancel_all()
+        self.console.log(f"Cancel requested for {n} job(s).")
+        self._refresh_job_status()
+
+    def _after_run(self, job):
+        res = job.result
+        self.status.set_progress(None)
+        self._refresh_model_info()
+        if job.status == CANCELLED:
+            self.console.log(f"Job #{job.id} cancelled.")
+            self.status.set("Cancelled.")
+        elif res and res.get("ok"):
             self.console.log(f"Run ok: {res}")
+            if res.get("cached"):
+                self.console.log(f"Served from cache: {self.cache.stats()}")
             self.status.set("Done.")
             self._render_result(res)
         else:
@@ -219,6 +547,7 @@ class TkAIMainWindow(ttk.Frame):
             messagebox.showerror("Run Failed", err)
             self.console.log(f"Run error: {err}")
             self.status.set("Failed.")
+        self._refresh_job_status()
 
     def _render_result(self, res: dict):
         task = res.get("task")
@@ -226,9 +555,11 @@ class TkAIMainWindow(ttk.Frame):
             path = res.get("image_path")
             if path:
                 try:
-                    img = Image.open(path).convert("RGB")
+                    # The file may still be in the writer queue; cached results only have the path
+                    img = res.get("preview_image") or Image.open(path).convert("RGB")
                     self.viewer.show_pil_image(img)
                     self.state.last_output_path = path
+                    self._last_image = img
                     self.txt_output.delete("1.0", "end")
                     self.txt_output.insert("end", f"Saved image to: {path}\nJSON: {res.get('json_path','')}")
                 except Exception as e:
@@ -238,36 +569,61 @@ class TkAIMainWindow(ttk.Frame):
             self.txt_output.delete("1.0", "end")
             for p in preds:
                 self.txt_output.insert("end", f"{p['label']}: {p['score']:.4f}\n")
-            # Try thumbnail if we have an image path
-            ipath = res.get("image_path")
-            if ipath:
+            # Reuse the image decoded for inference; cached results carry only the path
+            img, ipath = res.get("preview_image"), res.get("image_path")
+            if img is not None or ipath:
                 try:
-                    img = Image.open(ipath).convert("RGB")
-                    self.viewer.show_pil_image(img)
+                    self.viewer.show_pil_image(img if img is not None else Image.open(ipath).convert("RGB"))
                 except Exception as e:
                     self.console.log(f"Preview error: {e}")
+        elif task == "chain":
+            items = res.get("items", [])
+            self.txt_output.delete("1.0", "end")
+            for item in items:
+                self.txt_output.insert("end", f"seed {item.get('seed')}: {item.get('image_path', '(not saved)')}\n")
+            img = items[0].get("preview_image") if items else None
+            if img is not None:
+                self.viewer.show_pil_image(img)
+                self.state.last_output_path = items[0].get("image_path")
+                self._last_image = img
+        elif task == "image-classification-batch":
+            self.txt_output.delete("1.0", "end")
+            self.txt_output.insert("end", f"{res['num_images']} images in {res['duration_sec']:.2f}s "
+                                          f"({res['images_per_sec']:.2f} img/s)\nJSON: {res.get('json_path','')}\n")
+            dd = res.get("dedup")
+            if dd and dd["unique"] < dd["images"]:
+                self.txt_output.insert("end", f"Classified {dd['unique']} unique images: {dd['exact_duplicates']} exact and "
+                                              f"{dd['near_duplicates']} near duplicates reused their group's result\n")
+            for r in res.get("results", []):
+                top = r["predictions"][0] if r["predictions"] else {"label": "-", "score": 0.0}
+                self.txt_output.insert("end", f"{Path(r['image_path']).name}: {top['label']} ({top['score']:.4f})\n")
 
     def _refresh_model_info(self):
         task = self.task_var.get()
-        info = self.t2i.summarize_info() if task == "Text-to-Image" else self.clf.summarize_info()
+        _, ctrl = self._lane_for(task)
+        info = ctrl.summarize_info()
         self.txt_info.delete("1.0", "end")
         for k, v in info.items():
             self.txt_info.insert("end", f"{k}: {v}\n")
+        reg = self.t2i._registry.stats()
+        budget = f"{reg['budget_mb']:.0f} MB" if reg["budget_mb"] else "unlimited"
+        self.txt_info.insert("end", f"Loaded: {'yes' if ctrl._loaded else 'no (loads on first run)'}\n"
+                                    f"Model pool: {reg['loaded']} loaded, {reg['resident_mb']:.0f} MB / {budget}\n")
 
     def _clear(self):
         self.txt_output.delete("1.0", "end")
-        self.viewer.canvas.delete("all")
+        self.viewer.clear()
         self.status.set("Cleared.")
 
-    def _set_running(self, is_running: bool):
-        state = "disabled" if is_running else "normal"
-        for w in [self.btn_load, self.btn_run1, self.btn_run2, self.btn_clear,
-                  self.txt_prompt, self.txt_negative, self.entry_image]:
-            try:
-                w.configure(state=state)
-            except Exception:
-                pass
-        if is_running:
-            self.status.set("Working... Please wait.")
-        else:
-            self.status.set("Ready.")
+    def _lane_for(self, task: str):
+        return ("t2i", self.t2i) if task == "Text-to-Image" else ("clf", self.clf)
+
+    def _refresh_job_status(self):
+        active = [j for j in self.jobs.active() if j.lane != "viewer"]  # preview re-fits are not user jobs
+        if active:
+            running = sum(1 for j in active if j.status == RUNNING)
+            self.status.set(f"{running} running, {len(active) - running} queued.")
+
+    def destroy(self):
+        self.jobs.shutdown()
+        super().destroy()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import json
+import tkinter as tk
+from tkinter import ttk, filedialog
+from typing import Any, Dict
+
+from tkai.services.telemetry import MetricsRegistry
+
+def _ms(value) -> str:
+    return "" if value is None else f"{value * 1000:.1f}"
+
+class MetricsPanel(ttk.Frame):
+    """
+    Live view of a MetricsRegistry: rolling p50/p95/p99 per controller, operation and stage, plus process
+    RSS and thread counts. Refreshes itself every `interval_ms` while mapped; snapshots are cheap
+    (a sort of at most `metrics_window` floats per series), so this stays on the Tk thread.
+    """
+    def __init__(self, master, metrics: MetricsRegistry, interval_ms: int = 2000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.metrics = metrics
+        self.interval_ms = interval_ms
+        self._after_id = None
+        self._build()
+        self.refresh()
+
+    def _build(self):
+        top = ttk.Frame(self)
+        top.pack(fill="x")
+        self.process_var = tk.StringVar(value="")
+        ttk.Label(top, textvariable=self.process_var).pack(side="left")
+        ttk.Button(top, text="Export Prometheus...", command=lambda: self.export("prom")).pack(side="right")
+        ttk.Button(top, text="Export JSON...", command=lambda: self.export("json")).pack(side="right", padx=6)
+        ttk.Button(top, text="Reset", command=self._reset).pack(side="right")
+
+        cols = ("controller", "op", "stage", "count", "p50", "p95", "p99", "mean")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for col, text, width in (("controller", "Controller", 170), ("op", "Operation", 100), ("stage", "Stage", 100),
+                                 ("count", "Count", 60), ("p50", "p50 ms", 80), ("p95", "p95 ms", 80),
+                                 ("p99", "p99 ms", 80), ("mean", "Mean ms", 80)):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor="w" if col in ("controller", "op", "stage") else "e")
+        self.tree.pack(fill="both", expand=True, pady=4)
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        snap = self.metrics.snapshot()
+        self._show(snap)
+        self._after_id = self.after(self.interval_ms, self.refresh)
+
+    def _show(self, snap: Dict[str, Any]):
+        proc = snap["process"]
+        rss = f"RSS {proc['rss_mb']:.0f} MB" if proc.get("rss_mb") is not None else "RSS n/a"
+        peak = f"peak {proc['peak_rss_mb']:.0f} MB" if proc.get("peak_rss_mb") is not None else "peak n/a"
+        threads = ", ".join(f"{k} {v}" for k, v in proc.get("threads", {}).items())
+        errors = sum(e["count"] for e in snap["errors"])
+        self.process_var.set(f"{rss} ({peak}) | threads: {threads} | errors: {errors} | window: {snap['window']}")
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for row in snap["stages"]:
+            iid = f"{row['controller']}|{row['op']}|{row['stage']}"
+            self.tree.insert("", "end", iid=iid, values=(
+                row["controller"], row["op"], row["stage"], row["count"],
+                _ms(row["p50_sec"]), _ms(row["p95_sec"]), _ms(row["p99_sec"]), _ms(row["mean_sec"])))
+        keep = [iid for iid in selected if self.tree.exists(iid)]
+        if keep:
+            self.tree.selection_set(keep)
+
+    def _reset(self):
+        self.metrics.reset()
+        self._show(self.metrics.snapshot())
+
+    def export(self, fmt: str):
+        ext = ".prom" if fmt == "prom" else ".json"
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=ext, initialfile=f"tkai_metrics{ext}",
+                                            filetypes=[("Prometheus text", "*.prom")] if fmt == "prom"
+                                            else [("JSON", "*.json")])
+        if not path:
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "prom":
+                f.write(self.metrics.to_prometheus())
+            else:
+                json.dump(self.metrics.snapshot(), f, indent=2)
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        super().destroy()
@@ -1,41 +1,149 @@
+import queue
 import tkinter as tk
+from collections import deque
 from tkinter import ttk
 from PIL import Image, ImageTk
 
+from tkai.config import DEFAULTS
+
 class StatusBar(ttk.Frame):
-    def __init__(self, master, **kwargs):
+    """With a FrameBatcher, text and progress changes are applied once per frame (latest wins)."""
+    def __init__(self, master, batcher=None, **kwargs):
         super().__init__(master, **kwargs)
+        self.batcher = batcher
         self.var = tk.StringVar(value="Ready.")
+        self.progress = ttk.Progressbar(self, orient="horizontal", length=160, mode="determinate", maximum=1.0)
+        self.progress.pack(side="right")
         self.label = ttk.Label(self, textvariable=self.var, anchor="w")
         self.label.pack(fill="x")
     def set(self, text: str):
-        self.var.set(text)
-        self.update_idletasks()
+        self._apply("status", lambda: self.var.set(text))
+    def set_progress(self, fraction=None):
+        """Show a 0..1 fraction, or clear the bar with None."""
+        value = 0.0 if fraction is None else max(0.0, min(1.0, fraction))
+        self._apply("progress", lambda: self.progress.configure(value=value))
+    def _apply(self, what: str, cb):
+        if self.batcher is None:
+            cb()
+        else:
+            self.batcher.post((id(self), what), cb)
 
 class Console(ttk.Frame):
-    def __init__(self, master, **kwargs):
+    """Log pane that keeps only the last `max_lines` lines; lines logged within one frame are inserted together."""
+    def __init__(self, master, batcher=None, max_lines: int | None = None, **kwargs):
         super().__init__(master, **kwargs)
+        self.batcher = batcher
+        self.max_lines = max_lines or DEFAULTS["console_max_lines"]
+        self._pending = deque(maxlen=self.max_lines)
         self.text = tk.Text(self, height=8, wrap="word")
         self.text.pack(fill="both", expand=True)
     def log(self, msg: str):
-        self.text.insert("end", msg + "\n")
+        self._pending.append(msg)
+        if self.batcher is None:
+            self._flush()
+        else:
+            self.batcher.post((id(self), "lines"), self._flush)
+    def _flush(self):
+        if not self._pending:
+            return
+        lines = list(self._pending)
+        self._pending.clear()
+        self.text.insert("end", "\n".join(lines) + "\n")
+        # The widget always ends with one empty line after the last newline
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
         self.text.see("end")
 
 class ImageViewer(ttk.Frame):
-    def __init__(self, master, **kwargs):
+    """
+    Shows a PIL image fitted to the canvas. The full-size source is kept, so a window resize re-fits
+    from it (debounced) rather than from the last fitted copy. Given a JobScheduler, the resize runs on
+    its "viewer" lane and only the PhotoImage is built on the Tk thread; a newer image or size
+    supersedes any resize still in flight.
+    """
+    def __init__(self, master, jobs=None, batcher=None, **kwargs):
         super().__init__(master, **kwargs)
+        self.jobs = jobs
+        self.batcher = batcher
         self.canvas = tk.Canvas(self, width=320, height=240, bg="#f0f0f0")
         self.canvas.pack(fill="both", expand=True)
         self._imgtk = None
+        self._source = None
+        self._fitted = None      # (source id, canvas size) currently drawn
+        self._generation = 0
+        self._job = None
+        self._resize_after = None
+        self.canvas.bind("<Configure>", self._on_configure)
+
     def show_pil_image(self, img):
-        # Fit into canvas while keeping aspect ratio
-        cw = self.canvas.winfo_width() or 320
-        ch = self.canvas.winfo_height() or 240
-        iw, ih = img.size
-        scale = min(cw/iw, ch/ih)
-        nw, nh = max(1, int(iw*scale)), max(1, int(ih*scale))
-        resized = img.resize((nw, nh))
-        self._imgtk = ImageTk.PhotoImage(resized)
+        self._source = img
+        self._fitted = None
+        self._refit()
+
+    def clear(self):
+        self._source = None
+        self._fitted = None
+        self._generation += 1
+        self._imgtk = None
         self.canvas.delete("all")
-        self.canvas.create_image(cw//2, ch//2, image=self._imgtk, anchor="center")
-        self.canvas.update()
+
+    def _on_configure(self, _event):
+        if self._source is None:
+            return
+        if self._resize_after is not None:
+            self.after_cancel(self._resize_after)
+        self._resize_after = self.after(DEFAULTS["viewer_resize_debounce_ms"], self._refit)
+
+    def _canvas_size(self):
+        return max(1, self.canvas.winfo_width() or 320), max(1, self.canvas.winfo_height() or 240)
+
+    def _refit(self):
+        self._resize_after = None
+        img = self._source
+        if img is None:
+            return
+        size = self._canvas_size()
+        if self._fitted == (id(img), size):
+            return
+        self._generation += 1
+        generation = self._generation
+        if self.jobs is None:
+            self._draw(generation, img, size, _fit(img, size))
+            return
+        if self._job is not None:
+            self._job.cancel()  # superseded before it started: skip the resize
+        try:
+            self._job = self.jobs.submit("viewer", lambda job: _fit(img, size), name="Fit preview",
+                                         on_done=lambda job: self._resized(generation, img, size, job))
+        except queue.Full:
+            self._job = None
+            # Lane is busy; retry after the debounce delay (a newer image or size supersedes this one)
+            self._resize_after = self.after(DEFAULTS["viewer_resize_debounce_ms"], self._refit)
+
+    def _resized(self, generation, img, size, job):
+        if isinstance(job.result, Image.Image):
+            self._draw(generation, img, size, job.result)
+
+    def _draw(self, generation, img, size, fitted):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        def paint():
+            self._imgtk = ImageTk.PhotoImage(fitted)
+            self.canvas.delete("all")
+            self.canvas.create_image(size[0] // 2, size[1] // 2, image=self._imgtk, anchor="center")
+            self._fitted = (id(img), size)
+        if self.batcher is None:
+            paint()
+        else:
+            self.batcher.post((id(self), "paint"), paint)
+
+def _fit(img, size):
+    # Fit into the canvas while keeping the aspect ratio
+    iw, ih = img.size
+    scale = min(size[0] / iw, size[1] / ih)
+    nw, nh = max(1, int(iw * scale)), max(1, int(ih * scale))
+    if (nw, nh) == img.size:
+        return img
+    # reducing_gap shrinks large sources by whole factors first, which is much cheaper than a plain resize
+    return img.resize((nw, nh), Image.BILINEAR, reducing_gap=2.0)